@@ -0,0 +1,253 @@
+"""
+Account State - Кэш снимков состояния аккаунта Binance Futures
+==============================================================
+
+Один путь исполнения сигнала (OrderExecutor) несколько раз запрашивает
+одни и те же тяжелые endpoints: futures_account, futures_position_information
+и futures_get_open_orders. AccountStateCache держит короткоживущие снимки:
+- аккаунт (баланс + позиции) - один запрос на TTL
+- позиции (positionRisk по всем символам) - один запрос на TTL
+- открытые ордера - по символу (запрос без symbol стоит 40 weight)
+
+После собственных размещений/отмен ордеров снимки инвалидируются явно,
+чтобы проверки лимитов видели свежее состояние.
+
+SymbolSettingsRegistry запоминает примененные плечо и режим маржи по
+символам (symbol_settings.json, засевается из positionRisk), чтобы
+futures_change_leverage / futures_change_margin_type вызывались только
+при реальном изменении.
+
+Author: HEDGER
+Version: 1.1
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils import logger
+
+
+class AccountStateCache:
+    """Thread-safe кэш account / positions / open orders с коротким TTL"""
+
+    def __init__(self, client: Any, ttl_seconds: float = 5.0):
+        """
+        Args:
+            client: binance.client.Client (или совместимый)
+            ttl_seconds: Время жизни снимка в секундах
+        """
+        self.client = client
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self._lock = threading.Lock()
+        self._account: Optional[Tuple[float, Dict]] = None
+        self._positions: Optional[Tuple[float, List[Dict]]] = None
+        self._open_orders: Dict[str, Tuple[float, List[Dict]]] = {}
+        # Поколения снимков: invalidate() увеличивает их, и запрос, начатый
+        # до invalidate(), не кладет в кэш результат старше инвалидации
+        self._generation = 0
+        self._orders_generation = 0
+        self._symbol_generations: Dict[str, int] = {}
+        self._hits = 0
+        self._rest_calls = 0
+
+    def _fresh(self, entry: Optional[Tuple[float, Any]]) -> bool:
+        return entry is not None and time.monotonic() - entry[0] < self.ttl_seconds
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._rest_calls += 1
+
+    def _current_generation(self, symbol: Optional[str] = None) -> Tuple[int, ...]:
+        """Поколение снимка (вызывать под self._lock)"""
+        if symbol is None:
+            return (self._generation,)
+        return self._orders_generation, self._symbol_generations.get(symbol, 0)
+
+    def _load(self, fetch: Callable[[], Any]) -> Tuple[float, Any]:
+        """REST запрос вне lock (параллельные промахи допустимы - TTL короткий)"""
+        self._count(hit=False)
+        return time.monotonic(), fetch()
+
+    def get_account(self) -> Dict:
+        """Снимок futures_account (totalWalletBalance, positions, ...)"""
+        with self._lock:
+            entry = self._account
+            generation = self._current_generation()
+        if self._fresh(entry):
+            self._count(hit=True)
+            return entry[1]
+
+        entry = self._load(self.client.futures_account)
+        with self._lock:
+            if generation == self._current_generation():
+                self._account = entry
+        return entry[1]
+
+    def get_positions(self, symbol: Optional[str] = None) -> List[Dict]:
+        """Снимок futures_position_information по всем символам (с фильтром по symbol)"""
+        with self._lock:
+            entry = self._positions
+            generation = self._current_generation()
+        if self._fresh(entry):
+            self._count(hit=True)
+        else:
+            entry = self._load(self.client.futures_position_information)
+            with self._lock:
+                if generation == self._current_generation():
+                    self._positions = entry
+
+        positions = entry[1]
+        if symbol is None:
+            return positions
+        return [position for position in positions if position.get('symbol') == symbol]
+
+    def get_open_orders(self, symbol: str) -> List[Dict]:
+        """Открытые ордера символа (кэш по символу)"""
+        with self._lock:
+            entry = self._open_orders.get(symbol)
+            generation = self._current_generation(symbol)
+        if self._fresh(entry):
+            self._count(hit=True)
+            return entry[1]
+
+        entry = self._load(lambda: self.client.futures_get_open_orders(symbol=symbol))
+        with self._lock:
+            if generation == self._current_generation(symbol):
+                self._open_orders[symbol] = entry
+        return entry[1]
+
+    def invalidate(self, symbol: Optional[str] = None) -> None:
+        """
+        Сбрасывает снимки после собственных действий с ордерами
+
+        Args:
+            symbol: Символ, чьи открытые ордера изменились (None - все символы)
+        """
+        with self._lock:
+            self._account = None
+            self._positions = None
+            self._generation += 1
+            if symbol is None:
+                self._open_orders.clear()
+                self._orders_generation += 1
+            else:
+                self._open_orders.pop(symbol, None)
+                self._symbol_generations[symbol] = self._symbol_generations.get(symbol, 0) + 1
+        logger.debug(f"🔄 Account state invalidated ({symbol or 'all'})")
+
+    def reset_stats(self) -> None:
+        """Сброс счетчиков (перед новым батчем)"""
+        with self._lock:
+            self._hits = 0
+            self._rest_calls = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика кэша для логирования"""
+        with self._lock:
+            total = self._hits + self._rest_calls
+            return {
+                'hits': self._hits,
+                'rest_calls': self._rest_calls,
+                'hit_rate': round(self._hits / total * 100, 1) if total else 0.0,
+                'ttl_seconds': self.ttl_seconds
+            }
+
+
+class SymbolSettingsRegistry:
+    """Персистентный реестр плеча и режима маржи по символам"""
+
+    def __init__(self, state_file: str = 'symbol_settings.json'):
+        """
+        Args:
+            state_file: Файл реестра
+        """
+        self.state_file = Path(state_file)
+        self._lock = threading.Lock()
+        self._settings: Dict[str, Dict[str, Any]] = self._load_state()
+        self._seeded = False
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        """Загружает реестр из файла"""
+        if not self.state_file.exists():
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get('symbols', {}) if isinstance(data, dict) else {}
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось загрузить {self.state_file}: {e}")
+            return {}
+
+    def save(self) -> None:
+        """Атомарно сохраняет реестр (tmp + replace)"""
+        with self._lock:
+            data = {
+                'timestamp': datetime.now().isoformat(),
+                'symbols': dict(self._settings)
+            }
+        tmp_file = self.state_file.with_suffix(self.state_file.suffix + '.tmp')
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения настроек символов: {e}")
+
+    @property
+    def seeded(self) -> bool:
+        return self._seeded
+
+    def seed_from_positions(self, positions: List[Dict]) -> None:
+        """
+        Засевает реестр фактическими настройками биржи
+
+        Args:
+            positions: Ответ futures_position_information (leverage, marginType по символам)
+        """
+        with self._lock:
+            for position in positions:
+                symbol = position.get('symbol')
+                if not symbol:
+                    continue
+                entry = self._settings.setdefault(symbol, {})
+                if position.get('leverage'):
+                    entry['leverage'] = int(float(position['leverage']))
+                if position.get('marginType'):
+                    # positionRisk отдает 'cross'/'isolated', change_margin_type ждет 'CROSSED'/'ISOLATED'
+                    entry['margin_type'] = 'CROSSED' if position['marginType'].lower() == 'cross' else 'ISOLATED'
+            self._seeded = True
+        logger.info(f"🔧 Symbol settings seeded: {len(self._settings)} symbols")
+
+    def needs_leverage(self, symbol: str, leverage: int) -> bool:
+        """True если плечо символа отличается от целевого (или неизвестно)"""
+        with self._lock:
+            return self._settings.get(symbol, {}).get('leverage') != int(leverage)
+
+    def needs_margin_type(self, symbol: str, margin_type: str) -> bool:
+        """True если режим маржи символа отличается от целевого (или неизвестен)"""
+        with self._lock:
+            return self._settings.get(symbol, {}).get('margin_type') != margin_type
+
+    def record(self, symbol: str, leverage: Optional[int] = None, margin_type: Optional[str] = None) -> None:
+        """Запоминает примененные настройки и сохраняет реестр"""
+        with self._lock:
+            entry = self._settings.setdefault(symbol, {})
+            if leverage is not None:
+                entry['leverage'] = int(leverage)
+            if margin_type is not None:
+                entry['margin_type'] = margin_type
+            entry['updated_at'] = datetime.now().isoformat()
+        self.save()
+
+    def forget(self, symbol: str) -> None:
+        """Сбрасывает знания о символе (после ошибки изменения - состояние неизвестно)"""
+        with self._lock:
+            self._settings.pop(symbol, None)
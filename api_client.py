@@ -1,14 +1,29 @@
 import requests
 from datetime import datetime, timezone
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 from urllib.parse import urljoin
 from utils import logger
 import time
+import threading
+from config import (
+    SIGNAL_PROVIDER_RPS, SIGNAL_PROVIDER_MAX_IN_FLIGHT,
+    SIGNAL_PROVIDER_ADAPTIVE, SIGNAL_PROVIDER_MIN_IN_FLIGHT,
+    SIGNAL_PROVIDER_LATENCY_TARGET, SIGNAL_PROVIDER_ERROR_RATE,
+    SIGNAL_CACHE_ENABLED, SIGNAL_CACHE_MAX_ENTRIES,
+    SHARED_SIGNAL_CACHE_ENABLED, SHARED_SIGNAL_CACHE_DB, SIGNAL_SINGLEFLIGHT_WAIT,
+    SIGNAL_HEDGE_ENABLED, SIGNAL_HEDGE_PERCENTILE, SIGNAL_HEDGE_MIN_DELAY, SIGNAL_HEDGE_MAX_PER_MINUTE
+)
+from provider_budget import ProviderRateBudget, AdaptiveConcurrencyLimiter, HedgePolicy
+import queue
+from signal_cache import SignalCache, SharedSignalStore, candle_close_time
+import sqlite3
 from tenacity import retry, stop_after_attempt, retry_if_exception, wait_fixed
 
 # Circuit Breaker Configuration
 CIRCUIT_BREAKER_THRESHOLD = 5  # Max consecutive 500 errors before pausing
 CIRCUIT_BREAKER_TIMEOUT = 60   # Seconds to pause after threshold
+# /multi_signal reports every confidence in percent (0-100), /signal as a fraction
+MULTI_SIGNAL_CONFIDENCE_SCALE = 100.0
 
 def is_500_error(e):
     """Check if exception is a 500 error"""
@@ -26,7 +41,37 @@ class APIClient:
         })
         self._consecutive_500s = 0
         self._circuit_tripped_until = 0
-        logger.info("API Client initialized")
+        self._state_lock = threading.Lock()  # Circuit breaker counters are shared by all threads
+        # Adaptive in-flight limit: grows while the provider is healthy, halves on 5xx/timeouts
+        limiter = AdaptiveConcurrencyLimiter(
+            min_limit=SIGNAL_PROVIDER_MIN_IN_FLIGHT,
+            max_limit=SIGNAL_PROVIDER_MAX_IN_FLIGHT,
+            latency_target=SIGNAL_PROVIDER_LATENCY_TARGET,
+            error_rate_threshold=SIGNAL_PROVIDER_ERROR_RATE
+        ) if SIGNAL_PROVIDER_ADAPTIVE else None
+        self.budget = ProviderRateBudget(SIGNAL_PROVIDER_RPS, SIGNAL_PROVIDER_MAX_IN_FLIGHT, limiter)
+        # Hedged /signal requests for the latency tail (None = disabled)
+        self.hedge = HedgePolicy(
+            percentile=SIGNAL_HEDGE_PERCENTILE,
+            min_delay=SIGNAL_HEDGE_MIN_DELAY,
+            max_per_minute=SIGNAL_HEDGE_MAX_PER_MINUTE
+        ) if SIGNAL_HEDGE_ENABLED else None
+        # Candle-aligned response cache shared by every consumer of this client
+        self.cache = SignalCache(SIGNAL_CACHE_MAX_ENTRIES) if SIGNAL_CACHE_ENABLED else None
+        # Cross-process cache + singleflight: one upstream call per key for all PATRIOT processes
+        self.shared = None
+        if SHARED_SIGNAL_CACHE_ENABLED:
+            try:
+                self.shared = SharedSignalStore(SHARED_SIGNAL_CACHE_DB, lease_seconds=SIGNAL_SINGLEFLIGHT_WAIT)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared signal store disabled: {e}")
+        logger.info(
+            f"API Client initialized (budget: {SIGNAL_PROVIDER_RPS} req/s, "
+            f"{SIGNAL_PROVIDER_MAX_IN_FLIGHT} in-flight{' adaptive' if limiter else ''}, "
+            f"cache: {SIGNAL_CACHE_MAX_ENTRIES if self.cache else 'off'}"
+            f"{' + shared' if self.shared else ''}, "
+            f"hedging: {f'p{SIGNAL_HEDGE_PERCENTILE:g}' if self.hedge else 'off'})"
+        )
 
     def _check_circuit_breaker(self):
         """Returns True if requests should be blocked"""
@@ -38,19 +83,42 @@ class APIClient:
 
     def _trip_circuit_breaker(self):
         """Activate the circuit breaker"""
-        self._circuit_tripped_until = time.time() + CIRCUIT_BREAKER_TIMEOUT
-        self._consecutive_500s = 0  # Reset counter after tripping
+        with self._state_lock:
+            self._circuit_tripped_until = time.time() + CIRCUIT_BREAKER_TIMEOUT
+            self._consecutive_500s = 0  # Reset counter after tripping
         logger.error(f"🚨 Circuit breaker triggered! Pausing for {CIRCUIT_BREAKER_TIMEOUT}s")
 
+    def get_signal(self, pair: str, timeframe: str, timeout: int = 10, use_cache: bool = True) -> Optional[Dict]:
+        """
+        Fetch trading signal for specified pair and timeframe.
+        Served from the candle-aligned cache when the current candle
+        was already fetched; only successful responses are cached.
+        """
+        if self.cache is not None and use_cache:
+            cached = self.cache.get(pair, timeframe)
+            if cached is not None:
+                logger.debug(f"Signal cache hit | {pair} {timeframe}")
+                return cached
+
+        signal = self._shared_fetch(
+            'signal', pair, [timeframe],
+            lambda: self._fetch_signal(pair, timeframe, timeout),
+            use_cache
+        )
+
+        if signal is not None and self.cache is not None:
+            self.cache.put(pair, timeframe, signal)
+        return signal
+
     @retry(
         stop=stop_after_attempt(3),
         retry=retry_if_exception(is_500_error),
         wait=wait_fixed(1),
         before_sleep=lambda _: logger.warning("Retrying after 500 error...")
     )
-    def get_signal(self, pair: str, timeframe: str, timeout: int = 10) -> Optional[Dict]:
+    def _fetch_signal(self, pair: str, timeframe: str, timeout: int = 10) -> Optional[Dict]:
         """
-        Fetch trading signal for specified pair and timeframe
+        Fetch trading signal from the provider
         with comprehensive error handling and logging.
         """
         if self._check_circuit_breaker():
@@ -60,13 +128,13 @@ class APIClient:
         url = urljoin(self.base_url, endpoint)
         
         try:
-            start_time = datetime.now(timezone.utc)
-            response = self.session.get(url, timeout=timeout)
-            elapsed = (datetime.now(timezone.utc) - start_time).total_seconds()
+            response, elapsed = self._hedged_get(url, timeout)
 
             if response.status_code == 500:
-                self._consecutive_500s += 1
-                if self._consecutive_500s >= CIRCUIT_BREAKER_THRESHOLD:
+                with self._state_lock:
+                    self._consecutive_500s += 1
+                    should_trip = self._consecutive_500s >= CIRCUIT_BREAKER_THRESHOLD
+                if should_trip:
                     self._trip_circuit_breaker()
                 response.raise_for_status()  # Trigger retry
 
@@ -82,7 +150,7 @@ class APIClient:
             confidence = float(data.get('confidence', 0)) * 100
 
             # Reset 500 counter on successful request
-            self._consecutive_500s = 0
+            self._reset_500_counter()
 
             logger.info(
                 f"Signal received | {pair} {timeframe} | "
@@ -93,22 +161,7 @@ class APIClient:
                 f"Latency: {elapsed:.3f}s"
             )
 
-            return {
-                'pair': data.get('pair'),
-                'timeframe': data.get('timeframe'),
-                'signal': data.get('signal'),
-                'current_price': float(data.get('current_price', 0)),
-                'entry_price': float(data.get('entry_price', 0)),   
-                'take_profit': float(data.get('take_profit', 0)),
-                'stop_loss': float(data.get('stop_loss', 0)),
-                'risk_reward': float(data.get('risk_reward', 0)),
-                'confidence': float(data.get('confidence', 0)),
-                'dominance': float(data.get('dominance', 0)),
-                'dominance_change_percent': float(data.get('dominance_change_percent', 0)),
-                'dominant_timeframe': data.get('dominant_timeframe', ''),
-                'description': data.get('description', ''),
-                'timestamp': datetime.now(timezone.utc).isoformat()
-            }
+            return self._normalize_signal(data)
 
         except requests.exceptions.HTTPError as e:
             if e.response.status_code != 500:  # Already handled 500s
@@ -121,6 +174,217 @@ class APIClient:
             logger.error(f"Unexpected error | {pair} {timeframe} | Error: {type(e).__name__}")
             return None
 
+    def get_multi_signals(self, pair: str, timeframes: List[str], timeout: int = 30,
+                          use_cache: bool = True) -> Dict[str, Dict]:
+        """
+        Fetch several timeframes for a pair with a single /multi_signal request.
+        Only simple entries are mapped into the get_signal() dict shape;
+        complex (main/correction) entries and failures are left out so the
+        caller can fall back to /signal for the missing timeframes.
+        """
+        signals: Dict[str, Dict] = {}
+        missing = list(timeframes)
+
+        if self.cache is not None and use_cache:
+            for tf in timeframes:
+                cached = self.cache.get(pair, tf)
+                if cached is not None:
+                    signals[tf] = cached
+            missing = [tf for tf in timeframes if tf not in signals]
+            if not missing:
+                logger.debug(f"Multi signal cache hit | {pair} {timeframes}")
+                return signals
+
+        raw = self.get_multi_signal_raw(pair, missing, timeout=timeout, use_cache=use_cache)
+        if not raw:
+            return signals
+
+        for entry in raw:
+            if not isinstance(entry, dict):
+                continue
+            tf = entry.get('timeframe')
+            if tf not in missing or 'main_signal' in entry or 'correction_signal' in entry:
+                continue
+            try:
+                signal = self._normalize_signal(entry, pair=pair, timeframe=tf)
+            except (TypeError, ValueError) as e:
+                logger.error(f"Multi signal parsing failed | {pair} {tf} | Error: {type(e).__name__}")
+                continue
+            # Fixed scale of the endpoint, not guessed per value (0.5% must stay 0.005)
+            signal['confidence'] = signal['confidence'] / MULTI_SIGNAL_CONFIDENCE_SCALE
+            signals[tf] = signal
+            if self.cache is not None:
+                self.cache.put(pair, tf, signal)
+
+        return signals
+
+    def get_multi_signal_raw(self, pair: str, timeframes: List[str], timeout: int = 30,
+                             use_cache: bool = True) -> Optional[List[Dict]]:
+        """
+        Raw /multi_signal response (list of simple and complex entries),
+        deduplicated across processes through the shared store.
+        """
+        return self._shared_fetch(
+            'multi_signal', pair, timeframes,
+            lambda: self._fetch_multi_signal_raw(pair, timeframes, timeout),
+            use_cache
+        )
+
+    def _shared_fetch(self, endpoint: str, pair: str, timeframes: List[str], fetch, use_cache: bool = True):
+        """Singleflight through the shared store, expiring at the nearest candle close"""
+        if self.shared is None or not use_cache:
+            return fetch()
+        try:
+            expires_at = candle_close_time(timeframes)
+        except ValueError:
+            return fetch()
+        key = self.shared.make_key(endpoint, pair, timeframes)
+        return self.shared.get_or_fetch(key, expires_at, fetch)
+
+    def _fetch_multi_signal_raw(self, pair: str, timeframes: List[str], timeout: int = 30) -> Optional[List[Dict]]:
+        """
+        Raw /multi_signal request under the shared provider budget
+        and circuit breaker.
+        """
+        if self._check_circuit_breaker():
+            return None
+
+        url = urljoin(self.base_url, "multi_signal")
+        params = [('pair', pair)] + [('timeframes', tf) for tf in timeframes]
+        params += [('lang', 'uk'), ('model_type', 'xgb')]
+
+        try:
+            response, elapsed = self._provider_get(url, timeout, params=params)
+
+            if response.status_code == 500:
+                with self._state_lock:
+                    self._consecutive_500s += 1
+                    should_trip = self._consecutive_500s >= CIRCUIT_BREAKER_THRESHOLD
+                if should_trip:
+                    self._trip_circuit_breaker()
+
+            if not response.ok:
+                self._log_error(response, pair, ",".join(timeframes), elapsed)
+                return None
+
+            data = response.json()
+            if not isinstance(data, list):
+                logger.error(f"Multi signal unexpected payload | {pair} | Type: {type(data).__name__}")
+                return None
+
+            self._reset_500_counter()
+            logger.info(
+                f"Multi signal received | {pair} {','.join(timeframes)} | "
+                f"Entries: {len(data)} | Latency: {elapsed:.3f}s"
+            )
+            return data
+
+        except ValueError as e:
+            logger.error(f"Multi signal parsing failed | {pair} | Error: {type(e).__name__}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error | {pair} multi_signal | Error: {type(e).__name__}")
+            return None
+
+    def _hedged_get(self, url: str, timeout: int, params=None) -> Tuple[requests.Response, float]:
+        """
+        GET with an optional speculative duplicate. If the primary request
+        is still running after the hedge delay (recent latency percentile),
+        an identical request is sent within the per-minute hedge budget.
+        The first successful response wins; the loser is ignored.
+        """
+        delay = self.hedge.hedge_delay() if self.hedge is not None else None
+        if delay is None:
+            return self._provider_get(url, timeout, params=params)
+
+        results: "queue.Queue[Tuple[bool, Optional[Tuple[requests.Response, float]], Optional[BaseException]]]" = queue.Queue()
+        decided = threading.Event()  # Aborts a hedge still waiting for a budget slot
+
+        def attempt(is_hedge: bool) -> None:
+            try:
+                results.put((is_hedge, self._provider_get(
+                    url, timeout, params=params, abort_event=decided if is_hedge else None
+                ), None))
+            except BaseException as e:
+                results.put((is_hedge, None, e))
+
+        started = time.monotonic()
+        threading.Thread(target=attempt, args=(False,), daemon=True, name="SignalPrimary").start()
+        pending = 1
+
+        try:
+            is_hedge, result, error = results.get(timeout=delay)
+            pending -= 1
+        except queue.Empty:
+            if self.hedge.try_consume():
+                logger.debug(f"Hedging request after {delay:.2f}s: {url}")
+                threading.Thread(target=attempt, args=(True,), daemon=True, name="SignalHedge").start()
+                pending += 1
+            is_hedge, result, error = results.get()
+            pending -= 1
+
+        # A failed first answer still leaves a chance for the other attempt
+        while (error is not None or result[0].status_code >= 500) and pending:
+            is_hedge, result, error = results.get()
+            pending -= 1
+
+        decided.set()
+        if error is not None:
+            raise error
+        if is_hedge:
+            self.hedge.record_win()
+            logger.debug(f"Hedge won after {time.monotonic() - started:.2f}s: {url}")
+        return result
+
+    def _provider_get(self, url: str, timeout: int, params=None,
+                      abort_event: Optional[threading.Event] = None) -> Tuple[requests.Response, float]:
+        """
+        GET to the provider under the shared budget (RPS + in-flight).
+        Every outcome is fed to the adaptive limiter: 5xx, timeouts and
+        connection errors count as failures.
+        """
+        with self.budget.request_slot(stop_event=abort_event):
+            start_time = datetime.now(timezone.utc)
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+            except requests.RequestException:
+                self.budget.record_result((datetime.now(timezone.utc) - start_time).total_seconds(), ok=False)
+                raise
+            elapsed = (datetime.now(timezone.utc) - start_time).total_seconds()
+
+        self.budget.record_result(elapsed, ok=response.status_code < 500)
+        if self.hedge is not None and response.ok:
+            self.hedge.record_latency(elapsed)
+        return response, elapsed
+
+    def _normalize_signal(self, data: Dict, pair: Optional[str] = None, timeframe: Optional[str] = None) -> Dict:
+        """Map a provider signal payload into the dict shape used by the pipeline"""
+        return {
+            'pair': data.get('pair') or pair,
+            'timeframe': data.get('timeframe') or timeframe,
+            'signal': data.get('signal'),
+            'current_price': float(data.get('current_price', 0)),
+            'entry_price': float(data.get('entry_price', 0)),   
+            'take_profit': float(data.get('take_profit', 0)),
+            'stop_loss': float(data.get('stop_loss', 0)),
+            'risk_reward': float(data.get('risk_reward', 0)),
+            'confidence': float(data.get('confidence', 0)),
+            'dominance': float(data.get('dominance', 0)),
+            'dominance_change_percent': float(data.get('dominance_change_percent', 0)),
+            'dominant_timeframe': data.get('dominant_timeframe', ''),
+            'description': data.get('description', ''),
+            'timestamp': datetime.now(timezone.utc).isoformat()
+        }
+
+    def _reset_500_counter(self) -> None:
+        """Reset consecutive 500 counter after a successful request"""
+        with self._state_lock:
+            self._consecutive_500s = 0
+
+    def get_cache_stats(self) -> Optional[Dict]:
+        """Signal cache statistics (None when the cache is disabled)"""
+        return self.cache.get_stats() if self.cache is not None else None
+
     def _log_error(self, response: requests.Response, pair: str, timeframe: str, elapsed: float) -> None:
         """Log API error responses"""
         error_msg = response.text.strip()[:200]
@@ -0,0 +1,141 @@
+"""
+Batch Orders - Пакетное размещение ордеров через /fapi/v1/batchOrders
+=====================================================================
+
+Вход + SL + TP (или пара SL + TP после исполнения входа) отправляются
+одним запросом futures_place_batch_order вместо 2-3 последовательных
+futures_create_order:
+- один round trip вместо трех
+- короче окно, в котором исполненная позиция стоит без защиты
+
+Binance обрабатывает каждую ногу пакета независимо: часть ног может
+быть принята, часть отклонена (в ответе {"code": ..., "msg": ...}).
+Пакет вход + SL + TP при частичном успехе откатывается, но SL/TP
+отменяются только если удалось отменить вход (anchor): исполненный
+вход без стопа хуже дубля. SL/TP уже открытой позиции размещаются с
+rollback=False - принятая нога остается, повторяется только недостающая.
+
+Author: HEDGER
+Version: 1.0
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from utils import logger
+
+# Лимит Binance на количество ордеров в одном batchOrders запросе
+MAX_BATCH_ORDERS = 5
+
+
+@dataclass
+class BatchOrderResult:
+    """Результат пакетного размещения (порядок ног совпадает с запросом)"""
+    orders: List[Optional[Dict[str, Any]]]
+    errors: List[Optional[str]]
+    rolled_back: List[str] = field(default_factory=list)
+
+    @property
+    def success(self) -> bool:
+        """Все ноги размещены"""
+        return all(order is not None for order in self.orders) and not any(self.errors)
+
+    @property
+    def order_ids(self) -> List[Optional[str]]:
+        """ID размещенных ордеров по ногам (None для неразмещенных)"""
+        return [str(order['orderId']) if order else None for order in self.orders]
+
+    @property
+    def kept_order_ids(self) -> List[str]:
+        """Принятые и не откатанные ордера (остались на бирже)"""
+        return [order_id for order_id in self.order_ids if order_id and order_id not in self.rolled_back]
+
+    def error_summary(self) -> str:
+        """Ошибки ног одной строкой для логов и уведомлений"""
+        return "; ".join(f"leg {i + 1}: {error}" for i, error in enumerate(self.errors) if error)
+
+
+def _to_batch_params(order: Dict[str, Any]) -> Dict[str, str]:
+    """batchOrders принимает JSON, все значения - строки"""
+    return {key: str(value) for key, value in order.items() if value is not None}
+
+
+def _cancel_leg(client: Any, params: Dict[str, Any], order: Dict[str, Any], result: BatchOrderResult) -> bool:
+    """Отменяет принятую ногу пакета"""
+    try:
+        client.futures_cancel_order(symbol=params['symbol'], orderId=order['orderId'])
+    except Exception as e:
+        logger.error(f"❌ Не удалось откатить ордер {order['orderId']} ({params['symbol']}): {e}")
+        return False
+    result.rolled_back.append(str(order['orderId']))
+    logger.warning(f"↩️ Откат ноги пакета {params['symbol']}: ордер {order['orderId']} отменен")
+    return True
+
+
+def _rollback(client: Any, orders: List[Dict[str, Any]], result: BatchOrderResult,
+              anchor: Optional[int]) -> None:
+    """Отменяет принятые ноги; при anchor - остальные только после отмены anchor ноги"""
+    if anchor is not None:
+        entry = result.orders[anchor]
+        if entry is not None and not _cancel_leg(client, orders[anchor], entry, result):
+            # Вход уже исполнен (или отмена не прошла) - SL/TP защищают позицию
+            logger.warning(f"⚠️ Вход {entry['orderId']} не отменен - SL/TP пакета оставлены на бирже")
+            return
+    for index, (order, params) in enumerate(zip(result.orders, orders)):
+        if order is None or index == anchor:
+            continue
+        _cancel_leg(client, params, order, result)
+
+
+def place_batch_orders(client: Any, orders: List[Dict[str, Any]], rollback: bool = True,
+                       anchor: Optional[int] = None) -> BatchOrderResult:
+    """
+    Размещает группу ордеров одним запросом batchOrders
+
+    Args:
+        client: binance.client.Client (futures_place_batch_order / futures_cancel_order)
+        orders: Параметры ордеров в формате futures_create_order (symbol, side, type, ...)
+        rollback: Отменять успешные ноги, если хотя бы одна нога отклонена
+        anchor: Индекс ноги входа: остальные ноги откатываются, только если
+            вход удалось отменить (иначе он исполнен и SL/TP нужны позиции)
+
+    Returns:
+        BatchOrderResult: Ордера и ошибки по ногам
+    """
+    if not orders:
+        return BatchOrderResult(orders=[], errors=[])
+    if len(orders) > MAX_BATCH_ORDERS:
+        raise ValueError(f"batchOrders supports at most {MAX_BATCH_ORDERS} orders, got {len(orders)}")
+
+    try:
+        response = client.futures_place_batch_order(
+            batchOrders=[_to_batch_params(order) for order in orders]
+        )
+    except Exception as e:
+        # Запрос целиком не прошел - ни одна нога не размещена
+        logger.error(f"❌ Ошибка пакетного размещения ордеров: {e}")
+        return BatchOrderResult(orders=[None] * len(orders), errors=[str(e)] * len(orders))
+
+    placed: List[Optional[Dict[str, Any]]] = []
+    errors: List[Optional[str]] = []
+    for index in range(len(orders)):
+        leg = response[index] if isinstance(response, list) and index < len(response) else None
+        if isinstance(leg, dict) and 'orderId' in leg:
+            placed.append(leg)
+            errors.append(None)
+        else:
+            placed.append(None)
+            if isinstance(leg, dict):
+                errors.append(f"{leg.get('code')}: {leg.get('msg')}")
+            else:
+                errors.append("no response for leg")
+
+    result = BatchOrderResult(orders=placed, errors=errors)
+    if result.success:
+        logger.info(f"✅ Пакет из {len(orders)} ордеров размещен: {', '.join(result.order_ids)}")
+        return result
+
+    logger.error(f"❌ Пакет ордеров размещен частично: {result.error_summary()}")
+    if rollback:
+        _rollback(client, orders, result, anchor)
+    return result
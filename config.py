@@ -82,6 +82,31 @@ API_CLIENT_CONFIG = {
     'timeout': API_TIMEOUT
 }
 
+# Бюджет запросов к провайдеру сигналов (общий для всех потоков процесса)
+SIGNAL_PROVIDER_RPS = float(os.getenv("SIGNAL_PROVIDER_RPS", "1.0"))  # Максимум запросов в секунду (0 = без ограничения)
+SIGNAL_PROVIDER_MAX_IN_FLIGHT = int(os.getenv("SIGNAL_PROVIDER_MAX_IN_FLIGHT", "4"))  # Максимум одновременных запросов
+
+# Adaptive (AIMD) лимит in-flight в пределах [MIN_IN_FLIGHT, MAX_IN_FLIGHT]
+SIGNAL_PROVIDER_ADAPTIVE = os.getenv("SIGNAL_PROVIDER_ADAPTIVE", "true").lower() == "true"
+SIGNAL_PROVIDER_MIN_IN_FLIGHT = int(os.getenv("SIGNAL_PROVIDER_MIN_IN_FLIGHT", "1"))
+SIGNAL_PROVIDER_LATENCY_TARGET = float(os.getenv("SIGNAL_PROVIDER_LATENCY_TARGET", "10.0"))  # Допустимый p95 (сек), XGBoost ~7s
+SIGNAL_PROVIDER_ERROR_RATE = float(os.getenv("SIGNAL_PROVIDER_ERROR_RATE", "0.1"))  # Допустимая доля ошибок в окне
+
+# Hedged запросы: дубль /signal, если ответа нет дольше перцентиля недавней латентности
+SIGNAL_HEDGE_ENABLED = os.getenv("SIGNAL_HEDGE_ENABLED", "false").lower() == "true"
+SIGNAL_HEDGE_PERCENTILE = float(os.getenv("SIGNAL_HEDGE_PERCENTILE", "95"))  # Перцентиль латентности для дубля
+SIGNAL_HEDGE_MIN_DELAY = float(os.getenv("SIGNAL_HEDGE_MIN_DELAY", "2.0"))  # Минимальная задержка дубля (сек)
+SIGNAL_HEDGE_MAX_PER_MINUTE = int(os.getenv("SIGNAL_HEDGE_MAX_PER_MINUTE", "10"))  # Бюджет дублей в минуту
+
+# Кэш сигналов (ключ: пара + таймфрейм + свеча, истекает на закрытии свечи)
+SIGNAL_CACHE_ENABLED = os.getenv("SIGNAL_CACHE_ENABLED", "true").lower() == "true"
+SIGNAL_CACHE_MAX_ENTRIES = int(os.getenv("SIGNAL_CACHE_MAX_ENTRIES", "512"))  # LRU лимит записей
+
+# Общий для всех процессов PATRIOT кэш + singleflight (SQLite)
+SHARED_SIGNAL_CACHE_ENABLED = os.getenv("SHARED_SIGNAL_CACHE_ENABLED", "true").lower() == "true"
+SHARED_SIGNAL_CACHE_DB = os.getenv("SHARED_SIGNAL_CACHE_DB", "signal_cache.db")
+SIGNAL_SINGLEFLIGHT_WAIT = float(os.getenv("SIGNAL_SINGLEFLIGHT_WAIT", "60"))  # Сколько ждать чужой запрос того же ключа (сек)
+
 # --- Trading Configuration ---
 TIMEFRAMES: List[str] = ['1h','4h']  # Consistent lowercase timeframe format '15m'
 
@@ -101,12 +126,32 @@ else:
     BINANCE_API_SECRET = os.getenv("BINANCE_MAINNET_API_SECRET", "")
     NETWORK_MODE = "MAINNET"
 
+# --- Paper Trading (локальный симулятор биржи paper_exchange.py) ---
+PAPER_TRADING = os.getenv("PAPER_TRADING", "false").lower() == "true"
+PAPER_EXCHANGE_URL = os.getenv("PAPER_EXCHANGE_URL", "")  # HTTP симулятор, общий для процессов (пусто = in-process)
+PAPER_INITIAL_BALANCE = float(os.getenv("PAPER_INITIAL_BALANCE", "10000"))  # Начальный баланс USDT симулятора
+PAPER_LATENCY_MS = float(os.getenv("PAPER_LATENCY_MS", "0"))  # Максимальная задержка ответа симулятора (мс)
+PAPER_PRICES_FILE = os.getenv("PAPER_PRICES_FILE", "paper_prices.json")  # Начальные цены симулятора ({"BTCUSDT": 65000.0, ...})
+PAPER_PRICE_INTERVAL = float(os.getenv("PAPER_PRICE_INTERVAL", "1"))  # Шаг драйвера цен симулятора (сек, 0 = цены стоят)
+PAPER_PRICE_VOLATILITY = float(os.getenv("PAPER_PRICE_VOLATILITY", "0.002"))  # Волатильность шага цены (доля цены)
+if PAPER_TRADING:
+    # Симулятору ключи не нужны, но модули проверяют их наличие перед созданием клиента
+    BINANCE_API_KEY = BINANCE_API_KEY or "paper"
+    BINANCE_API_SECRET = BINANCE_API_SECRET or "paper"
+    NETWORK_MODE = "PAPER"
+
 # Проверяем наличие ключей для выбранного режима
 if not BINANCE_API_KEY or not BINANCE_API_SECRET:
     missing_env = "TESTNET" if BINANCE_TESTNET else "MAINNET"
     print(f"⚠️  WARNING: Binance {missing_env} API keys not configured!")
     print(f"Required environment variables: BINANCE_{missing_env}_API_KEY, BINANCE_{missing_env}_API_SECRET")
 
+# Общий для всех процессов бюджет REST weight (weight_governor.py)
+BINANCE_GOVERNOR_ENABLED = os.getenv("BINANCE_GOVERNOR_ENABLED", "true").lower() == "true"
+BINANCE_USAGE_DB = os.getenv("BINANCE_USAGE_DB", "binance_usage.db")  # SQLite учета weight/банов
+BINANCE_WEIGHT_LIMIT = int(os.getenv("BINANCE_WEIGHT_LIMIT", "2400"))  # REQUEST_WEIGHT лимит в минуту на IP
+BINANCE_GOVERNOR_MAX_WAIT = float(os.getenv("BINANCE_GOVERNOR_MAX_WAIT", "65"))  # Максимальная задержка некритичного запроса (сек)
+
 # Настройки торговли фьючерсами
 RISK_PERCENT = float(os.getenv("RISK_PERCENT", "2.0"))  # Процент от капитала на сделку (по умолчанию 2%)
 FUTURES_LEVERAGE = int(os.getenv("FUTURES_LEVERAGE", "20"))  # Плечо для фьючерсов (по умолчанию 30x)
@@ -116,6 +161,28 @@ PRICE_TOLERANCE_PERCENT = float(os.getenv("PRICE_TOLERANCE_PERCENT", "0.5"))  #
 # 🔧 Настройки управления позициями
 MULTIPLE_ORDERS = os.getenv("MULTIPLE_ORDERS", "false").lower() == "true"  # Разрешить несколько ордеров на один тикер
 MAX_CONCURRENT_ORDERS = int(os.getenv("MAX_CONCURRENT_ORDERS","3"))  # Максимум одновременных ордеров на инструмент
+ACCOUNT_STATE_TTL = float(os.getenv("ACCOUNT_STATE_TTL", "5"))  # TTL снимка account/positions/open orders в OrderExecutor (сек)
+SYMBOL_SETTINGS_FILE = os.getenv("SYMBOL_SETTINGS_FILE", "symbol_settings.json")  # Реестр примененных плеча/режима маржи по символам
+BATCH_ORDERS_ENABLED = os.getenv("BATCH_ORDERS_ENABLED", "true").lower() == "true"  # Вход/SL/TP одним batchOrders запросом (false = последовательно)
+LIFECYCLE_STATE_FILE = os.getenv("LIFECYCLE_STATE_FILE", "order_lifecycle_state.json")  # Pending ордера и их таймауты (переживают перезапуск)
+WATCHDOG_RPC_ENABLED = os.getenv("WATCHDOG_RPC_ENABLED", "true").lower() == "true"  # Запросы к Orders Watchdog через сокет (false = только файл)
+WATCHDOG_RPC_SOCKET = os.getenv("WATCHDOG_RPC_SOCKET", "orders_watchdog.sock")  # Unix сокет Orders Watchdog
+WATCHDOG_RPC_PORT = int(os.getenv("WATCHDOG_RPC_PORT", "0"))  # localhost TCP порт вместо Unix сокета (0 = сокет)
+WATCHDOG_RPC_TIMEOUT = float(os.getenv("WATCHDOG_RPC_TIMEOUT", "2.0"))  # Таймаут запроса к Orders Watchdog (сек)
+ORDER_EVENTS_SOURCE = os.getenv("ORDER_EVENTS_SOURCE", "stream")  # События ордеров для watchdog: stream | replay | off (только REST)
+ORDER_EVENTS_REPLAY_FILE = os.getenv("ORDER_EVENTS_REPLAY_FILE", "")  # JSONL записанных сообщений user data stream (для replay)
+ORDER_EVENTS_REPLAY_SPEED = float(os.getenv("ORDER_EVENTS_REPLAY_SPEED", "0"))  # Ускорение replay (0 = без задержек)
+ORDER_EVENTS_RECORD_FILE = os.getenv("ORDER_EVENTS_RECORD_FILE", "")  # Запись сырых сообщений stream в JSONL (пусто = не писать)
+WATCHDOG_REST_SAFETY_INTERVAL = float(os.getenv("WATCHDOG_REST_SAFETY_INTERVAL", "60"))  # REST сверка ордеров при активном stream (сек)
+ORDER_EVENTS_BUFFER_TTL = float(os.getenv("ORDER_EVENTS_BUFFER_TTL", "120"))  # Хранение событий еще не зарегистрированных ордеров (сек)
+WATCHDOG_SNAPSHOT_MODE = os.getenv("WATCHDOG_SNAPSHOT_MODE", "true").lower() == "true"  # Один снимок open orders + позиций на цикл watchdog вместо запроса на ордер
+WATCHDOG_JOURNAL_COMPACT_EVERY = int(os.getenv("WATCHDOG_JOURNAL_COMPACT_EVERY", "200"))  # Записей журнала состояния watchdog до пересборки снимка
+PRICE_FEED_SOURCE = os.getenv("PRICE_FEED_SOURCE", "rest")  # Таблица цен (price_feed.py): rest | stream (markPrice) | replay
+PRICE_FEED_REPLAY_FILE = os.getenv("PRICE_FEED_REPLAY_FILE", "")  # JSONL записанных сообщений markPrice (для replay)
+PRICE_FEED_MAX_AGE = float(os.getenv("PRICE_FEED_MAX_AGE", "5"))  # Максимальный возраст цены в OrderExecutor (сек)
+PRICE_TRIGGERS_ENABLED = os.getenv("PRICE_TRIGGERS_ENABLED", "true").lower() == "true"  # Проверять pending/SL/TP только при подходе цены к уровню (без user data stream)
+PRICE_TRIGGER_TOLERANCE = float(os.getenv("PRICE_TRIGGER_TOLERANCE", "0.002"))  # Близость цены к уровню для проверки ордера (доля, 0.002 = 0.2%)
+PRICE_TRIGGER_SWEEP_INTERVAL = float(os.getenv("PRICE_TRIGGER_SWEEP_INTERVAL", "60"))  # Полная REST проверка всех ордеров при price triggers (сек)
 
 # --- Telegram Configuration ---
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_TOKEN", "7948515996:AAHg9Tnvex3xyRc0rjnMscYTbHM1EUU5-d4")
@@ -141,6 +208,30 @@ TICKER_DELAY = 7.0              # Задержка между обработко
 MAX_WORKERS = 1                 # Максимальное количество рабочих потоков
 PROCESSING_TIMEOUT = 900        # Максимальное время обработки батча (секунды) - reduced from 1800
 
+# Конкурентная загрузка сигналов (вместо TICKER_DELAY темп задает бюджет провайдера)
+CONCURRENT_FETCH = os.getenv("CONCURRENT_FETCH", "true").lower() == "true"
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "4"))  # Количество воркеров в конкурентном режиме
+
+# Параллельная загрузка таймфреймов внутри одного тикера
+PARALLEL_TIMEFRAMES = os.getenv("PARALLEL_TIMEFRAMES", "true").lower() == "true"
+
+# Конвейер батча: загрузка сигналов -> анализ схождений -> исполнение ордеров
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "true").lower() == "true"
+PIPELINE_ANALYSIS_WORKERS = int(os.getenv("PIPELINE_ANALYSIS_WORKERS", "1"))  # Воркеры анализа схождений
+PIPELINE_EXECUTION_WORKERS = int(os.getenv("PIPELINE_EXECUTION_WORKERS", "1"))  # Воркеры исполнения (Binance + Telegram)
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))  # Размер очередей между стадиями
+
+# Приоритетный порядок тикеров (экспозиция, близость к схождению, hit rate)
+PRIORITY_SCHEDULING = os.getenv("PRIORITY_SCHEDULING", "true").lower() == "true"
+TICKER_STATE_FILE = os.getenv("TICKER_STATE_FILE", "ticker_state.json")
+
+# Инкрементальный режим: пропуск тикеров, чьи сигналы не изменились с прошлого батча
+INCREMENTAL_MODE = os.getenv("INCREMENTAL_MODE", "false").lower() == "true"
+SIGNAL_FINGERPRINTS_FILE = os.getenv("SIGNAL_FINGERPRINTS_FILE", "signal_fingerprints.json")
+
+# Batched режим: один запрос /multi_signal на тикер, fallback на /signal
+BATCHED_SIGNAL_FETCH = os.getenv("BATCHED_SIGNAL_FETCH", "false").lower() == "true"
+
 # Настройки планировщика
 SCHEDULE_INTERVAL_MINUTES = 15  # Интервал запуска обработки (минуты)
 SCHEDULE_AT_SECOND = ":00"      # На какой секунде запускать
@@ -150,6 +241,8 @@ DEFAULT_TICKERS_FILE = 'tickers.txt'  # Файл с тикерами по умо
 
 # Настройки статистики и логирования
 BATCH_LOG_FREQUENCY = 50        # Логировать каждые N оставшихся тикеров (увеличено для меньшего шума)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"  # Трассировка латентности сигнал -> ордер (tracing.py)
+TRACE_FILE = os.getenv("TRACE_FILE", str(LOG_DIR / 'traces.jsonl'))  # JSONL файл span'ов трассировки
 
 def reload_trading_config():
     """
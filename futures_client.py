@@ -0,0 +1,69 @@
+"""
+Futures Client - Единая точка создания клиента Binance Futures
+==============================================================
+
+Все компоненты PATRIOT (OrderExecutor, OrdersWatchdog, UnifiedSynchronizer,
+OrderSyncService, websocket_monitor, symbol_cache) создают клиента здесь,
+а не через binance.client.Client напрямую:
+- PAPER_TRADING=false - обычный binance.client.Client
+- PAPER_TRADING=true, PAPER_EXCHANGE_URL пуст - общий in-process PaperExchange
+- PAPER_TRADING=true, PAPER_EXCHANGE_URL задан - binance.client.Client,
+  направленный на HTTP симулятор (один симулятор на все процессы)
+
+Клиенты, идущие по HTTP, оборачиваются в weight_governor.GovernedClient:
+общий для процессов бюджет weight и остановка запросов при 429/418.
+
+Author: HEDGER
+Version: 1.1
+"""
+
+from typing import Any
+
+from config import PAPER_TRADING, PAPER_EXCHANGE_URL, PAPER_INITIAL_BALANCE, PAPER_LATENCY_MS, BINANCE_GOVERNOR_ENABLED
+from utils import logger
+from weight_governor import GovernedClient, get_weight_governor, PRIORITY_NORMAL
+
+
+def _create_binance_client(api_key: str, api_secret: str, testnet: bool) -> Any:
+    """binance.client.Client (импорт здесь - python-binance опционален для paper режима)"""
+    from binance.client import Client
+    return Client(api_key=api_key, api_secret=api_secret, testnet=testnet)
+
+
+def _govern(client: Any, priority: str) -> Any:
+    """Оборачивает клиента в общий бюджет weight (если включен)"""
+    if not BINANCE_GOVERNOR_ENABLED:
+        return client
+    return GovernedClient(client, get_weight_governor(), priority)
+
+
+def create_futures_client(api_key: str, api_secret: str, testnet: bool = False,
+                          priority: str = PRIORITY_NORMAL) -> Any:
+    """
+    Создает клиента Binance Futures с учетом paper режима
+
+    Args:
+        api_key: Binance API key (в paper режиме может быть любым)
+        api_secret: Binance API secret
+        testnet: Использовать testnet (игнорируется в paper режиме)
+        priority: Приоритет вызовов в бюджете weight ('normal' / 'low' для
+            sync сканов и отчетов); создание/отмена ордеров всегда critical
+
+    Returns:
+        binance.client.Client (GovernedClient) или PaperExchange с тем же набором futures_* методов
+    """
+    if not PAPER_TRADING:
+        return _govern(_create_binance_client(api_key, api_secret, testnet), priority)
+
+    if PAPER_EXCHANGE_URL:
+        client = _create_binance_client(api_key or 'paper', api_secret or 'paper', False)
+        client.FUTURES_URL = PAPER_EXCHANGE_URL.rstrip('/') + '/fapi'
+        logger.info(f"🧪 PAPER TRADING: Binance Futures API -> {PAPER_EXCHANGE_URL}")
+        return _govern(client, priority)
+
+    from paper_exchange import get_paper_exchange
+    logger.info("🧪 PAPER TRADING: in-process симулятор биржи")
+    return get_paper_exchange(
+        initial_balance=PAPER_INITIAL_BALANCE,
+        latency_ms=(0.0, PAPER_LATENCY_MS)
+    )
@@ -28,6 +28,8 @@ from config import (
     BINANCE_API_KEY, BINANCE_API_SECRET, NETWORK_MODE, FUTURES_LEVERAGE, RISK_PERCENT
 )
 from utils import logger
+from futures_client import create_futures_client
+from weight_governor import PRIORITY_LOW
 
 # Binance
 try:
@@ -69,9 +71,11 @@ class FuturesMonitor:
                 
             logger.info(f"🔧 Подключение к Binance {NETWORK_MODE}...")
             
-            self.client = Client(
+            # Отчет - низкий приоритет в общем бюджете weight
+            self.client = create_futures_client(
                 api_key=BINANCE_API_KEY,
-                api_secret=BINANCE_API_SECRET
+                api_secret=BINANCE_API_SECRET,
+                priority=PRIORITY_LOW
             )
             
             # Тест подключения
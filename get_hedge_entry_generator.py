@@ -20,6 +20,13 @@ except ImportError:
     TELEGRAM_AVAILABLE = False
     telegram_bot = None
 
+# Общий api_client: бюджет провайдера + межпроцессный кэш/singleflight
+try:
+    from api_client import api_client
+except ImportError:
+    print("⚠️ api_client не найден, запросы идут напрямую к API")
+    api_client = None
+
 # Формируем api_client для получения сигналов
 class MultiSignalAnalyzer:
     def __init__(self, ticker: str):
@@ -35,6 +42,14 @@ class MultiSignalAnalyzer:
         start_time = time.time()
         response_time = 0.0
         
+        if api_client is not None:
+            # Один запрос на (pair, timeframes) для всех процессов PATRIOT
+            data = api_client.get_multi_signal_raw(self.ticker, self.timeframes)
+            response_time = round(time.time() - start_time, 2)
+            if data is None:
+                print("❌ Ошибка API: multi_signal недоступен")
+            return data, response_time
+
         try:
             # Формируем URL с множественными параметрами timeframes
             url_parts = [f"{self.api_url}?pair={self.ticker}"]
@@ -0,0 +1,313 @@
+"""
+Order Events - События ордеров из user data stream Binance Futures
+==================================================================
+
+OrdersWatchdog опрашивал futures_get_order по каждому pending ордеру и
+по паре SL/TP каждой позиции раз в 5 секунд: O(ордеров) подписанных
+запросов за цикл и до 5 секунд задержки обнаружения исполнения.
+
+Источники событий (start(callback) / stop() / connected):
+- UserDataStreamSource - ORDER_TRADE_UPDATE / ACCOUNT_UPDATE через
+  python-binance ThreadedWebsocketManager (listenKey keepalive - внутри);
+  сырые сообщения можно записывать в JSONL (record_file)
+- ReplayEventSource - воспроизводит записанный JSONL без сети
+  (тесты, разбор инцидентов, paper trading)
+
+Callback получает OrderEvent (ORDER_TRADE_UPDATE) или PositionEvent
+(каждая позиция из ACCOUNT_UPDATE). REST опрос в watchdog остается
+редкой страховкой (WATCHDOG_REST_SAFETY_INTERVAL).
+
+Author: HEDGER
+Version: 1.0
+"""
+
+import json
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from utils import logger
+
+
+@dataclass
+class OrderEvent:
+    """Обновление ордера (ORDER_TRADE_UPDATE)"""
+    symbol: str
+    order_id: str
+    status: str  # NEW / PARTIALLY_FILLED / FILLED / CANCELED / EXPIRED / REJECTED
+    execution_type: str  # NEW / TRADE / CANCELED / EXPIRED / AMENDMENT
+    side: str
+    position_side: str
+    order_type: str
+    price: float
+    stop_price: float
+    avg_price: float
+    quantity: float
+    filled_quantity: float
+    realized_pnl: float
+    event_time: int
+    raw: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_message(cls, message: Dict[str, Any]) -> 'OrderEvent':
+        o = message['o']
+        return cls(
+            symbol=o['s'],
+            order_id=str(o['i']),
+            status=o['X'],
+            execution_type=o.get('x', ''),
+            side=o.get('S', ''),
+            position_side=o.get('ps', 'BOTH'),
+            order_type=o.get('o', ''),
+            price=float(o.get('p') or 0),
+            stop_price=float(o.get('sp') or 0),
+            avg_price=float(o.get('ap') or 0),
+            quantity=float(o.get('q') or 0),
+            filled_quantity=float(o.get('z') or 0),
+            realized_pnl=float(o.get('rp') or 0),
+            event_time=int(message.get('E') or o.get('T') or 0),
+            raw=message
+        )
+
+    def to_order_info(self) -> Dict[str, Any]:
+        """Ордер в формате ответа futures_get_order (для существующих обработчиков)"""
+        return {
+            'symbol': self.symbol,
+            'orderId': int(self.order_id) if self.order_id.isdigit() else self.order_id,
+            'status': self.status,
+            'side': self.side,
+            'positionSide': self.position_side,
+            'type': self.order_type,
+            'price': str(self.price),
+            'stopPrice': str(self.stop_price),
+            'avgPrice': str(self.avg_price),
+            'origQty': str(self.quantity),
+            'executedQty': str(self.filled_quantity),
+            'updateTime': self.event_time,
+        }
+
+
+@dataclass
+class PositionEvent:
+    """Изменение позиции (элемент a.P из ACCOUNT_UPDATE)"""
+    symbol: str
+    position_side: str
+    amount: float
+    entry_price: float
+    reason: str
+    event_time: int
+
+    @property
+    def is_closed(self) -> bool:
+        return self.amount == 0
+
+
+OrderStreamEvent = Union[OrderEvent, PositionEvent]
+EventCallback = Callable[[OrderStreamEvent], None]
+
+
+def parse_user_data_message(message: Dict[str, Any]) -> List[OrderStreamEvent]:
+    """Сырое сообщение user data stream -> события (прочие типы игнорируются)"""
+    event_type = message.get('e')
+    if event_type == 'ORDER_TRADE_UPDATE':
+        return [OrderEvent.from_message(message)]
+    if event_type == 'ACCOUNT_UPDATE':
+        account = message.get('a', {})
+        return [
+            PositionEvent(
+                symbol=p['s'],
+                position_side=p.get('ps', 'BOTH'),
+                amount=float(p.get('pa') or 0),
+                entry_price=float(p.get('ep') or 0),
+                reason=account.get('m', ''),
+                event_time=int(message.get('E') or 0)
+            )
+            for p in account.get('P', [])
+        ]
+    return []
+
+
+class _EventSource(ABC):
+    """Общая часть источников: разбор сообщений и вызов callback"""
+
+    def __init__(self):
+        self._callback: Optional[EventCallback] = None
+        self._connected = threading.Event()
+        self.events_received = 0
+        self.live_transitions = 0  # Сколько раз поток становился активным (старт / после разрыва)
+
+    @property
+    def connected(self) -> bool:
+        """Поток событий активен (иначе watchdog опрашивает REST как раньше)"""
+        return self._connected.is_set()
+
+    def _mark_live(self) -> None:
+        """Поток подтвердил работу; переход из разрыва - сигнал watchdog на REST сверку"""
+        if not self._connected.is_set():
+            self._connected.set()
+            self.live_transitions += 1
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        try:
+            events = parse_user_data_message(message)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Некорректное сообщение user data stream: {e}")
+            return
+        for event in events:
+            self.events_received += 1
+            if self._callback:
+                try:
+                    self._callback(event)
+                except Exception as e:
+                    logger.error(f"❌ Ошибка обработки события {type(event).__name__}: {e}")
+
+    @abstractmethod
+    def start(self, callback: EventCallback) -> None:
+        """Запускает источник; события передаются в callback"""
+
+    @abstractmethod
+    def stop(self) -> None:
+        """Останавливает источник"""
+
+
+class UserDataStreamSource(_EventSource):
+    """User data stream Binance Futures (python-binance ThreadedWebsocketManager)"""
+
+    def __init__(self, api_key: str, api_secret: str, testnet: bool = False,
+                 record_file: Optional[str] = None):
+        """
+        Args:
+            api_key: Binance API key
+            api_secret: Binance API secret
+            testnet: Использовать testnet
+            record_file: JSONL для записи сырых сообщений (для ReplayEventSource)
+        """
+        super().__init__()
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.testnet = testnet
+        self.record_file = Path(record_file) if record_file else None
+        self._manager: Any = None
+        self._record_lock = threading.Lock()
+
+    def start(self, callback: EventCallback) -> None:
+        from binance import ThreadedWebsocketManager
+
+        self._callback = callback
+        self._manager = ThreadedWebsocketManager(
+            api_key=self.api_key, api_secret=self.api_secret, testnet=self.testnet
+        )
+        self._manager.start()
+        self._manager.start_futures_user_socket(callback=self._on_message)
+        # Активным поток считается после первого сообщения: до этого подключение
+        # не подтверждено и watchdog опрашивает REST как раньше
+        logger.info("📡 User data stream запущен (ORDER_TRADE_UPDATE / ACCOUNT_UPDATE)")
+
+    def _on_message(self, message: Dict[str, Any]) -> None:
+        if message.get('e') in ('error', 'listenKeyExpired'):
+            # python-binance переподключается сам; до следующего сообщения - REST
+            if self._connected.is_set():
+                logger.warning(f"⚠️ User data stream: {message.get('m') or message.get('e')}")
+            self._connected.clear()
+            return
+        self._mark_live()
+        self._record(message)
+        self._dispatch(message)
+
+    def _record(self, message: Dict[str, Any]) -> None:
+        if not self.record_file:
+            return
+        try:
+            with self._record_lock:
+                with open(self.record_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(message, ensure_ascii=False) + '\n')
+        except OSError as e:
+            logger.debug(f"User data stream record failed: {e}")
+
+    def stop(self) -> None:
+        self._connected.clear()
+        if self._manager:
+            self._manager.stop()
+            self._manager = None
+
+
+class ReplayEventSource(_EventSource):
+    """
+    Воспроизведение записанных сообщений user data stream
+
+    Интервалы между сообщениями берутся из поля E (event time, мс) и
+    делятся на speed; speed=0 - без задержек.
+    """
+
+    def __init__(self, messages: Union[str, Path, Iterable[Dict[str, Any]]], speed: float = 0.0):
+        """
+        Args:
+            messages: Путь к JSONL (по сообщению на строку) или список сообщений
+            speed: Ускорение воспроизведения (0 - мгновенно)
+        """
+        super().__init__()
+        if isinstance(messages, (str, Path)):
+            with open(messages, 'r', encoding='utf-8') as f:
+                self.messages = [json.loads(line) for line in f if line.strip()]
+        else:
+            self.messages = list(messages)
+        self.speed = speed
+        self.finished = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, callback: EventCallback) -> None:
+        self._callback = callback
+        self._mark_live()
+        self._thread = threading.Thread(target=self._run, name='OrderEventsReplay', daemon=True)
+        self._thread.start()
+        logger.info(f"📼 Replay источника событий: {len(self.messages)} сообщений")
+
+    def _run(self) -> None:
+        previous_time: Optional[int] = None
+        for message in self.messages:
+            if self._stop.is_set():
+                break
+            event_time = message.get('E')
+            if self.speed and previous_time is not None and event_time:
+                delay = (event_time - previous_time) / 1000.0 / self.speed
+                if delay > 0 and self._stop.wait(delay):
+                    break
+            previous_time = event_time or previous_time
+            self._dispatch(message)
+        # Запись закончилась - дальше событий не будет, watchdog возвращается к REST
+        self._connected.clear()
+        self.finished.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._connected.clear()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+def create_order_event_source(api_key: str, api_secret: str, testnet: bool = False) -> Optional[_EventSource]:
+    """
+    Источник событий по настройкам config (None - только REST опрос)
+
+    ORDER_EVENTS_SOURCE: stream | replay | off
+    """
+    from config import (
+        ORDER_EVENTS_SOURCE, ORDER_EVENTS_REPLAY_FILE, ORDER_EVENTS_RECORD_FILE,
+        ORDER_EVENTS_REPLAY_SPEED, PAPER_TRADING
+    )
+
+    source = ORDER_EVENTS_SOURCE.lower()
+    if source == 'replay':
+        if not ORDER_EVENTS_REPLAY_FILE:
+            logger.warning("⚠️ ORDER_EVENTS_SOURCE=replay без ORDER_EVENTS_REPLAY_FILE - только REST")
+            return None
+        return ReplayEventSource(ORDER_EVENTS_REPLAY_FILE, ORDER_EVENTS_REPLAY_SPEED)
+    if source == 'stream':
+        if PAPER_TRADING:
+            # У симулятора нет user data stream - опрос REST как раньше
+            return None
+        return UserDataStreamSource(api_key, api_secret, testnet, ORDER_EVENTS_RECORD_FILE or None)
+    return None
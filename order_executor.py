@@ -24,12 +24,22 @@ from datetime import datetime, timedelta
 import time
 import threading
 import asyncio
+import json
+import os
+from pathlib import Path
 
 # Локальные импорты
 from utils import logger
 from telegram_bot import telegram_bot
 from symbol_cache import get_symbol_cache, round_price_for_symbol, round_quantity_for_symbol, calculate_leverage_for_symbol
-from config import BINANCE_API_KEY, BINANCE_API_SECRET, BINANCE_TESTNET, MULTIPLE_ORDERS, MAX_CONCURRENT_ORDERS, RISK_PERCENT, FUTURES_LEVERAGE, FUTURES_MARGIN_TYPE
+from account_state import AccountStateCache, SymbolSettingsRegistry
+from batch_orders import place_batch_orders
+from timeout_scheduler import TimeoutScheduler
+from symbol_locks import SymbolLockManager
+from price_feed import create_price_feed
+from tracing import tracer
+from futures_client import create_futures_client
+from config import BINANCE_API_KEY, BINANCE_API_SECRET, BINANCE_TESTNET, MULTIPLE_ORDERS, MAX_CONCURRENT_ORDERS, RISK_PERCENT, FUTURES_LEVERAGE, FUTURES_MARGIN_TYPE, ACCOUNT_STATE_TTL, SYMBOL_SETTINGS_FILE, BATCH_ORDERS_ENABLED, LIFECYCLE_STATE_FILE, PRICE_FEED_MAX_AGE
 
 # Синхронизация заказов
 try:
@@ -44,7 +54,6 @@ except ImportError:
         return True, "Synchronizer недоступен"
 
 # Binance
-from binance.client import Client
 from binance.exceptions import BinanceAPIException
 
 # Мониторинг ордеров через Orders Watchdog
@@ -74,9 +83,16 @@ class OrderExecutor:
         
         self.binance_client = None
         self.symbol_cache = get_symbol_cache()
-        self.order_lock = threading.Lock()  # 🔒 Thread-safe lock для проверки ордеров
+        self.symbol_locks = SymbolLockManager()  # 🔒 Lock на символ: разные символы исполняются параллельно
         self._init_binance_client()
         
+        # Снимки account / positions / open orders (один REST запрос на TTL)
+        self.account_state = AccountStateCache(self.binance_client, ACCOUNT_STATE_TTL)
+        # Примененные плечо/режим маржи по символам (change-вызовы только при изменении)
+        self.symbol_settings = SymbolSettingsRegistry(SYMBOL_SETTINGS_FILE)
+        # Цены всех символов (один запрос на PRICE_FEED_MAX_AGE вместо тикера на символ)
+        self.price_feed = create_price_feed(self.binance_client, PRICE_FEED_MAX_AGE)
+        
         # Создаем lifecycle manager после инициализации
         order_lifecycle_manager = OrderLifecycleManager(self)
         self.lifecycle_manager = order_lifecycle_manager
@@ -93,7 +109,7 @@ class OrderExecutor:
             
             logger.info(f"🔧 Подключение к Binance ({'TESTNET' if BINANCE_TESTNET else 'MAINNET'})...")
             
-            self.binance_client = Client(
+            self.binance_client = create_futures_client(
                 api_key=BINANCE_API_KEY,
                 api_secret=BINANCE_API_SECRET,
                 testnet=BINANCE_TESTNET
@@ -118,10 +134,7 @@ class OrderExecutor:
             return 0.0
         
         try:
-            if BINANCE_TESTNET:
-                account = self.binance_client.futures_account()
-            else:
-                account = self.binance_client.futures_account()
+            account = self.account_state.get_account()
             
             total_balance = float(account['totalWalletBalance'])
             logger.info(f"💰 Общий баланс: {total_balance:.2f} USDT")
@@ -144,7 +157,7 @@ class OrderExecutor:
         
         try:
             # Получаем информацию о позициях
-            positions = self.binance_client.futures_position_information(symbol=symbol)
+            positions = self.account_state.get_positions(symbol)
             
             for position in positions:
                 position_amt = float(position['positionAmt'])
@@ -176,13 +189,25 @@ class OrderExecutor:
             return 0.0
         
         try:
-            # Используем ФЬЮЧЕРСНЫЕ цены, не спотовые!
+            # Используем ФЬЮЧЕРСНЫЕ цены, не спотовые! (общая таблица цен)
+            price = self.price_feed.get_price(ticker)
+            if price is not None:
+                return price
             ticker_data = self.binance_client.futures_symbol_ticker(symbol=ticker)
             return float(ticker_data['price'])
         except Exception as e:
             logger.error(f"❌ Ошибка получения цены {ticker}: {e}")
             return 0.0
     
+    def _ensure_symbol_settings_seeded(self) -> None:
+        """Засевает реестр настроек символов из positionRisk (один раз за запуск)"""
+        if self.symbol_settings.seeded or not self.binance_client:
+            return
+        try:
+            self.symbol_settings.seed_from_positions(self.account_state.get_positions())
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось получить настройки символов с биржи: {e}")
+    
     def set_leverage(self, ticker: str, notional_value: Optional[float] = None) -> bool:
         """
         Устанавливает оптимальное плечо для символа
@@ -202,10 +227,16 @@ class OrderExecutor:
             else:
                 optimal_leverage = FUTURES_LEVERAGE
             
+            self._ensure_symbol_settings_seeded()
+            if not self.symbol_settings.needs_leverage(ticker, optimal_leverage):
+                logger.debug(f"✅ Плечо {optimal_leverage}x уже установлено для {ticker}")
+                return True
+            
             result = self.binance_client.futures_change_leverage(
                 symbol=ticker, 
                 leverage=optimal_leverage
             )
+            self.symbol_settings.record(ticker, leverage=optimal_leverage)
             
             if optimal_leverage != FUTURES_LEVERAGE:
                 logger.info(f"✅ Динамическое плечо {optimal_leverage}x установлено для {ticker} (позиция: ${notional_value:,.0f})")
@@ -215,6 +246,7 @@ class OrderExecutor:
             return True
         except Exception as e:
             logger.warning(f"⚠️ Не удалось установить плечо для {ticker}: {e}")
+            self.symbol_settings.forget(ticker)
             return False
     
     def set_margin_type(self, ticker: str) -> bool:
@@ -226,11 +258,17 @@ class OrderExecutor:
             # Для фьючерсов: CROSS -> CROSSED, ISOLATED остается ISOLATED
             futures_margin_type = 'CROSSED' if FUTURES_MARGIN_TYPE == 'CROSS' else 'ISOLATED'
             
+            self._ensure_symbol_settings_seeded()
+            if not self.symbol_settings.needs_margin_type(ticker, futures_margin_type):
+                logger.debug(f"✅ Режим маржи {futures_margin_type} уже установлен для {ticker}")
+                return True
+            
             # Устанавливаем режим маржи из конфигурации
             result = self.binance_client.futures_change_margin_type(
                 symbol=ticker,
                 marginType=futures_margin_type  # Используем marginType (camelCase) для Futures API
             )
+            self.symbol_settings.record(ticker, margin_type=futures_margin_type)
             logger.info(f"✅ Режим маржи {futures_margin_type} установлен для {ticker}")
             return True
         except Exception as e:
@@ -239,6 +277,7 @@ class OrderExecutor:
             if "no need to change margin type" in error_msg or "margin type is the same" in error_msg:
                 futures_margin_type = 'CROSSED' if FUTURES_MARGIN_TYPE == 'CROSS' else 'ISOLATED'
                 logger.info(f"✅ Режим маржи {futures_margin_type} уже установлен для {ticker}")
+                self.symbol_settings.record(ticker, margin_type=futures_margin_type)
                 return True
             else:
                 logger.warning(f"⚠️ Не удалось установить режим маржи для {ticker}: {e}")
@@ -331,7 +370,12 @@ class OrderExecutor:
             return 0.0, 0.0, error_msg
     
     def place_market_order(self, signal_data: Dict) -> Dict:
-        """Размещает рыночный ордер с SL и TP"""
+        """Размещает рыночный ордер с SL и TP (thread-safe, lock символа)"""
+        with self.symbol_locks.locked(signal_data['ticker']):
+            return self._place_market_order(signal_data)
+    
+    def _place_market_order(self, signal_data: Dict) -> Dict:
+        """Размещает рыночный ордер с SL и TP (вызывать под lock символа)"""
         if not self.binance_client:
             return {
                 'success': False,
@@ -344,6 +388,7 @@ class OrderExecutor:
         entry_price = float(signal_data['entry_price'])
         stop_loss = float(signal_data['stop_loss'])
         take_profit = float(signal_data['take_profit'])
+        trace_id = signal_data.get('trace_id')
         
         try:
             # � ВАЛИДАЦИЯ СИНХРОНИЗАЦИИ: Проверяем конфликты с Orders Watchdog
@@ -351,7 +396,8 @@ class OrderExecutor:
                 side = "BUY" if signal_type == "LONG" else "SELL"
                 quantity = 100.0  # Временное значение для валидации
                 
-                is_valid, validation_reason = validate_signal_before_execution(ticker, side, quantity)
+                with tracer.span('sync_validation', trace_id, ticker=ticker):
+                    is_valid, validation_reason = validate_signal_before_execution(ticker, side, quantity)
                 
                 if not is_valid:
                     logger.warning(f"⚠️ Сигнал {ticker} отклонен синхронизатором: {validation_reason}")
@@ -366,7 +412,8 @@ class OrderExecutor:
                     logger.info(f"✅ Сигнал {ticker} прошел валидацию синхронизации: {validation_reason}")
             
             # �🔧 НОВАЯ ПРОВЕРКА: Проверяем открытые позиции
-            has_position, position_info = self.check_open_position(ticker)
+            with tracer.span('account_checks', trace_id, ticker=ticker):
+                has_position, position_info = self.check_open_position(ticker)
             
             if has_position:
                 # Отправляем уведомление об открытой позиции
@@ -386,7 +433,7 @@ class OrderExecutor:
                     self._send_multiple_orders_allowed_notification(ticker, signal_data, position_info)
                     
                     # 🔒 КРИТИЧЕСКАЯ СЕКЦИЯ: Thread-safe проверка лимита для символа
-                    with self.order_lock:
+                    with self.symbol_locks.locked(ticker):
                         positions_count, orders_count, total_active = self._count_active_positions_and_orders_for_symbol(ticker)
                         
                         if total_active >= MAX_CONCURRENT_ORDERS:
@@ -416,12 +463,14 @@ class OrderExecutor:
                     # 🔒 КОНЕЦ КРИТИЧЕСКОЙ СЕКЦИИ
                     
             # Настраиваем параметры символа (плечо и режим маржи)
-            self.setup_symbol_settings(ticker)
+            with tracer.span('leverage_setup', trace_id, ticker=ticker):
+                self.setup_symbol_settings(ticker)
             
             # Рассчитываем размер позиции
-            quantity, usdt_amount, error_msg = self.calculate_position_size(
-                ticker, entry_price, stop_loss
-            )
+            with tracer.span('sizing', trace_id, ticker=ticker):
+                quantity, usdt_amount, error_msg = self.calculate_position_size(
+                    ticker, entry_price, stop_loss
+                )
             
             if quantity == 0:
                 return {
@@ -437,49 +486,72 @@ class OrderExecutor:
             
             logger.info(f"🎯 Размещаем LIMIT {side} ордер {ticker}: {quantity} по цене {entry_price_rounded} (~{usdt_amount:.2f} USDT) positionSide={position_side}")
             
-            main_order = self.binance_client.futures_create_order(
-                symbol=ticker,
-                side=side,
-                type='LIMIT',  # ИСПРАВЛЕНО: LIMIT вместо MARKET!
-                quantity=quantity,
-                price=str(entry_price_rounded),  # Цена обязательна для LIMIT
-                timeInForce='GTC',  # Good Till Cancelled
-                positionSide=position_side
-            )
-            
-            logger.info(f"✅ Основной ордер исполнен: {main_order['orderId']}")
+            main_params = {
+                'symbol': ticker,
+                'side': side,
+                'type': 'LIMIT',  # ИСПРАВЛЕНО: LIMIT вместо MARKET!
+                'quantity': quantity,
+                'price': str(entry_price_rounded),  # Цена обязательна для LIMIT
+                'timeInForce': 'GTC',  # Good Till Cancelled
+                'positionSide': position_side
+            }
             
-            # Размещаем Stop Loss (LIMIT вместо STOP_MARKET для лучшего контроля)
+            # Stop Loss (LIMIT вместо STOP_MARKET для лучшего контроля)
             sl_side = 'SELL' if signal_type == 'LONG' else 'BUY'
             sl_price = round_price_for_symbol(ticker, stop_loss)
+            stop_params = {
+                'symbol': ticker,
+                'side': sl_side,
+                'type': 'STOP',
+                'quantity': quantity,
+                'price': str(sl_price),  # Цена для лимитного исполнения
+                'stopPrice': str(sl_price),  # Цена срабатывания стопа
+                'timeInForce': 'GTC',
+                'positionSide': position_side  # Тот же positionSide!
+            }
             
-            stop_order = self.binance_client.futures_create_order(
-                symbol=ticker,
-                side=sl_side,
-                type='STOP',
-                quantity=quantity,
-                price=str(sl_price),  # Цена для лимитного исполнения
-                stopPrice=str(sl_price),  # Цена срабатывания стопа
-                timeInForce='GTC',
-                positionSide=position_side  # Тот же positionSide!
-            )
-            
-            logger.info(f"🛡️ Stop Loss размещен: {stop_order['orderId']} at {sl_price}")
-            
-            # Размещаем Take Profit
+            # Take Profit
             tp_side = 'SELL' if signal_type == 'LONG' else 'BUY'
             tp_price = round_price_for_symbol(ticker, take_profit)
+            tp_params = {
+                'symbol': ticker,
+                'side': tp_side,
+                'type': 'TAKE_PROFIT_MARKET',
+                'quantity': quantity,
+                'stopPrice': str(tp_price),
+                'positionSide': position_side
+            }
             
-            tp_order = self.binance_client.futures_create_order(
-                symbol=ticker,
-                side=tp_side,
-                type='TAKE_PROFIT_MARKET',
-                quantity=quantity,
-                stopPrice=str(tp_price),
-                positionSide=position_side
-            )
+            with tracer.span('order_submit', trace_id, ticker=ticker, batch=BATCH_ORDERS_ENABLED) as span:
+                if BATCH_ORDERS_ENABLED:
+                    # Вход + SL + TP одним batchOrders запросом; при частичном успехе
+                    # SL/TP откатываются, только если удалось отменить вход (anchor=0)
+                    batch = place_batch_orders(self.binance_client, [main_params, stop_params, tp_params], anchor=0)
+                    self.account_state.invalidate(ticker)
+                    span['accepted'] = batch.success
+                    if not batch.success:
+                        error_msg = f"Ошибка пакетного размещения ордеров: {batch.error_summary()}"
+                        if batch.kept_order_ids:
+                            error_msg += f"; вход не отменен, на бирже оставлены: {', '.join(batch.kept_order_ids)}"
+                        logger.error(f"❌ {error_msg}")
+                        return {
+                            'success': False,
+                            'error': error_msg,
+                            'signal_data': signal_data
+                        }
+                    main_order, stop_order, tp_order = batch.orders
+                else:
+                    main_order = self.binance_client.futures_create_order(**main_params)
+                    self.account_state.invalidate(ticker)
+                    stop_order = self.binance_client.futures_create_order(**stop_params)
+                    self.account_state.invalidate(ticker)
+                    tp_order = self.binance_client.futures_create_order(**tp_params)
+                    self.account_state.invalidate(ticker)
             
+            logger.info(f"✅ Основной ордер исполнен: {main_order['orderId']}")
+            logger.info(f"🛡️ Stop Loss размещен: {stop_order['orderId']} at {sl_price}")
             logger.info(f"🎯 Take Profit размещен: {tp_order['orderId']} at {tp_price}")
+            tracer.finish(signal_data, ticker=ticker, mode='market')
             
             # Возвращаем результат
             return {
@@ -535,6 +607,9 @@ class OrderExecutor:
         """
         Главная функция - исполняет торговый сигнал через новый lifecycle manager
         
+        Thread-safe: сигналы одного символа исполняются последовательно,
+        сигналы разных символов - параллельно.
+        
         Args:
             signal_data: Данные сигнала от signal_analyzer
             
@@ -548,7 +623,8 @@ class OrderExecutor:
         
         try:
             # Используем новый lifecycle manager для размещения ордера
-            order_result = self.lifecycle_manager.place_main_limit_order(signal_data)
+            with self.symbol_locks.locked(ticker):
+                order_result = self.lifecycle_manager.place_main_limit_order(signal_data)
             
             if order_result['success']:
                 logger.info(f"✅ === ЛИМИТНЫЙ ОРДЕР {ticker} РАЗМЕЩЕН ===")
@@ -741,7 +817,7 @@ class OrderExecutor:
             if not self.binance_client:
                 return 0
                 
-            open_orders = self.binance_client.futures_get_open_orders(symbol=symbol)
+            open_orders = self.account_state.get_open_orders(symbol)
             return len(open_orders)
             
         except Exception as e:
@@ -760,7 +836,7 @@ class OrderExecutor:
                 return 0, 0, 0
             
             # Получаем реальные FILLED позиции для символа
-            account_info = self.binance_client.futures_account()
+            account_info = self.account_state.get_account()
             filled_positions = 0
             
             for position in account_info.get('positions', []):
@@ -771,7 +847,7 @@ class OrderExecutor:
                         break  # Для одного символа может быть максимум 1 позиция
             
             # Получаем pending ордера для символа  
-            open_orders = self.binance_client.futures_get_open_orders(symbol=symbol)
+            open_orders = self.account_state.get_open_orders(symbol)
             pending_orders = len(open_orders)
             
             # Для лимита считаем: реальные позиции + pending ордера
@@ -800,7 +876,7 @@ class OrderExecutor:
             if not self.binance_client:
                 return []
                 
-            open_orders = self.binance_client.futures_get_open_orders(symbol=symbol)
+            open_orders = self.account_state.get_open_orders(symbol)
             
             # Фильтруем по стороне и типу ордера
             relevant_orders = []
@@ -837,7 +913,7 @@ class OrderExecutor:
             
             # 1. Проверяем открытые позиции 
             if self.binance_client:
-                account_info = self.binance_client.futures_account()
+                account_info = self.account_state.get_account()
                 for position in account_info.get('positions', []):
                     if position['symbol'] == symbol:
                         position_amt = float(position.get('positionAmt', 0))
@@ -1028,12 +1104,56 @@ class OrderLifecycleManager:
     
     def __init__(self, order_executor_instance):
         self.executor = order_executor_instance
-        self.pending_orders = {}  # {ticker: {'main_order_id': ..., 'signal_data': ..., 'created_at': ...}}
+        self.pending_orders = {}  # {ticker: {'main_order_id': ..., 'signal_data': ..., 'created_at': ..., 'timeout_at': ...}}
         self.timeout_minutes = 60  # Таймаут ожидания исполнения
+        self.cancel_retry_seconds = 60  # Повтор отмены по timeout, если биржа ее не приняла
         self.lock = threading.Lock()
+        self.state_file = Path(LIFECYCLE_STATE_FILE)
+        # Один поток на все таймауты ордеров (min-heap дедлайнов)
+        self.timeouts = TimeoutScheduler(self._on_order_timeout, name='order-timeouts')
+        
+        self._load_persistent_state()
         
         logger.info("📋 OrderLifecycleManager initialized")
     
+    def _load_persistent_state(self) -> None:
+        """Восстанавливает pending ордера и их таймауты после перезапуска"""
+        if not self.state_file.exists():
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            for ticker, order_info in data.get('pending_orders', {}).items():
+                order_info['created_at'] = datetime.fromisoformat(order_info['created_at'])
+                self.pending_orders[ticker] = order_info
+                if order_info.get('timeout_at'):
+                    # Просроченные за время простоя сработают сразу
+                    self.timeouts.schedule(ticker, order_info['timeout_at'], order_info['main_order_id'])
+            
+            if self.pending_orders:
+                logger.info(f"📂 Восстановлено {len(self.pending_orders)} pending ордеров, "
+                            f"таймаутов: {len(self.timeouts.pending())}")
+        except Exception as e:
+            logger.error(f"❌ Ошибка загрузки состояния lifecycle: {e}")
+    
+    def _save_persistent_state(self) -> None:
+        """Атомарно сохраняет pending ордера (вызывать под self.lock)"""
+        try:
+            data = {
+                'timestamp': datetime.now().isoformat(),
+                'pending_orders': {
+                    ticker: {**order_info, 'created_at': order_info['created_at'].isoformat()}
+                    for ticker, order_info in self.pending_orders.items()
+                }
+            }
+            tmp_file = self.state_file.with_suffix(self.state_file.suffix + '.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения состояния lifecycle: {e}")
+    
     def place_main_limit_order(self, signal_data: Dict) -> Dict:
         """
         Размещает только основной лимитный ордер и запускает мониторинг
@@ -1043,10 +1163,12 @@ class OrderLifecycleManager:
         entry_price = float(signal_data['entry_price'])
         stop_loss = float(signal_data['stop_loss'])
         take_profit = float(signal_data['take_profit'])
+        trace_id = signal_data.get('trace_id')
         
         try:
             # Проверяем открытые позиции
-            has_position, position_info = self.executor.check_open_position(ticker)
+            with tracer.span('account_checks', trace_id, ticker=ticker):
+                has_position, position_info = self.executor.check_open_position(ticker)
             
             if has_position:
                 self.executor._send_position_exists_notification(ticker, position_info, signal_data)
@@ -1064,13 +1186,17 @@ class OrderLifecycleManager:
             # Отменяем предыдущий ордер если есть
             self._cancel_pending_order(ticker)
             
-            # Настраиваем параметры символа (базовые)
-            self.executor.setup_symbol_settings(ticker)
+            # Настраиваем режим маржи (плечо выставляется ниже по размеру позиции,
+            # иначе дефолтное плечо и динамическое перезаписывали бы друг друга)
+            leverage_started = time.perf_counter()
+            self.executor.set_margin_type(ticker)
+            leverage_elapsed = time.perf_counter() - leverage_started
             
             # Рассчитываем размер позиции
-            quantity, usdt_amount, error_msg = self.executor.calculate_position_size(
-                ticker, entry_price, stop_loss
-            )
+            with tracer.span('sizing', trace_id, ticker=ticker):
+                quantity, usdt_amount, error_msg = self.executor.calculate_position_size(
+                    ticker, entry_price, stop_loss
+                )
             
             if quantity == 0:
                 return {
@@ -1084,7 +1210,11 @@ class OrderLifecycleManager:
             
             # Устанавливаем оптимальное плечо на основе размера позиции
             logger.info(f"📊 Рассчитываем оптимальное плечо для {ticker} (позиция: ${notional_value:,.2f})")
+            leverage_started = time.perf_counter()
             leverage_ok = self.executor.set_leverage(ticker, notional_value)
+            # leverage_setup = режим маржи + плечо (разнесены расчетом позиции)
+            tracer.record('leverage_setup', trace_id, leverage_elapsed + time.perf_counter() - leverage_started,
+                          ticker=ticker, ok=leverage_ok)
             
             if not leverage_ok:
                 logger.warning(f"⚠️ Не удалось установить плечо для {ticker}, используем существующее")
@@ -1096,15 +1226,17 @@ class OrderLifecycleManager:
             
             logger.info(f"🎯 Размещаем LIMIT {side} ордер {ticker}: {quantity} по цене {entry_price_rounded}")
             
-            main_order = self.executor.binance_client.futures_create_order(
-                symbol=ticker,
-                side=side,
-                type='LIMIT',
-                quantity=quantity,
-                price=str(entry_price_rounded),
-                timeInForce='GTC',
-                positionSide=position_side
-            )
+            with tracer.span('order_submit', trace_id, ticker=ticker):
+                main_order = self.executor.binance_client.futures_create_order(
+                    symbol=ticker,
+                    side=side,
+                    type='LIMIT',
+                    quantity=quantity,
+                    price=str(entry_price_rounded),
+                    timeInForce='GTC',
+                    positionSide=position_side
+                )
+            self.executor.account_state.invalidate(ticker)
             
             logger.info(f"✅ Основной ордер размещен: {main_order['orderId']}")
             
@@ -1122,12 +1254,15 @@ class OrderLifecycleManager:
             
             with self.lock:
                 self.pending_orders[ticker] = order_info
+                self._save_persistent_state()
             
             # Отправляем уведомление о размещении
             self._send_main_order_placed_notification(order_info)
             
             # Добавляем ордер в Orders Watchdog для мониторинга
-            self._add_to_watchdog_monitoring(order_info)
+            with tracer.span('watchdog_registration', trace_id, ticker=ticker):
+                self._add_to_watchdog_monitoring(order_info)
+            tracer.finish(signal_data, ticker=ticker, mode='limit')
             
             return {
                 'success': True,
@@ -1162,12 +1297,19 @@ class OrderLifecycleManager:
         """
         logger.info(f"🎉 Основной ордер {ticker} исполнен: {order_id}")
         
+        with self.executor.symbol_locks.locked(ticker):
+            self._place_sl_tp_for_filled(ticker, order_id)
+    
+    def _place_sl_tp_for_filled(self, ticker: str, order_id: str):
+        """Размещает SL/TP для исполненного основного ордера (под lock символа)"""
         with self.lock:
             if ticker not in self.pending_orders:
                 logger.warning(f"⚠️ Не найдена информация о ордере {ticker}")
                 return
             
             order_info = self.pending_orders.pop(ticker)
+            self.timeouts.cancel(ticker)
+            self._save_persistent_state()
         
         try:
             signal_data = order_info['signal_data']
@@ -1178,40 +1320,61 @@ class OrderLifecycleManager:
             stop_loss = float(signal_data['stop_loss'])
             take_profit = float(signal_data['take_profit'])
             
-            # Размещаем Stop Loss (STOP_MARKET)
+            # Stop Loss (STOP_MARKET)
             sl_side = 'SELL' if signal_type == 'LONG' else 'BUY'
             sl_price = round_price_for_symbol(ticker, stop_loss)
+            stop_params = {
+                'symbol': ticker,
+                'side': sl_side,
+                'type': 'STOP_MARKET',  # ИСПРАВЛЕНО: STOP_MARKET вместо STOP
+                'quantity': quantity,
+                'stopPrice': str(sl_price),
+                'timeInForce': 'GTC',
+                'positionSide': position_side
+            }
             
-            logger.info(f"🛡️ Размещаем STOP_MARKET {sl_side} для {ticker}: {quantity} at {sl_price}")
-            
-            stop_order = self.executor.binance_client.futures_create_order(
-                symbol=ticker,
-                side=sl_side,
-                type='STOP_MARKET',  # ИСПРАВЛЕНО: STOP_MARKET вместо STOP
-                quantity=quantity,
-                stopPrice=str(sl_price),
-                timeInForce='GTC',
-                positionSide=position_side
-            )
-            
-            logger.info(f"✅ Stop Loss размещен: {stop_order['orderId']}")
-            
-            # Размещаем Take Profit (LIMIT)
+            # Take Profit (LIMIT)
             tp_side = 'SELL' if signal_type == 'LONG' else 'BUY'
             tp_price = round_price_for_symbol(ticker, take_profit)
+            tp_params = {
+                'symbol': ticker,
+                'side': tp_side,
+                'type': 'LIMIT',  # Take Profit как LIMIT ордер
+                'quantity': quantity,
+                'price': str(tp_price),
+                'timeInForce': 'GTC',
+                'positionSide': position_side
+            }
             
+            logger.info(f"🛡️ Размещаем STOP_MARKET {sl_side} для {ticker}: {quantity} at {sl_price}")
             logger.info(f"🎯 Размещаем TAKE_PROFIT {tp_side} для {ticker}: {quantity} at {tp_price}")
             
-            tp_order = self.executor.binance_client.futures_create_order(
-                symbol=ticker,
-                side=tp_side,
-                type='LIMIT',  # Take Profit как LIMIT ордер
-                quantity=quantity,
-                price=str(tp_price),
-                timeInForce='GTC',
-                positionSide=position_side
-            )
+            if BATCH_ORDERS_ENABLED:
+                # SL + TP одним batchOrders запросом. Позиция уже открыта: принятую
+                # ногу не откатываем (иначе отклоненный TP снимал бы стоп), повторяем
+                # только недостающую
+                batch = place_batch_orders(self.executor.binance_client, [stop_params, tp_params], rollback=False)
+                self.executor.account_state.invalidate(ticker)
+                stop_order, tp_order = batch.orders
+                if not batch.success:
+                    logger.warning(f"⚠️ SL/TP {ticker} размещены частично ({batch.error_summary()}) - повторяем недостающую ногу")
+                    try:
+                        if stop_order is None:
+                            stop_order = self.executor.binance_client.futures_create_order(**stop_params)
+                        if tp_order is None:
+                            tp_order = self.executor.binance_client.futures_create_order(**tp_params)
+                    except Exception as e:
+                        kept = ', '.join(str(o['orderId']) for o in (stop_order, tp_order) if o) or '-'
+                        raise RuntimeError(f"{e}; размещенные ордера оставлены на бирже: {kept}") from e
+                    finally:
+                        self.executor.account_state.invalidate(ticker)
+            else:
+                stop_order = self.executor.binance_client.futures_create_order(**stop_params)
+                self.executor.account_state.invalidate(ticker)
+                tp_order = self.executor.binance_client.futures_create_order(**tp_params)
+                self.executor.account_state.invalidate(ticker)
             
+            logger.info(f"✅ Stop Loss размещен: {stop_order['orderId']}")
             logger.info(f"✅ Take Profit размещен: {tp_order['orderId']}")
             
             # Создаем полный результат для мониторинга и уведомлений
@@ -1247,30 +1410,34 @@ class OrderLifecycleManager:
         with self.lock:
             if ticker in self.pending_orders:
                 order_info = self.pending_orders.pop(ticker)
+                self.timeouts.cancel(ticker)
+                self._save_persistent_state()
                 self._send_main_order_cancelled_notification(ticker, order_info)
     
     def _cancel_pending_order(self, ticker: str):
         """
         Отменяет предыдущий ордер если есть
         """
+        # Удаляем из отслеживания под общим lock, сеть - вне его
         with self.lock:
-            if ticker in self.pending_orders:
-                old_order = self.pending_orders[ticker]
-                old_order_id = old_order['main_order_id']
-                
-                try:
-                    # Отменяем старый ордер
-                    cancel_result = self.executor.binance_client.futures_cancel_order(
-                        symbol=ticker,
-                        orderId=old_order_id
-                    )
-                    logger.info(f"🚫 Предыдущий ордер {ticker} отменен: {old_order_id}")
-                    self._send_previous_order_cancelled_notification(ticker, old_order)
-                except Exception as e:
-                    logger.warning(f"⚠️ Не удалось отменить предыдущий ордер {ticker}: {e}")
-                
-                # Удаляем из отслеживания
-                del self.pending_orders[ticker]
+            old_order = self.pending_orders.pop(ticker, None)
+            if old_order is None:
+                return
+            self.timeouts.cancel(ticker)
+            self._save_persistent_state()
+        
+        old_order_id = old_order['main_order_id']
+        try:
+            # Отменяем старый ордер
+            cancel_result = self.executor.binance_client.futures_cancel_order(
+                symbol=ticker,
+                orderId=old_order_id
+            )
+            self.executor.account_state.invalidate(ticker)
+            logger.info(f"🚫 Предыдущий ордер {ticker} отменен: {old_order_id}")
+            self._send_previous_order_cancelled_notification(ticker, old_order)
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось отменить предыдущий ордер {ticker}: {e}")
     
     def _add_to_watchdog_monitoring(self, order_info: Dict):
         """Добавляет ордер в Orders Watchdog для мониторинга"""
@@ -1338,31 +1505,75 @@ class OrderLifecycleManager:
     
     def _start_timeout_timer(self, ticker: str, order_id: str):
         """
-        Запускает таймер для отмены ордера по timeout
+        Планирует отмену ордера по timeout (общий поток TimeoutScheduler)
         """
-        def timeout_handler():
-            time.sleep(self.timeout_minutes * 60)  # 60 минут
-            
+        deadline = time.time() + self.timeout_minutes * 60  # 60 минут
+        
+        with self.lock:
+            order_info = self.pending_orders.get(ticker)
+            if not order_info or order_info['main_order_id'] != order_id:
+                return
+            order_info['timeout_at'] = deadline
+            self._save_persistent_state()
+        
+        self.timeouts.schedule(ticker, deadline, order_id)
+    
+    def _on_order_timeout(self, ticker: str, order_id: str):
+        """Callback TimeoutScheduler: отменяет неисполненный ордер"""
+        # Lock символа: не пересекаемся с новым сигналом по тому же тикеру
+        with self.executor.symbol_locks.locked(ticker):
             with self.lock:
-                if ticker in self.pending_orders:
-                    order_info = self.pending_orders[ticker]
-                    if order_info['main_order_id'] == order_id:
-                        try:
-                            # Отменяем ордер по timeout
-                            cancel_result = self.executor.binance_client.futures_cancel_order(
-                                symbol=ticker,
-                                orderId=order_id
-                            )
-                            logger.info(f"⏰ Ордер {ticker} отменен по timeout: {order_id}")
-                            self._send_timeout_cancellation_notification(ticker, order_info)
-                            
-                            del self.pending_orders[ticker]
-                        except Exception as e:
-                            logger.error(f"❌ Ошибка отмены ордера по timeout {ticker}: {e}")
+                order_info = self.pending_orders.get(ticker)
+                if not order_info or order_info['main_order_id'] != order_id:
+                    return
+            
+            try:
+                # Отменяем ордер по timeout (сеть - вне общего lock)
+                cancel_result = self.executor.binance_client.futures_cancel_order(
+                    symbol=ticker,
+                    orderId=order_id
+                )
+                self.executor.account_state.invalidate(ticker)
+                logger.info(f"⏰ Ордер {ticker} отменен по timeout: {order_id}")
+                self._send_timeout_cancellation_notification(ticker, order_info)
+                
+                with self.lock:
+                    self.pending_orders.pop(ticker, None)
+                    self._save_persistent_state()
+            except Exception as e:
+                logger.error(f"❌ Ошибка отмены ордера по timeout {ticker}: {e}")
+                self._resolve_timeout_cancel_failure(ticker, order_id)
+    
+    def _resolve_timeout_cancel_failure(self, ticker: str, order_id: str):
+        """
+        Отмена по timeout не прошла (например -2011: ордер уже исполнен) -
+        сверяем статус, чтобы запись не осталась в pending_orders навсегда
+        (вызывать под lock символа)
+        """
+        try:
+            status = self.executor.binance_client.futures_get_order(
+                symbol=ticker,
+                orderId=order_id
+            ).get('status')
+        except Exception as e:
+            status = None
+            logger.error(f"❌ Не удалось получить статус ордера {ticker} {order_id}: {e}")
         
-        # Запускаем в отдельном потоке
-        timeout_thread = threading.Thread(target=timeout_handler, daemon=True)
-        timeout_thread.start()
+        if status == 'FILLED':
+            logger.info(f"🎉 Ордер {ticker} {order_id} исполнен до отмены по timeout - размещаем SL/TP")
+            self._place_sl_tp_for_filled(ticker, order_id)
+        elif status in ('CANCELED', 'EXPIRED', 'REJECTED'):
+            logger.info(f"🚫 Ордер {ticker} {order_id} уже закрыт на бирже ({status})")
+            with self.lock:
+                order_info = self.pending_orders.get(ticker)
+                if order_info and order_info['main_order_id'] == order_id:
+                    self.pending_orders.pop(ticker)
+                    self._save_persistent_state()
+        else:
+            # Ордер еще активен или статус неизвестен - повторяем отмену позже
+            logger.warning(f"⚠️ Ордер {ticker} {order_id} ({status or 'статус неизвестен'}): "
+                           f"повторная отмена через {self.cancel_retry_seconds} сек")
+            self.timeouts.schedule(ticker, time.time() + self.cancel_retry_seconds, order_id)
     
     def _send_main_order_placed_notification(self, order_info: Dict):
         """Уведомление о размещении основного ордера"""
@@ -0,0 +1,240 @@
+"""
+Order Store - Индексированное хранилище отслеживаемых ордеров
+=============================================================
+
+OrdersWatchdog.watched_orders был словарем order_id -> WatchedOrder, и
+check_orders_status, get_watched_symbols, check_symbol_conflicts,
+check_positions_status, _cleanup_expired_orders и подсчет истекших в
+run() перебирали все ордера на каждом цикле.
+
+WatchedOrderStore - тот же MutableMapping (order_id -> ордер) с
+вторичными индексами:
+- by status: статус -> ордера (ordered, порядок добавления)
+- by symbol: символ -> ордера
+- by leg: sl_order_id / tp_order_id -> ордер (события SL/TP из stream)
+- min-heap по expires_at только для статусов expiry_statuses (в watchdog -
+  PENDING / SL_TP_ERROR): истекающие ордера находятся за O(найденных), а
+  защищенные позиции с давно прошедшим expires_at в heap не лежат
+
+Ордера мутируются на месте (order.status = ...), поэтому после перехода
+вызывается reindex(order) - в watchdog это делает _persist_order,
+который и так вызывается на каждом переходе под self.lock.
+
+Author: HEDGER
+Version: 1.0
+"""
+
+import heapq
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, MutableMapping, Optional, Tuple
+
+LEG_SL = 'SL'
+LEG_TP = 'TP'
+
+# (статус, символ, expires_at в heap или None, sl_order_id, tp_order_id)
+IndexKey = Tuple[Any, str, Optional[datetime], Optional[str], Optional[str]]
+
+
+class WatchedOrderStore(MutableMapping[str, Any]):
+    """
+    order_id -> ордер с индексами по статусу, символу и времени истечения
+
+    Ордер - любой объект с атрибутами order_id, status, symbol, expires_at
+    (и необязательными sl_order_id / tp_order_id).
+    Не потокобезопасно само по себе: вызывать под lock владельца.
+    """
+
+    def __init__(self, expiry_statuses: Optional[Iterable[Any]] = None) -> None:
+        """
+        Args:
+            expiry_statuses: Статусы, для которых отслеживается expires_at (None - все)
+        """
+        self._expiry_statuses = frozenset(expiry_statuses) if expiry_statuses is not None else None
+        self._orders: Dict[str, Any] = {}
+        self._by_status: Dict[Any, Dict[str, Any]] = {}
+        self._by_symbol: Dict[str, Dict[str, Any]] = {}
+        self._by_leg: Dict[str, Tuple[str, str]] = {}
+        # (expires_at, order_id); устаревшие записи отбрасываются при чтении
+        self._expiry_heap: List[Tuple[datetime, str]] = []
+        # Ключи, под которыми ордер сейчас проиндексирован
+        self._indexed: Dict[str, IndexKey] = {}
+
+    # ------------------------------------------------------------------
+    # MutableMapping
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, order_id: str) -> Any:
+        return self._orders[order_id]
+
+    def __setitem__(self, order_id: str, order: Any) -> None:
+        if order_id in self._orders:
+            self._unindex(order_id)
+        self._orders[order_id] = order
+        self._index(order_id, order)
+
+    def __delitem__(self, order_id: str) -> None:
+        del self._orders[order_id]
+        self._unindex(order_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._orders)
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __contains__(self, order_id: object) -> bool:
+        return order_id in self._orders
+
+    # ------------------------------------------------------------------
+    # Индексы
+    # ------------------------------------------------------------------
+
+    def _key(self, order: Any) -> IndexKey:
+        status = order.status
+        tracks_expiry = self._expiry_statuses is None or status in self._expiry_statuses
+        return (status, order.symbol, order.expires_at if tracks_expiry else None,
+                getattr(order, 'sl_order_id', None), getattr(order, 'tp_order_id', None))
+
+    def _index(self, order_id: str, order: Any) -> None:
+        key = self._key(order)
+        status, symbol, expires_at, sl_order_id, tp_order_id = key
+        self._by_status.setdefault(status, {})[order_id] = order
+        self._by_symbol.setdefault(symbol, {})[order_id] = order
+        if sl_order_id:
+            self._by_leg[str(sl_order_id)] = (order_id, LEG_SL)
+        if tp_order_id:
+            self._by_leg[str(tp_order_id)] = (order_id, LEG_TP)
+        previous = self._indexed.get(order_id)
+        if expires_at and (previous is None or previous[2] != expires_at):
+            heapq.heappush(self._expiry_heap, (expires_at, order_id))
+        self._indexed[order_id] = key
+        self._maybe_rebuild_heap()
+
+    def _unindex(self, order_id: str) -> None:
+        status, symbol, _, sl_order_id, tp_order_id = self._indexed.pop(order_id)
+        self._discard(self._by_status, status, order_id)
+        self._discard(self._by_symbol, symbol, order_id)
+        self._discard_legs(order_id, sl_order_id, tp_order_id)
+        # Запись в heap остается и отбрасывается при чтении
+        self._maybe_rebuild_heap()
+
+    def _discard_legs(self, order_id: str, *leg_ids: Optional[str]) -> None:
+        for leg_id in leg_ids:
+            if leg_id and self._by_leg.get(str(leg_id), (None,))[0] == order_id:
+                del self._by_leg[str(leg_id)]
+
+    @staticmethod
+    def _discard(index: Dict[Any, Dict[str, Any]], key: Any, order_id: str) -> None:
+        bucket = index.get(key)
+        if bucket is None:
+            return
+        bucket.pop(order_id, None)
+        if not bucket:
+            del index[key]
+
+    def _maybe_rebuild_heap(self) -> None:
+        """Пересобирает heap, если устаревших записей больше, чем живых"""
+        if len(self._expiry_heap) > 2 * len(self._indexed) + 64:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self) -> None:
+        self._expiry_heap = [
+            (expires_at, order_id)
+            for order_id, (_, _, expires_at, _, _) in self._indexed.items() if expires_at
+        ]
+        heapq.heapify(self._expiry_heap)
+
+    def reindex(self, order: Any) -> None:
+        """Обновляет индексы после изменения статуса / символа / expires_at / SL/TP ордера"""
+        order_id = order.order_id
+        if self._orders.get(order_id) is not order:
+            return
+        previous = self._indexed[order_id]
+        key = self._key(order)
+        if previous == key:
+            return
+        status, symbol, _, sl_order_id, tp_order_id = previous
+        if status != key[0]:
+            self._discard(self._by_status, status, order_id)
+        if symbol != key[1]:
+            self._discard(self._by_symbol, symbol, order_id)
+        self._discard_legs(order_id, *(leg for leg in (sl_order_id, tp_order_id) if leg not in key[3:]))
+        # Статус вышел из expiry_statuses - запись heap станет устаревшей (indexed[2] = None)
+        self._index(order_id, order)
+
+    # ------------------------------------------------------------------
+    # Запросы
+    # ------------------------------------------------------------------
+
+    def with_status(self, *statuses: Any) -> List[Any]:
+        """Ордера в указанных статусах (O(найденных))"""
+        result: Dict[str, Any] = {}
+        for status in statuses:
+            for order_id, order in list(self._by_status.get(status, {}).items()):
+                if order.status != status:
+                    # Переход без reindex - чиним индекс при чтении
+                    self.reindex(order)
+                if order.status in statuses:
+                    result[order_id] = order
+        return list(result.values())
+
+    def count_status(self, status: Any) -> int:
+        return len(self._by_status.get(status, {}))
+
+    def for_symbol(self, symbol: str) -> List[Any]:
+        """Ордера символа (O(ордеров символа))"""
+        return list(self._by_symbol.get(symbol, {}).values())
+
+    def symbols(self) -> List[str]:
+        return list(self._by_symbol)
+
+    def find_leg(self, leg_order_id: str) -> Optional[Tuple[Any, str]]:
+        """Ордер, чьей ногой SL/TP является leg_order_id -> (ордер, LEG_SL / LEG_TP)"""
+        entry = self._by_leg.get(str(leg_order_id))
+        if entry is None:
+            return None
+        order_id, role = entry
+        order = self._orders.get(order_id)
+        if order is None:
+            return None
+        leg_attr = 'sl_order_id' if role == LEG_SL else 'tp_order_id'
+        if str(getattr(order, leg_attr, None)) != str(leg_order_id):
+            # Нога сменилась без reindex - чиним индекс при чтении
+            self.reindex(order)
+            return self.find_leg(leg_order_id) if str(leg_order_id) in self._by_leg else None
+        return order, role
+
+    def expiring_before(self, deadline: datetime) -> List[Any]:
+        """
+        Ордера статусов expiry_statuses с expires_at < deadline, по возрастанию expires_at
+
+        Обход heap с отсечением поддеревьев >= deadline: O(найденных),
+        остальные ордера не просматриваются.
+        """
+        heap = self._expiry_heap
+        found: List[Tuple[datetime, str]] = []
+        stack = [0] if heap else []
+        while stack:
+            i = stack.pop()
+            if i >= len(heap) or heap[i][0] >= deadline:
+                continue
+            found.append(heap[i])
+            stack.extend((2 * i + 1, 2 * i + 2))
+
+        result: Dict[str, Any] = {}
+        stale = 0
+        for expires_at, order_id in sorted(found):
+            indexed = self._indexed.get(order_id)
+            if indexed is not None and indexed[2] == expires_at and order_id not in result:
+                result[order_id] = self._orders[order_id]
+            else:
+                stale += 1
+        if stale:
+            # Удаленные / сменившие статус ордера: иначе каждый следующий обход
+            # снова проходил бы по ним
+            self._rebuild_heap()
+        return list(result.values())
+
+    def expired(self, now: Optional[datetime] = None) -> List[Any]:
+        """Истекшие ордера статусов expiry_statuses (семантика WatchedOrder.is_expired)"""
+        return self.expiring_before(now or datetime.now())
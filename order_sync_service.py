@@ -46,6 +46,8 @@ except ImportError:
 # Local imports
 from config import BINANCE_API_KEY, BINANCE_API_SECRET
 from utils import logger
+from futures_client import create_futures_client
+from weight_governor import PRIORITY_LOW
 from symbol_cache import round_price_for_symbol, round_quantity_for_symbol
 
 
@@ -265,9 +267,10 @@ class ExchangeClient:
                 logger.error("❌ Binance Client is None (python-binance не установлен)")
                 self.client = None
                 return
-            self.client = Client(
+            self.client = create_futures_client(
                 api_key=BINANCE_API_KEY,
-                api_secret=BINANCE_API_SECRET
+                api_secret=BINANCE_API_SECRET,
+                priority=PRIORITY_LOW
             )
             self.client.futures_account()
             logger.info("✅ Binance futures client инициализирован (MAINNET)")
@@ -21,9 +21,11 @@ import time
 import signal
 import sys
 import threading
+import queue
 import json
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set, Tuple, Any, Union
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Any, Union
 from pathlib import Path
 from dataclasses import dataclass, asdict
 from enum import Enum
@@ -36,9 +38,23 @@ trailing_logger.setLevel(logging.DEBUG)
 # Локальные импорты
 from config import (
     BINANCE_API_KEY, BINANCE_API_SECRET, BINANCE_TESTNET, 
-    FUTURES_LEVERAGE, FUTURES_MARGIN_TYPE
+    FUTURES_LEVERAGE, FUTURES_MARGIN_TYPE, BATCH_ORDERS_ENABLED,
+    WATCHDOG_RPC_ENABLED, WATCHDOG_RPC_SOCKET, WATCHDOG_RPC_PORT, WATCHDOG_RPC_TIMEOUT,
+    WATCHDOG_REST_SAFETY_INTERVAL, ORDER_EVENTS_BUFFER_TTL, WATCHDOG_SNAPSHOT_MODE, WATCHDOG_JOURNAL_COMPACT_EVERY,
+    PRICE_TRIGGERS_ENABLED, PRICE_TRIGGER_TOLERANCE, PRICE_TRIGGER_SWEEP_INTERVAL
 )
 from utils import logger
+from watchdog_rpc import (
+    WatchdogRPCServer, WatchdogRPCClient, WatchdogRPCError, WatchdogRPCDeliveryError, REQUESTS_FILE, resolve_address,
+    append_file_request, take_file_requests, write_file_response, wait_file_response
+)
+from batch_orders import place_batch_orders
+from futures_client import create_futures_client
+from order_events import create_order_event_source, OrderEvent, PositionEvent
+from price_feed import create_price_feed
+from price_triggers import PriceTriggerIndex, DIRECTION_DOWN, DIRECTION_UP
+from state_journal import StateJournal, OP_UPSERT, OP_REMOVE, write_watchdog_state
+from order_store import WatchedOrderStore
 from symbol_cache import round_price_for_symbol
 from telegram_bot import telegram_bot
 from symbol_cache import round_price_for_symbol, round_quantity_for_symbol
@@ -76,6 +92,7 @@ else:
             def futures_get_open_orders(self) -> List[Dict[str, Any]]: return []
             def futures_position_information(self) -> List[Dict[str, Any]]: return []
             def futures_create_order(self, **kwargs: Any) -> Dict[str, Any]: return {}
+            def futures_place_batch_order(self, **kwargs: Any) -> List[Dict[str, Any]]: return []
             def futures_cancel_order(self, **kwargs: Any) -> None: pass
         
         class BinanceError(Exception): pass
@@ -183,23 +200,66 @@ class WatchedOrder:
         return time_to_expiry.total_seconds() <= (minutes_before * 60)
 
 
+@dataclass
+class CycleSnapshot:
+    """
+    Снимок биржи на один цикл watchdog
+    
+    Один futures_get_open_orders + один futures_position_information на цикл
+    вместо futures_get_order по каждому ордеру и позиций по каждому символу:
+    число запросов за цикл не растет с числом отслеживаемых ордеров.
+    """
+    open_orders: Dict[str, Dict[str, Any]]  # orderId -> ордер
+    positions: List[Dict[str, Any]]
+    taken_at: float
+    
+    def get_open_order(self, order_id: str) -> Optional[Dict[str, Any]]:
+        return self.open_orders.get(str(order_id))
+    
+    def positions_for(self, symbol: str) -> List[Dict[str, Any]]:
+        return [pos for pos in self.positions if pos.get('symbol') == symbol]
+
+
 class OrdersWatchdog:
     """Независимый мониторинг ордеров"""
     
     def __init__(self):
         self.client: Optional[BinanceClient] = None
-        self.watched_orders: Dict[str, WatchedOrder] = {}  # order_id -> WatchedOrder
+        # order_id -> WatchedOrder + индексы по статусу, символу и expires_at
+        self.watched_orders = WatchedOrderStore(expiry_statuses=(OrderStatus.PENDING, OrderStatus.SL_TP_ERROR))
         self.stop_event = threading.Event()
         self.check_interval = 5  # Проверяем каждые 5 секунд
         self.persistence_file = Path('orders_watchdog_state.json')
-        self.requests_file = Path('orders_watchdog_requests.json')  # Файл для входящих запросов
-        self.lock = threading.Lock()
+        # Снимок + журнал дельт: переход статуса дописывает одну строку
+        self.state_journal = StateJournal(self.persistence_file, compact_every=WATCHDOG_JOURNAL_COMPACT_EVERY)
+        self.requests_file = REQUESTS_FILE  # Файл для входящих запросов (fallback к RPC)
+        # RLock: check_symbol_conflicts вызывает get_watched_symbols под тем же lock
+        self.lock = threading.RLock()
+        self.rpc_server: Optional[WatchdogRPCServer] = None
+        
+        # События ордеров из user data stream (обрабатываются в главном цикле)
+        self.event_source = None
+        self.event_queue: "queue.Queue[Union[OrderEvent, PositionEvent]]" = queue.Queue()
+        self.wake_event = threading.Event()  # Будит главный цикл при новом событии
+        # События ордеров, которые еще не добавлены в отслеживание (маркетабельный
+        # LIMIT исполняется раньше add_order_to_watch): order_id -> (время, события)
+        self._unmatched_events: "OrderedDict[str, Tuple[float, List[OrderEvent]]]" = OrderedDict()
+        self._last_rest_sweep = 0.0  # Последняя REST сверка ордеров при активном stream
+        self._event_live_transitions = 0  # Последний учтенный переход stream в активное состояние
+        self._positions_check_due = False  # ACCOUNT_UPDATE закрыл позицию - проверить вне очереди
+        self._cycle_snapshot: Optional[CycleSnapshot] = None  # Снимок open orders/позиций текущего цикла
+        # Уровни входа / SL / TP по символам: без stream ордер проверяется, когда к ним подошла цена
+        self.price_triggers = PriceTriggerIndex(PRICE_TRIGGER_TOLERANCE)
         
         # Инициализация
         self._init_client()
+        # Цены всех символов: один запрос за цикл на любое число позиций (трейлинг)
+        self.price_feed = create_price_feed(self.client, self.check_interval)
         self._load_persistent_state()
         self._sync_with_exchange_on_startup()
         self._setup_signal_handlers()
+        self._start_rpc_server()
+        self._start_event_source()
         
         logger.info("🐕 Orders Watchdog initialized")
     
@@ -216,7 +276,7 @@ class OrdersWatchdog:
         try:
             logger.info(f"🔧 Подключение к Binance ({'TESTNET' if BINANCE_TESTNET else 'MAINNET'})...")
             
-            self.client = BinanceClient(
+            self.client = create_futures_client(
                 api_key=BINANCE_API_KEY,
                 api_secret=BINANCE_API_SECRET,
                 testnet=BINANCE_TESTNET
@@ -242,17 +302,18 @@ class OrdersWatchdog:
         signal.signal(signal.SIGTERM, signal_handler)
     
     def _load_persistent_state(self) -> None:
-        """Загружает состояние из файла"""
+        """Загружает состояние: снимок + записи журнала после него"""
         try:
-            if self.persistence_file.exists():
-                with open(self.persistence_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+            if self.persistence_file.exists() or self.state_journal.journal_file.exists():
+                data = self.state_journal.load()
                 
                 for order_data in data.get('watched_orders', []):
                     order = WatchedOrder.from_dict(order_data)
                     self.watched_orders[order.order_id] = order
+                    self._update_price_triggers(order)
                 
-                logger.info(f"📂 Загружено {len(self.watched_orders)} отслеживаемых ордеров")
+                logger.info(f"📂 Загружено {len(self.watched_orders)} отслеживаемых ордеров "
+                            f"(из журнала: {self.state_journal.replayed} записей)")
             else:
                 logger.info("📂 Файл состояния не найден, начинаем с пустого состояния")
                 
@@ -260,19 +321,69 @@ class OrdersWatchdog:
             logger.error(f"❌ Ошибка загрузки состояния: {e}")
     
     def _save_persistent_state(self) -> None:
-        """Сохраняет состояние в файл"""
+        """Полный снимок состояния (компакция журнала) - для массовых изменений и shutdown"""
         try:
-            data = {
-                'timestamp': datetime.now().isoformat(),
-                'watched_orders': [order.to_dict() for order in self.watched_orders.values()]
-            }
-            
-            with open(self.persistence_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-                
+            self.state_journal.compact([order.to_dict() for order in self.watched_orders.values()])
         except Exception as e:
             logger.error(f"❌ Ошибка сохранения состояния: {e}")
     
+    def _persist_order(self, order: WatchedOrder) -> None:
+        """Обновляет индексы и дописывает состояние ордера в журнал (вызывать под self.lock)"""
+        self.watched_orders.reindex(order)
+        self._update_price_triggers(order)
+        try:
+            if self.state_journal.append(OP_UPSERT, order.order_id, order.to_dict()):
+                self._save_persistent_state()
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи журнала состояния: {e}")
+    
+    def _remove_watched_order(self, order_id: str) -> Optional[WatchedOrder]:
+        """Убирает ордер из отслеживания и дописывает удаление в журнал"""
+        with self.lock:
+            order = self.watched_orders.pop(order_id, None)
+            if order is not None:
+                self._persist_removal(order_id)
+            return order
+    
+    def _persist_removal(self, order_id: str) -> None:
+        """Дописывает удаление ордера в журнал (вызывать под self.lock)"""
+        self.price_triggers.remove(order_id)
+        try:
+            if self.state_journal.append(OP_REMOVE, order_id):
+                self._save_persistent_state()
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи журнала состояния: {e}")
+    
+    def _update_price_triggers(self, order: WatchedOrder) -> None:
+        """Уровни ордера по статусу: pending - цена входа, SL_TP_PLACED - стоп и тейк"""
+        is_long = order.side == 'BUY'
+        if order.status == OrderStatus.PENDING:
+            levels = [('entry', order.price, DIRECTION_DOWN if is_long else DIRECTION_UP)]
+        elif order.status == OrderStatus.SL_TP_PLACED:
+            levels = [
+                ('sl', order.stop_loss, DIRECTION_DOWN if is_long else DIRECTION_UP),
+                ('tp', order.take_profit, DIRECTION_UP if is_long else DIRECTION_DOWN),
+            ]
+        else:
+            levels = []
+        self.price_triggers.set_levels(order.order_id, order.symbol, levels)
+    
+    def _triggered_order_ids(self) -> Set[str]:
+        """Ордера, к уровням которых подошла цена (общая таблица PriceFeed)"""
+        triggered: Set[str] = set()
+        for symbol in self.price_triggers.symbols():
+            price = self.price_feed.get_price(symbol)
+            if price:
+                triggered |= self.price_triggers.observe(symbol, price)
+            else:
+                # Нет цены - не рискуем пропустить исполнение, проверяем символ целиком
+                with self.lock:
+                    triggered.update(o.order_id for o in self.watched_orders.for_symbol(symbol))
+        
+        with self.lock:
+            # Ордер мог быть удален между observe и этой проверкой
+            return {order_id for order_id in triggered if order_id in self.watched_orders}
+    
     def _sync_with_exchange_on_startup(self) -> None:
         """Полная синхронизация с биржей при запуске - восстанавливает ордера и анализирует позиции"""
         if not self.client:
@@ -399,6 +510,7 @@ class OrdersWatchdog:
             
             with self.lock:
                 self.watched_orders[order_id] = restored_order
+                self._update_price_triggers(restored_order)
             
             logger.info(f"🔄 Восстановлен {symbol} ордер #{order_id} ({signal_type}, истекает: {restored_order.expires_at.strftime('%H:%M:%S')})")
             
@@ -444,8 +556,14 @@ class OrdersWatchdog:
             order.expires_at = order.calculate_expiry_time()
             
             with self.lock:
+                if order.order_id in self.watched_orders:
+                    # Повтор запроса (RPC + файловый канал): не затираем исполненный
+                    # ордер с sl_order_id / tp_order_id новым PENDING
+                    logger.info(f"👁️ Ордер {order.symbol} #{order.order_id} уже отслеживается")
+                    return True
                 self.watched_orders[order.order_id] = order
-                self._save_persistent_state()
+                self._persist_order(order)
+                self._replay_unmatched_events(order.order_id)
             
             logger.info(f"👁️ Добавлен в отслеживание: {order.symbol} ордер {order.order_id} (истекает: {order.expires_at.strftime('%H:%M:%S')})")
             self._send_watchdog_notification(f"👁️ Начал отслеживание ордера {order.symbol} #{order.order_id}")
@@ -459,96 +577,205 @@ class OrdersWatchdog:
     def remove_order_from_watch(self, order_id: str) -> bool:
         """Удаляет ордер из отслеживания"""
         try:
-            with self.lock:
-                if order_id in self.watched_orders:
-                    order = self.watched_orders.pop(order_id)
-                    self._save_persistent_state()
-                    logger.info(f"👁️ Убран из отслеживания: {order.symbol} ордер {order_id}")
-                    return True
-                else:
-                    logger.warning(f"⚠️ Ордер {order_id} не найден в отслеживании")
-                    return False
+            order = self._remove_watched_order(order_id)
+            if order is not None:
+                logger.info(f"👁️ Убран из отслеживания: {order.symbol} ордер {order_id}")
+                return True
+            logger.warning(f"⚠️ Ордер {order_id} не найден в отслеживании")
+            return False
         except Exception as e:
             logger.error(f"❌ Ошибка удаления ордера из отслеживания: {e}")
             return False
     
-    def _process_incoming_requests(self) -> None:
-        """Обрабатывает входящие запросы на добавление ордеров"""
+    def _rpc_handlers(self) -> Dict[str, Any]:
+        """Действия, доступные через RPC и файловый канал"""
+        return {
+            'add_order': self.add_order_to_watch,
+            'get_watched_symbols': lambda _data: self.get_watched_symbols(),
+            'check_conflicts': lambda data: self.check_symbol_conflicts(data or []),
+            'get_status': lambda _data: self.get_status(),
+        }
+    
+    def _start_rpc_server(self) -> None:
+        """Поднимает RPC сервер (без него работает только файловый канал)"""
+        if not WATCHDOG_RPC_ENABLED:
+            return
         try:
-            if not self.requests_file.exists():
+            self.rpc_server = WatchdogRPCServer(
+                self._rpc_handlers(), resolve_address(WATCHDOG_RPC_SOCKET, WATCHDOG_RPC_PORT)
+            )
+            self.rpc_server.start()
+        except Exception as e:
+            logger.error(f"❌ Не удалось запустить Watchdog RPC, используется файловый канал: {e}")
+            self.rpc_server = None
+    
+    def _take_cycle_snapshot(self) -> None:
+        """Снимок open orders + позиций на цикл (при ошибке - запросы по ордерам как раньше)"""
+        self._cycle_snapshot = None
+        if not WATCHDOG_SNAPSHOT_MODE or not self.client:
+            return
+        try:
+            open_orders = self.client.futures_get_open_orders()
+            positions = self.client.futures_position_information()
+            self._cycle_snapshot = CycleSnapshot(
+                open_orders={str(o['orderId']): o for o in open_orders},
+                positions=positions,
+                taken_at=time.time()
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось получить снимок биржи, проверяем ордера по одному: {e}")
+    
+    def _current_snapshot(self) -> Optional[CycleSnapshot]:
+        """Снимок текущего цикла (старше check_interval - не используется)"""
+        snapshot = self._cycle_snapshot
+        if snapshot and time.time() - snapshot.taken_at <= self.check_interval:
+            return snapshot
+        return None
+    
+    def _get_order_info(self, symbol: str, order_id: str) -> Dict[str, Any]:
+        """Статус ордера: из снимка, если он еще открыт, иначе futures_get_order"""
+        snapshot = self._current_snapshot()
+        if snapshot:
+            open_order = snapshot.get_open_order(order_id)
+            if open_order is not None:
+                return open_order
+        # Ордер исчез из открытых (исполнен/отменен) или снимка нет - точный статус
+        return self.client.futures_get_order(symbol=symbol, orderId=order_id)
+    
+    def _get_positions(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Позиции из снимка цикла или futures_position_information"""
+        snapshot = self._current_snapshot()
+        if snapshot:
+            return snapshot.positions_for(symbol) if symbol else list(snapshot.positions)
+        if symbol:
+            return self.client.futures_position_information(symbol=symbol)
+        return self.client.futures_position_information()
+    
+    def _start_event_source(self) -> None:
+        """Подключает источник событий ордеров (без него - REST опрос каждый цикл)"""
+        try:
+            self.event_source = create_order_event_source(BINANCE_API_KEY, BINANCE_API_SECRET, BINANCE_TESTNET)
+            if self.event_source:
+                self.event_source.start(self._on_stream_event)
+        except Exception as e:
+            logger.error(f"❌ Не удалось подключить события ордеров, используется REST опрос: {e}")
+            self.event_source = None
+    
+    def _on_stream_event(self, event: Union[OrderEvent, PositionEvent]) -> None:
+        """Callback источника событий (поток websocket): только ставит в очередь"""
+        self.event_queue.put(event)
+        self.wake_event.set()
+    
+    def _events_live(self) -> bool:
+        """Поток событий активен - REST опрос только как страховка"""
+        if not self.event_source:
+            return False
+        live = self.event_source.connected
+        transitions = self.event_source.live_transitions
+        if transitions != self._event_live_transitions:
+            # Stream (пере)подключился: исполнение за время разрыва событием уже не
+            # придет - полная REST сверка на этом же цикле, а не через safety interval
+            self._event_live_transitions = transitions
+            self._last_rest_sweep = 0.0
+        return live
+    
+    def _drain_order_events(self) -> None:
+        """Применяет накопленные события к WatchedOrder (в потоке главного цикла)"""
+        while True:
+            try:
+                event = self.event_queue.get_nowait()
+            except queue.Empty:
                 return
-            
-            # Читаем запросы
-            with open(self.requests_file, 'r', encoding='utf-8') as f:
-                requests_data = json.load(f)
-            
+            try:
+                if isinstance(event, PositionEvent):
+                    if event.is_closed:
+                        self._positions_check_due = True
+                else:
+                    self._apply_order_event(event)
+            except Exception as e:
+                logger.error(f"❌ Ошибка применения события {event}: {e}")
+    
+    def _buffer_unmatched_event(self, event: OrderEvent) -> None:
+        """Событие неизвестного ордера - до add_order_to_watch (вызывать под self.lock)"""
+        now = time.time()
+        while self._unmatched_events:
+            order_id, (received_at, _) = next(iter(self._unmatched_events.items()))
+            if now - received_at < ORDER_EVENTS_BUFFER_TTL:
+                break
+            del self._unmatched_events[order_id]
+        self._unmatched_events.setdefault(str(event.order_id), (now, []))[1].append(event)
+    
+    def _replay_unmatched_events(self, order_id: str) -> None:
+        """События, пришедшие до регистрации ордера, - в очередь главного цикла (вызывать под self.lock)"""
+        _, events = self._unmatched_events.pop(order_id, (0.0, []))
+        if not events:
+            return
+        logger.info(f"📡 #{order_id}: {len(events)} событий до начала отслеживания - применяем")
+        for event in events:
+            self.event_queue.put(event)
+        self.wake_event.set()
+    
+    def _apply_order_event(self, event: OrderEvent) -> None:
+        """ORDER_TRADE_UPDATE -> переход состояния отслеживаемого ордера"""
+        with self.lock:
+            order = self.watched_orders.get(event.order_id)
+            role = 'MAIN' if order else None
+            if order is None:
+                # Индекс sl_order_id / tp_order_id хранилища - без перебора ордеров
+                leg = self.watched_orders.find_leg(event.order_id)
+                if leg is not None:
+                    order, role = leg
+            if order is None:
+                self._buffer_unmatched_event(event)
+                return
+        
+        logger.info(f"📡 {order.symbol} #{event.order_id} ({role}): {event.status}")
+        
+        if role == 'MAIN':
+            if order.status != OrderStatus.PENDING:
+                return
+            self._apply_main_order_status(order, event.to_order_info())
+            if order.status == OrderStatus.FILLED:
+                # SL/TP ставим сразу, не дожидаясь следующего цикла
+                self._handle_filled_order(order)
+            return
+        
+        if order.status != OrderStatus.SL_TP_PLACED:
+            return
+        if event.status == 'FILLED':
+            self._handle_sl_tp_filled(order, event.to_order_info(), is_stop_loss=(role == 'SL'))
+        elif event.status in ('CANCELED', 'EXPIRED', 'REJECTED'):
+            # Состояние второй ноги сверяем через REST (редкое событие)
+            self._check_sl_tp_orders(order)
+    
+    def _process_incoming_requests(self) -> None:
+        """Обрабатывает запросы файлового канала (fallback, когда RPC недоступен клиенту)"""
+        try:
+            requests_data = take_file_requests(self.requests_file)
             if not requests_data:
                 return
             
-            # Обрабатываем каждый запрос
-            processed_requests = []
+            handlers = self._rpc_handlers()
             for request in requests_data:
                 try:
                     action = request['action']
+                    handler = handlers.get(action)
+                    if handler is None:
+                        logger.warning(f"⚠️ Неизвестный запрос к watchdog: {action}")
+                        continue
                     
+                    result = handler(request.get('data'))
                     if action == 'add_order':
-                        if self.add_order_to_watch(request['data']):
+                        if result:
                             logger.info(f"📥 Обработан запрос на добавление ордера")
                         else:
                             logger.error(f"❌ Не удалось обработать запрос")
-                    
-                    elif action == 'get_watched_symbols':
-                        # Создаем файл ответа
-                        response_data = self.get_watched_symbols()
-                        response_file = Path('orders_watchdog_response.json')
-                        
-                        with open(response_file, 'w', encoding='utf-8') as f:
-                            json.dump({
-                                'action': 'get_watched_symbols_response',
-                                'timestamp': datetime.now().isoformat(),
-                                'data': response_data
-                            }, f, indent=2, ensure_ascii=False)
-                        
-                        logger.info(f"📤 Отправлен ответ о наблюдаемых символах")
-                    
-                    elif action == 'check_conflicts':
-                        # Проверяем конфликты с предлагаемыми ордерами
-                        proposed_orders = request.get('data', [])
-                        conflict_result = self.check_symbol_conflicts(proposed_orders)
-                        
-                        response_file = Path('orders_watchdog_response.json')
-                        with open(response_file, 'w', encoding='utf-8') as f:
-                            json.dump({
-                                'action': 'check_conflicts_response',
-                                'timestamp': datetime.now().isoformat(),
-                                'data': conflict_result
-                            }, f, indent=2, ensure_ascii=False)
-                        
-                        logger.info(f"📤 Отправлен результат проверки конфликтов")
-                    
-                    elif action == 'get_status':
-                        # Возвращаем статус watchdog
-                        status_data = self.get_status()
-                        response_file = Path('orders_watchdog_response.json')
-                        
-                        with open(response_file, 'w', encoding='utf-8') as f:
-                            json.dump({
-                                'action': 'get_status_response',
-                                'timestamp': datetime.now().isoformat(),
-                                'data': status_data
-                            }, f, indent=2, ensure_ascii=False)
-                        
-                        logger.info(f"📤 Отправлен статус watchdog")
-                    
-                    processed_requests.append(request)
+                    else:
+                        write_file_response(action, result)
+                        logger.info(f"📤 Отправлен ответ на {action}")
                     
                 except Exception as e:
                     logger.error(f"❌ Ошибка обработки запроса: {e}")
-            
-            # Очищаем файл после обработки
-            if processed_requests:
-                with open(self.requests_file, 'w', encoding='utf-8') as f:
-                    json.dump([], f)
                 
         except Exception as e:
             logger.error(f"❌ Ошибка обработки входящих запросов: {e}")
@@ -561,37 +788,64 @@ class OrdersWatchdog:
         # 1. Сначала проверяем и очищаем истекшие ордера
         self._cleanup_expired_orders()
         
-        with self.lock:
-            orders_to_check = list(self.watched_orders.values())
+        # При активном user data stream статусы приходят событиями,
+        # REST опрос ордеров - раз в WATCHDOG_REST_SAFETY_INTERVAL. Без stream
+        # с price triggers полный опрос - раз в PRICE_TRIGGER_SWEEP_INTERVAL,
+        # а между ними - только ордера, к уровням которых подошла цена
+        events_live = self._events_live()
+        if events_live:
+            sweep_interval = WATCHDOG_REST_SAFETY_INTERVAL
+        else:
+            sweep_interval = PRICE_TRIGGER_SWEEP_INTERVAL if PRICE_TRIGGERS_ENABLED else 0.0
+        rest_due = time.time() - self._last_rest_sweep >= sweep_interval
+        triggered = self._triggered_order_ids() if PRICE_TRIGGERS_ENABLED and not events_live else set()
         
-        if not orders_to_check:
-            return
+        # Индексы хранилища: на цикле просматриваются только ордера нужных
+        # статусов и истекающие, а не все отслеживаемые
+        with self.lock:
+            expiring = [o for o in self.watched_orders.expiring_before(datetime.now() + timedelta(minutes=15))
+                        if o.status == OrderStatus.PENDING]
+            if rest_due:
+                pending = self.watched_orders.with_status(OrderStatus.PENDING)
+            else:
+                pending = [o for o in (self.watched_orders.get(order_id) for order_id in triggered)
+                           if o is not None and o.status == OrderStatus.PENDING]
+            has_protected = self.watched_orders.count_status(OrderStatus.SL_TP_PLACED) > 0
         
-        logger.debug(f"🔍 Проверяем {len(orders_to_check)} ордеров...")
+        if rest_due:
+            self._last_rest_sweep = time.time()
+            if pending or has_protected:
+                self._take_cycle_snapshot()
         
-        for order in orders_to_check:
+        for order in expiring:
             # Проверяем истечение перед обработкой
-            if order.is_expired() and order.status == OrderStatus.PENDING:
+            if order.is_expired():
                 logger.info(f"⏰ Ордер {order.symbol} #{order.order_id} истек - отменяем")
                 self._handle_expired_order(order)
-                continue
-                
-            # Уведомляем о скором истечении
-            if order.should_expire_soon(15) and order.status == OrderStatus.PENDING:
+            else:
+                # Уведомляем о скором истечении
                 logger.warning(f"⚠️ Ордер {order.symbol} #{order.order_id} истекает через 15 минут")
-            
-            if order.status == OrderStatus.PENDING:
+        
+        for order in pending:
+            if order.status == OrderStatus.PENDING and not order.is_expired():
                 self._check_single_order(order)
-            elif order.status == OrderStatus.FILLED:
-                self._handle_filled_order(order)
-            elif order.status == OrderStatus.SL_TP_PLACED:
-                self._check_sl_tp_orders(order)
-                # РАСШИРЕНИЕ: Проверяем трейлинг для всех активных позиций с SL/TP
-                if not order.trailing_triggered:
-                    self._check_trailing_conditions(order)
-            elif order.status == OrderStatus.SL_TP_ERROR:
-                # Игнорируем ордера с ошибками SL/TP
+        
+        # Исполненные (в т.ч. только что) - размещаем SL/TP
+        with self.lock:
+            filled = self.watched_orders.with_status(OrderStatus.FILLED)
+        for order in filled:
+            self._handle_filled_order(order)
+        
+        with self.lock:
+            protected = self.watched_orders.with_status(OrderStatus.SL_TP_PLACED)
+        for order in protected:
+            if order.status != OrderStatus.SL_TP_PLACED:
                 continue
+            if rest_due or order.order_id in triggered:
+                self._check_sl_tp_orders(order)
+            # РАСШИРЕНИЕ: Проверяем трейлинг для всех активных позиций с SL/TP
+            if not order.trailing_triggered:
+                self._check_trailing_conditions(order)
     
     def _check_single_order(self, order: WatchedOrder) -> None:
         """Проверяет статус одного ордера"""
@@ -599,43 +853,44 @@ class OrdersWatchdog:
             return
             
         try:
-            # Получаем информацию об ордере
-            order_info = self.client.futures_get_order(
-                symbol=order.symbol,
-                orderId=order.order_id
-            )
+            # Получаем информацию об ордере (из снимка цикла, если он еще открыт)
+            order_info = self._get_order_info(order.symbol, order.order_id)
             
-            status = order_info['status']
-            
-            if status == 'FILLED':
-                logger.info(f"🎉 Ордер {order.symbol} #{order.order_id} ИСПОЛНЕН!")
-                
-                # Обновляем статус
-                with self.lock:
-                    order.status = OrderStatus.FILLED
-                    order.filled_at = datetime.now()
-                    self._save_persistent_state()
-                
-                # Отправляем уведомление об исполнении
-                self._send_order_filled_notification(order, order_info)
-                
-            elif status in ['CANCELED', 'REJECTED', 'EXPIRED']:
-                logger.info(f"🚫 Ордер {order.symbol} #{order.order_id} отменен/отклонен: {status}")
-                
-                # Обновляем статус и удаляем из отслеживания
-                with self.lock:
-                    order.status = OrderStatus.CANCELLED
-                    self._save_persistent_state()
-                
-                # Отправляем уведомление об отмене
-                self._send_order_cancelled_notification(order, status)
-                
-                # Удаляем из отслеживания
-                self.remove_order_from_watch(order.order_id)
+            self._apply_main_order_status(order, order_info)
                 
         except Exception as e:
             logger.error(f"❌ Ошибка проверки ордера {order.order_id}: {e}")
     
+    def _apply_main_order_status(self, order: WatchedOrder, order_info: Dict[str, Any]) -> None:
+        """Переход pending ордера по статусу с биржи (REST ответ или событие stream)"""
+        status = order_info['status']
+        
+        if status == 'FILLED':
+            logger.info(f"🎉 Ордер {order.symbol} #{order.order_id} ИСПОЛНЕН!")
+            
+            # Обновляем статус
+            with self.lock:
+                order.status = OrderStatus.FILLED
+                order.filled_at = datetime.now()
+                self._persist_order(order)
+            
+            # Отправляем уведомление об исполнении
+            self._send_order_filled_notification(order, order_info)
+            
+        elif status in ['CANCELED', 'REJECTED', 'EXPIRED']:
+            logger.info(f"🚫 Ордер {order.symbol} #{order.order_id} отменен/отклонен: {status}")
+            
+            # Обновляем статус и удаляем из отслеживания
+            with self.lock:
+                order.status = OrderStatus.CANCELLED
+                self._persist_order(order)
+            
+            # Отправляем уведомление об отмене
+            self._send_order_cancelled_notification(order, status)
+            
+            # Удаляем из отслеживания
+            self.remove_order_from_watch(order.order_id)
+    
     def _handle_filled_order(self, order: WatchedOrder) -> None:
         """Обрабатывает исполненный ордер - размещает SL/TP"""
         if order.status != OrderStatus.FILLED:
@@ -646,31 +901,31 @@ class OrdersWatchdog:
             logger.warning(f"⚠️ Максимум попыток размещения SL/TP для {order.symbol} исчерпан")
             with self.lock:
                 order.status = OrderStatus.SL_TP_ERROR
-                self._save_persistent_state()
+                self._persist_order(order)
             return
             
         try:
             # Увеличиваем счетчик попыток
             with self.lock:
                 order.sl_tp_attempts += 1
-                self._save_persistent_state()
+                self._persist_order(order)
             
             logger.info(f"🛡️ Размещаем SL/TP для {order.symbol} (попытка {order.sl_tp_attempts}/3)...")
             
-            # Размещаем Stop Loss
-            sl_success, sl_order_id = self._place_stop_loss(order)
-            
-            # Размещаем Take Profit
-            tp_success, tp_order_id = self._place_take_profit(order)
+            # Размещаем Stop Loss + Take Profit (одним пакетом); ноги, принятые
+            # на прошлой попытке, не повторяются
+            sl_tp_success, sl_order_id, tp_order_id = self._place_sl_tp(
+                order, order.sl_order_id, order.tp_order_id
+            )
             
-            if sl_success and tp_success:
+            if sl_tp_success:
                 # Обновляем статус (проверяем что order_id не None)
                 if sl_order_id and tp_order_id:
                     with self.lock:
                         order.status = OrderStatus.SL_TP_PLACED
                         order.sl_order_id = sl_order_id
                         order.tp_order_id = tp_order_id
-                        self._save_persistent_state()
+                        self._persist_order(order)
                     
                     logger.info(f"✅ SL/TP размещены для {order.symbol}: SL={sl_order_id}, TP={tp_order_id}")
                     
@@ -683,15 +938,16 @@ class OrdersWatchdog:
                     logger.error(f"❌ Получены пустые ID для SL/TP ордеров")
                     with self.lock:
                         order.status = OrderStatus.SL_TP_ERROR
-                        self._save_persistent_state()
+                        self._persist_order(order)
                     self._send_sl_tp_error_notification(order)
                 
             else:
                 logger.error(f"❌ Не удалось разместить SL/TP для {order.symbol}")
+                self._keep_placed_legs(order, sl_order_id, tp_order_id)
                 if order.sl_tp_attempts >= 3:
                     with self.lock:
                         order.status = OrderStatus.SL_TP_ERROR
-                        self._save_persistent_state()
+                        self._persist_order(order)
                     self._send_sl_tp_error_notification(order)
                 
         except Exception as e:
@@ -699,7 +955,7 @@ class OrdersWatchdog:
             if order.sl_tp_attempts >= 3:
                 with self.lock:
                     order.status = OrderStatus.SL_TP_ERROR
-                    self._save_persistent_state()
+                    self._persist_order(order)
                 self._send_sl_tp_error_notification(order)
     
     def _check_sl_tp_orders(self, order: WatchedOrder) -> None:
@@ -721,10 +977,7 @@ class OrdersWatchdog:
             # Проверяем Stop Loss ордер
             if order.sl_order_id:
                 try:
-                    sl_info = self.client.futures_get_order(
-                        symbol=order.symbol,
-                        orderId=order.sl_order_id
-                    )
+                    sl_info = self._get_order_info(order.symbol, order.sl_order_id)
                     
                     if sl_info['status'] == 'FILLED':
                         sl_filled = True
@@ -740,10 +993,7 @@ class OrdersWatchdog:
             # Проверяем Take Profit ордер (только если SL не исполнен)
             if not sl_filled and order.tp_order_id:
                 try:
-                    tp_info = self.client.futures_get_order(
-                        symbol=order.symbol,
-                        orderId=order.tp_order_id
-                    )
+                    tp_info = self._get_order_info(order.symbol, order.tp_order_id)
                     
                     if tp_info['status'] == 'FILLED':
                         tp_filled = True
@@ -796,7 +1046,7 @@ class OrdersWatchdog:
             # Помечаем как завершенный и удаляем из отслеживания
             with self.lock:
                 order.status = OrderStatus.COMPLETED
-                self._save_persistent_state()
+                self._persist_order(order)
             
             self.remove_order_from_watch(order.order_id)
             logger.info(f"✅ Позиция {order.symbol} полностью закрыта, P&L: {pnl:.2f} USDT")
@@ -817,10 +1067,12 @@ class OrdersWatchdog:
             return
             
         try:
-            # TRAILING_LOG: Получение текущей цены с биржи
-            trailing_logger.debug(f"📡 {order.symbol} | Запрос текущей цены с биржи...")
-            ticker_data = self.client.futures_symbol_ticker(symbol=order.symbol)
-            current_price = float(ticker_data['price'])
+            # TRAILING_LOG: Получение текущей цены из общей таблицы цен
+            trailing_logger.debug(f"📡 {order.symbol} | Запрос текущей цены...")
+            current_price = self.price_feed.get_price(order.symbol)
+            if current_price is None:
+                ticker_data = self.client.futures_symbol_ticker(symbol=order.symbol)
+                current_price = float(ticker_data['price'])
             
             entry_price = order.price
             stop_loss = order.stop_loss  
@@ -927,7 +1179,7 @@ class OrdersWatchdog:
                         order.trailing_triggered = True
                         order.sl_order_id = new_sl_order['orderId']
                         order.stop_loss = rounded_sl_price
-                        self._save_persistent_state()
+                        self._persist_order(order)
                     
                     # TRAILING_LOG: Финальные результаты трейлинга
                     trailing_logger.info(f"🎉 {order.symbol} | ТРЕЙЛИНГ ЗАВЕРШЕН!")
@@ -963,7 +1215,7 @@ class OrdersWatchdog:
             logger.warning(f"🔧 Попытка восстановления SL для {order.symbol}...")
             
             # Проверяем, что позиция еще открыта
-            positions = self.client.futures_position_information(symbol=order.symbol)
+            positions = self._get_positions(order.symbol)
             position_open = False
             for pos in positions:
                 if pos['positionSide'] == order.position_side and float(pos['positionAmt']) != 0:
@@ -995,7 +1247,7 @@ class OrdersWatchdog:
                 # Увеличиваем счетчик попыток
                 with self.lock:
                     order.sl_tp_attempts += 1
-                    self._save_persistent_state()
+                    self._persist_order(order)
                 
                 # Пытаемся разместить новый SL
                 sl_success, new_sl_order_id = self._place_stop_loss(order)
@@ -1004,7 +1256,7 @@ class OrdersWatchdog:
                     # Обновляем ID SL ордера
                     with self.lock:
                         order.sl_order_id = new_sl_order_id
-                        self._save_persistent_state()
+                        self._persist_order(order)
                     
                     logger.info(f"✅ SL восстановлен для {order.symbol}: {new_sl_order_id}")
                     self._send_sl_restored_notification(order, new_sl_order_id)
@@ -1014,13 +1266,13 @@ class OrdersWatchdog:
                         # Максимум попыток исчерпан - помечаем как ошибку
                         with self.lock:
                             order.status = OrderStatus.SL_TP_ERROR
-                            self._save_persistent_state()
+                            self._persist_order(order)
                         self._send_sl_restore_failed_notification(order)
             else:
                 logger.error(f"❌ Максимум попыток восстановления SL для {order.symbol} исчерпан")
                 with self.lock:
                     order.status = OrderStatus.SL_TP_ERROR
-                    self._save_persistent_state()
+                    self._persist_order(order)
                 self._send_sl_restore_failed_notification(order)
                 
         except Exception as e:
@@ -1035,7 +1287,7 @@ class OrdersWatchdog:
             logger.warning(f"🔧 Оба ордера отменены для {order.symbol} - проверяем позицию...")
             
             # Проверяем, что позиция еще открыта
-            positions = self.client.futures_position_information(symbol=order.symbol)
+            positions = self._get_positions(order.symbol)
             position_open = False
             for pos in positions:
                 if pos['positionSide'] == order.position_side and float(pos['positionAmt']) != 0:
@@ -1056,34 +1308,34 @@ class OrdersWatchdog:
                 # Увеличиваем счетчик попыток
                 with self.lock:
                     order.sl_tp_attempts += 1
-                    self._save_persistent_state()
+                    self._persist_order(order)
                 
                 # Пытаемся разместить новые SL/TP
-                sl_success, new_sl_order_id = self._place_stop_loss(order)
-                tp_success, new_tp_order_id = self._place_take_profit(order)
+                sl_tp_success, new_sl_order_id, new_tp_order_id = self._place_sl_tp(order)
                 
-                if sl_success and tp_success and new_sl_order_id and new_tp_order_id:
+                if sl_tp_success and new_sl_order_id and new_tp_order_id:
                     # Обновляем ID ордеров
                     with self.lock:
                         order.sl_order_id = new_sl_order_id
                         order.tp_order_id = new_tp_order_id
                         order.status = OrderStatus.SL_TP_PLACED
-                        self._save_persistent_state()
+                        self._persist_order(order)
                     
                     logger.info(f"✅ SL/TP восстановлены для {order.symbol}: SL={new_sl_order_id}, TP={new_tp_order_id}")
                     self._send_sl_tp_restored_notification(order, new_sl_order_id, new_tp_order_id)
                 else:
                     logger.error(f"❌ Не удалось восстановить SL/TP для {order.symbol}")
+                    self._keep_placed_legs(order, new_sl_order_id, new_tp_order_id)
                     # Помечаем как ошибку
                     with self.lock:
                         order.status = OrderStatus.SL_TP_ERROR
-                        self._save_persistent_state()
+                        self._persist_order(order)
                     self._send_sl_tp_error_notification(order)
             else:
                 logger.error(f"❌ Максимум попыток восстановления SL/TP для {order.symbol} исчерпан")
                 with self.lock:
                     order.status = OrderStatus.SL_TP_ERROR
-                    self._save_persistent_state()
+                    self._persist_order(order)
                 self._send_sl_tp_error_notification(order)
                 
         except Exception as e:
@@ -1098,7 +1350,7 @@ class OrdersWatchdog:
             logger.warning(f"🔧 Попытка восстановления TP для {order.symbol}...")
             
             # Проверяем, что позиция еще открыта
-            positions = self.client.futures_position_information(symbol=order.symbol)
+            positions = self._get_positions(order.symbol)
             position_open = False
             for pos in positions:
                 if pos['positionSide'] == order.position_side and float(pos['positionAmt']) != 0:
@@ -1130,7 +1382,7 @@ class OrdersWatchdog:
                 # Увеличиваем счетчик попыток
                 with self.lock:
                     order.sl_tp_attempts += 1
-                    self._save_persistent_state()
+                    self._persist_order(order)
                 
                 # Пытаемся разместить новый TP
                 tp_success, new_tp_order_id = self._place_take_profit(order)
@@ -1139,7 +1391,7 @@ class OrdersWatchdog:
                     # Обновляем ID TP ордера
                     with self.lock:
                         order.tp_order_id = new_tp_order_id
-                        self._save_persistent_state()
+                        self._persist_order(order)
                     
                     logger.info(f"✅ TP восстановлен для {order.symbol}: {new_tp_order_id}")
                     self._send_tp_restored_notification(order, new_tp_order_id)
@@ -1149,13 +1401,13 @@ class OrdersWatchdog:
                         # Максимум попыток исчерпан - помечаем как ошибку
                         with self.lock:
                             order.status = OrderStatus.SL_TP_ERROR
-                            self._save_persistent_state()
+                            self._persist_order(order)
                         self._send_tp_restore_failed_notification(order)
             else:
                 logger.error(f"❌ Максимум попыток восстановления TP для {order.symbol} исчерпан")
                 with self.lock:
                     order.status = OrderStatus.SL_TP_ERROR
-                    self._save_persistent_state()
+                    self._persist_order(order)
                 self._send_tp_restore_failed_notification(order)
                 
         except Exception as e:
@@ -1291,26 +1543,100 @@ class OrdersWatchdog:
         except Exception as e:
             logger.error(f"❌ Ошибка уведомления о Take Profit: {e}")
     
+    def _stop_loss_params(self, order: WatchedOrder) -> Dict[str, Any]:
+        """Параметры STOP_MARKET ордера для закрытия позиции"""
+        sl_side = 'SELL' if order.signal_type == 'LONG' else 'BUY'
+        sl_price = round_price_for_symbol(order.symbol, order.stop_loss)
+        return {
+            'symbol': order.symbol,
+            'side': sl_side,
+            'type': 'STOP_MARKET',
+            'quantity': order.quantity,
+            'stopPrice': str(sl_price),
+            'timeInForce': 'GTC',
+            'positionSide': order.position_side
+        }
+    
+    def _take_profit_params(self, order: WatchedOrder) -> Dict[str, Any]:
+        """Параметры TAKE_PROFIT_MARKET ордера для закрытия позиции"""
+        tp_side = 'SELL' if order.signal_type == 'LONG' else 'BUY'
+        tp_price = round_price_for_symbol(order.symbol, order.take_profit)
+        return {
+            'symbol': order.symbol,
+            'side': tp_side,
+            'type': 'TAKE_PROFIT_MARKET',  # ✅ правильный тип для закрытия позиции в Hedge Mode
+            'quantity': order.quantity,
+            'stopPrice': str(tp_price),    # ✅ stopPrice - цена триггера
+            'timeInForce': 'GTC',
+            'positionSide': order.position_side  # ✅ Указываем какую позицию закрываем
+        }
+    
+    def _place_sl_tp(self, order: WatchedOrder, sl_order_id: Optional[str] = None,
+                     tp_order_id: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Размещает недостающие SL и TP (обе ноги - одним batchOrders запросом)
+        
+        Позиция уже открыта, поэтому принятая нога не откатывается, если
+        другая отклонена (например, TP -2021 "would immediately trigger"):
+        стоп остается на бирже, повторяется только недостающая нога.
+        При BATCH_ORDERS_ENABLED=false - последовательное размещение.
+        
+        Args:
+            sl_order_id: Уже размещенный SL (не размещается повторно)
+            tp_order_id: Уже размещенный TP (не размещается повторно)
+        
+        Returns:
+            Tuple[success, sl_order_id, tp_order_id] - ID и при частичном успехе
+        """
+        if not self.client:
+            return False, sl_order_id, tp_order_id
+        
+        if BATCH_ORDERS_ENABLED and not sl_order_id and not tp_order_id:
+            sl_params = self._stop_loss_params(order)
+            tp_params = self._take_profit_params(order)
+            logger.info(f"🛡️ Размещаем SL/TP пакетом для {order.symbol}: {order.quantity} "
+                        f"SL at {sl_params['stopPrice']}, TP at {tp_params['stopPrice']}")
+            
+            result = place_batch_orders(self.client, [sl_params, tp_params], rollback=False)
+            sl_order_id, tp_order_id = result.order_ids
+            if not result.success:
+                logger.error(f"❌ SL/TP для {order.symbol} размещены частично: {result.error_summary()} "
+                             f"- повторяем недостающую ногу")
+        
+        if not sl_order_id:
+            _, sl_order_id = self._place_stop_loss(order)
+        if not tp_order_id:
+            _, tp_order_id = self._place_take_profit(order)
+        
+        success = bool(sl_order_id and tp_order_id)
+        if success:
+            logger.info(f"✅ Stop Loss размещен: {sl_order_id}, Take Profit размещен: {tp_order_id}")
+        return success, sl_order_id, tp_order_id
+    
+    def _keep_placed_legs(self, order: WatchedOrder, sl_order_id: Optional[str],
+                          tp_order_id: Optional[str]) -> None:
+        """Сохраняет ID принятой ноги при частичном размещении SL/TP (она защищает позицию)"""
+        if not sl_order_id and not tp_order_id:
+            return
+        with self.lock:
+            if sl_order_id:
+                order.sl_order_id = sl_order_id
+            if tp_order_id:
+                order.tp_order_id = tp_order_id
+            self._persist_order(order)
+        logger.warning(f"⚠️ {order.symbol}: на бирже оставлены SL={sl_order_id}, TP={tp_order_id}")
+    
     def _place_stop_loss(self, order: WatchedOrder) -> Tuple[bool, Optional[str]]:
         """Размещает Stop Loss ордер"""
         if not self.client:
             return False, None
             
         try:
-            sl_side = 'SELL' if order.signal_type == 'LONG' else 'BUY'
-            sl_price = round_price_for_symbol(order.symbol, order.stop_loss)
+            params = self._stop_loss_params(order)
             
-            logger.info(f"🛡️ Размещаем STOP_MARKET {sl_side} для {order.symbol}: {order.quantity} at {sl_price}")
+            logger.info(f"🛡️ Размещаем STOP_MARKET {params['side']} для {order.symbol}: {order.quantity} at {params['stopPrice']}")
             
-            stop_order = self.client.futures_create_order(
-                symbol=order.symbol,
-                side=sl_side,
-                type='STOP_MARKET',
-                quantity=order.quantity,
-                stopPrice=str(sl_price),
-                timeInForce='GTC',
-                positionSide=order.position_side
-            )
+            stop_order = self.client.futures_create_order(**params)
             
             logger.info(f"✅ Stop Loss размещен: {stop_order['orderId']}")
             return True, str(stop_order['orderId'])
@@ -1325,22 +1651,12 @@ class OrdersWatchdog:
             return False, None
             
         try:
-            # Определяем сторону для закрытия позиции (противоположную открытию)
-            tp_side = 'SELL' if order.signal_type == 'LONG' else 'BUY'
-            tp_price = round_price_for_symbol(order.symbol, order.take_profit)
+            # Сторона закрытия позиции - противоположная открытию
+            params = self._take_profit_params(order)
             
-            logger.info(f"🎯 Размещаем TAKE_PROFIT_MARKET {tp_side} для {order.symbol}: {order.quantity} at {tp_price}")
+            logger.info(f"🎯 Размещаем TAKE_PROFIT_MARKET {params['side']} для {order.symbol}: {order.quantity} at {params['stopPrice']}")
             
-            # ИСПРАВЛЕНО: используем TAKE_PROFIT_MARKET для корректного закрытия позиции в Hedge Mode
-            tp_order = self.client.futures_create_order(
-                symbol=order.symbol,
-                side=tp_side,
-                type='TAKE_PROFIT_MARKET',  # ✅ ИСПРАВЛЕНО: правильный тип для закрытия позиции
-                quantity=order.quantity,
-                stopPrice=str(tp_price),    # ✅ ИСПРАВЛЕНО: используем stopPrice для триггера
-                timeInForce='GTC',
-                positionSide=order.position_side  # ✅ Указываем какую позицию закрываем
-            )
+            tp_order = self.client.futures_create_order(**params)
             
             logger.info(f"✅ Take Profit размещен: {tp_order['orderId']}")
             
@@ -1681,8 +1997,8 @@ class OrdersWatchdog:
             return
             
         try:
-            # Получаем все открытые позиции
-            positions = self.client.futures_position_information()
+            # Получаем все открытые позиции (снимок цикла, если есть)
+            positions = self._get_positions()
             
             # Создаем множество символов с открытыми позициями
             open_positions = set()
@@ -1694,10 +2010,10 @@ class OrdersWatchdog:
             # Проверяем отслеживаемые ордера
             with self.lock:
                 orders_to_remove = []
-                for order_id, order in self.watched_orders.items():
+                for order in self.watched_orders.with_status(OrderStatus.SL_TP_PLACED):
+                    order_id = order.order_id
                     # Если у ордера есть SL/TP, но позиции нет - позиция была закрыта извне
-                    if (order.status == OrderStatus.SL_TP_PLACED and 
-                        order.symbol not in open_positions):
+                    if order.symbol not in open_positions:
                         
                         logger.info(f"🔍 Позиция {order.symbol} закрыта извне, удаляем связанные ордера")
                         
@@ -1712,10 +2028,9 @@ class OrdersWatchdog:
                 
                 # Удаляем обработанные ордера
                 for order_id in orders_to_remove:
-                    del self.watched_orders[order_id]
+                    self._remove_watched_order(order_id)
                 
                 if orders_to_remove:
-                    self._save_persistent_state()
                     logger.info(f"🧹 Удалено {len(orders_to_remove)} ордеров с закрытыми позициями")
                     
         except Exception as e:
@@ -1784,12 +2099,19 @@ class OrdersWatchdog:
                 'client_connected': self.client is not None
             }
     
-    def get_watched_symbols(self) -> Dict[str, Dict[str, Any]]:
-        """Возвращает символы под наблюдением для синхронизации с ticker_monitor"""
+    def get_watched_symbols(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Возвращает символы под наблюдением для синхронизации с ticker_monitor
+        
+        Args:
+            symbols: Только эти символы (индекс по символу), None - все
+        """
         with self.lock:
             symbols_info = {}
+            selected = self.watched_orders.symbols() if symbols is None else symbols
+            orders = [order for symbol in selected for order in self.watched_orders.for_symbol(symbol)]
             
-            for order_id, order in self.watched_orders.items():
+            for order in orders:
                 symbol = order.symbol
                 
                 if symbol not in symbols_info:
@@ -1837,7 +2159,7 @@ class OrdersWatchdog:
         with self.lock:
             conflicts = []
             recommendations = []
-            watched_symbols = self.get_watched_symbols()
+            watched_symbols = self.get_watched_symbols({p['symbol'] for p in proposed_orders})
             
             for proposed in proposed_orders:
                 symbol = proposed['symbol']
@@ -2027,8 +2349,7 @@ class OrdersWatchdog:
                     })
                     sync_report["recommendations"].append(f'Проверить статус ордера {order_id} - возможно исполнен или отменен')
                     # Remove from local tracking immediately
-                    if order_id in self.watched_orders:
-                        del self.watched_orders[order_id]
+                    if self._remove_watched_order(order_id) is not None:
                         logger.info(f"🧹 PENDING ордер {order_id} удален из локального отслеживания (не найден на бирже)")
         
         # Проверяем "лишние" ордера на бирже
@@ -2286,11 +2607,9 @@ class OrdersWatchdog:
             
         with self.lock:
             for order_id in orders_to_remove:
-                if order_id in self.watched_orders:
-                    removed_order = self.watched_orders.pop(order_id)
+                removed_order = self._remove_watched_order(order_id)
+                if removed_order is not None:
                     logger.info(f"🗑️ Удален из отслеживания: {removed_order.symbol} ордер {order_id}")
-            
-            self._save_persistent_state()
         
         logger.info(f"✅ Очищено {len(orders_to_remove)} завершенных ордеров")
         self._send_cleanup_notification(len(orders_to_remove))
@@ -2474,7 +2793,7 @@ class OrdersWatchdog:
         if tp_success and new_tp_id:
             with self.lock:
                 order.tp_order_id = new_tp_id
-                self._save_persistent_state()
+                self._persist_order(order)
             logger.info(f"✅ TP восстановлен: {new_tp_id}")
             return True
         else:
@@ -2485,21 +2804,21 @@ class OrdersWatchdog:
         """Восстанавливает оба ордера (SL и TP)"""
         with self.lock:
             order.status = OrderStatus.SL_TP_ERROR
-            self._save_persistent_state()
+            self._persist_order(order)
         
-        sl_success, new_sl_id = self._place_stop_loss(order)
-        tp_success, new_tp_id = self._place_take_profit(order)
+        sl_tp_success, new_sl_id, new_tp_id = self._place_sl_tp(order)
         
-        if sl_success and tp_success and new_sl_id and new_tp_id:
+        if sl_tp_success and new_sl_id and new_tp_id:
             with self.lock:
                 order.sl_order_id = new_sl_id
                 order.tp_order_id = new_tp_id
                 order.status = OrderStatus.SL_TP_PLACED
-                self._save_persistent_state()
+                self._persist_order(order)
             logger.info(f"✅ Защита полностью восстановлена: SL={new_sl_id}, TP={new_tp_id}")
             return True
         else:
             logger.error(f"❌ Не удалось восстановить полную защиту")
+            self._keep_placed_legs(order, new_sl_id, new_tp_id)
             return False
     
     def _cleanup_expired_orders(self) -> None:
@@ -2508,9 +2827,9 @@ class OrdersWatchdog:
             expired_orders = []
             
             with self.lock:
-                for order_id, order in list(self.watched_orders.items()):
-                    if order.is_expired() and order.status in [OrderStatus.PENDING, OrderStatus.SL_TP_ERROR]:
-                        expired_orders.append((order_id, order))
+                for order in self.watched_orders.expired():
+                    if order.status in [OrderStatus.PENDING, OrderStatus.SL_TP_ERROR]:
+                        expired_orders.append((order.order_id, order))
             
             # Обрабатываем истекшие ордера
             for order_id, order in expired_orders:
@@ -2541,10 +2860,7 @@ class OrdersWatchdog:
                 logger.info(f"🚫 Отменены SL/TP для истекшей позиции {order.symbol}")
             
             # Удаляем из отслеживания
-            with self.lock:
-                if order.order_id in self.watched_orders:
-                    del self.watched_orders[order.order_id]
-                    self._save_persistent_state()
+            self._remove_watched_order(order.order_id)
             
             # Отправляем уведомление
             self._send_order_expired_notification(order)
@@ -2597,19 +2913,28 @@ class OrdersWatchdog:
                     # Проверяем входящие запросы
                     self._process_incoming_requests()
                     
+                    # Применяем события user data stream
+                    self._drain_order_events()
+                    
                     # Проверяем статус ордеров (включает автоматическую очистку истекших)
                     self.check_orders_status()
                     
-                    # Проверяем позиции каждые 6 циклов (30 секунд)
+                    # Проверяем позиции каждые 6 циклов (30 секунд) или сразу после закрытия позиции
                     cycle_counter += 1
-                    if cycle_counter >= 6:
+                    if cycle_counter >= 6 or self._positions_check_due:
+                        self._positions_check_due = False
                         self.check_positions_status()
                         cycle_counter = 0
                     
+                    # Снимок действителен только внутри цикла
+                    self._cycle_snapshot = None
+                    
                     # Дополнительная очистка истекших ордеров каждые 6 циклов
                     cleanup_counter += 1
                     if cleanup_counter >= 6:
-                        expired_count = len([o for o in self.watched_orders.values() if o.is_expired()])
+                        with self.lock:
+                            # Heap истечения хранит только PENDING / SL_TP_ERROR
+                            expired_count = len(self.watched_orders.expired())
                         if expired_count > 0:
                             logger.info(f"🧹 Дополнительная очистка: найдено {expired_count} истекших ордеров")
                             self._cleanup_expired_orders()
@@ -2629,7 +2954,9 @@ class OrdersWatchdog:
                                 self._send_sync_alert(critical_issues)
                         sync_counter = 0
                     
-                    time.sleep(self.check_interval)
+                    # Ждем следующий цикл или событие ордера (что раньше)
+                    self.wake_event.wait(self.check_interval)
+                    self.wake_event.clear()
                     
                 except KeyboardInterrupt:
                     logger.info("⌨️ Получен сигнал остановки")
@@ -2648,16 +2975,18 @@ class OrdersWatchdog:
         logger.info("🛑 Начинается корректное завершение Orders Watchdog...")
         self.stop_event.set()
         
-        # Проверяем активные лимитные ордера
-        active_limit_orders = []
-        sl_tp_orders = []
+        if self.rpc_server:
+            self.rpc_server.stop()
+            self.rpc_server = None
+        if self.event_source:
+            self.event_source.stop()
+            self.event_source = None
+        self.price_feed.stop()
         
+        # Проверяем активные лимитные ордера
         with self.lock:
-            for order in self.watched_orders.values():
-                if order.status == OrderStatus.PENDING:
-                    active_limit_orders.append(order)
-                elif order.status == OrderStatus.SL_TP_PLACED:
-                    sl_tp_orders.append(order)
+            active_limit_orders = self.watched_orders.with_status(OrderStatus.PENDING)
+            sl_tp_orders = self.watched_orders.with_status(OrderStatus.SL_TP_PLACED)
         
         logger.info(f"📊 Найдено активных ордеров: {len(active_limit_orders)} лимитных, {len(sl_tp_orders)} позиций с SL/TP")
         
@@ -2721,9 +3050,7 @@ class OrdersWatchdog:
                     logger.info(f"✅ Отменен: {order.symbol} #{order.order_id}")
                 
                 # Удаляем из отслеживания
-                with self.lock:
-                    if order.order_id in self.watched_orders:
-                        del self.watched_orders[order.order_id]
+                self._remove_watched_order(order.order_id)
                         
             except Exception as e:
                 logger.error(f"❌ Ошибка отмены ордера {order.order_id}: {e}")
@@ -2754,9 +3081,7 @@ class OrdersWatchdog:
                             orderId=order.order_id
                         )
                     
-                    with self.lock:
-                        if order.order_id in self.watched_orders:
-                            del self.watched_orders[order.order_id]
+                    self._remove_watched_order(order.order_id)
                     
                     print(f"✅ Ордер {order.symbol} отменен")
                 except Exception as e:
@@ -2765,41 +3090,93 @@ class OrdersWatchdog:
 
 # API для интеграции с order_executor
 class WatchdogAPI:
-    """API для взаимодействия с Orders Watchdog"""
+    """
+    API для взаимодействия с Orders Watchdog
+    
+    Сначала RPC через сокет watchdog (ответ сразу), если он не слушает -
+    файловый канал orders_watchdog_requests.json (обработка в цикле watchdog).
+    """
     
     def __init__(self):
-        self.watchdog_file = Path('orders_watchdog_requests.json')
+        self.watchdog_file = REQUESTS_FILE
+        self.rpc_client: Optional[WatchdogRPCClient] = None
+        if WATCHDOG_RPC_ENABLED:
+            self.rpc_client = WatchdogRPCClient(
+                resolve_address(WATCHDOG_RPC_SOCKET, WATCHDOG_RPC_PORT), WATCHDOG_RPC_TIMEOUT
+            )
+    
+    def _rpc_call(self, action: str, data: Any = None) -> Tuple[bool, Any]:
+        """
+        (True, результат) если watchdog ответил по RPC, (False, None) - нужен fallback
+        
+        Fallback - только если соединиться не удалось. Таймаут после соединения
+        (WatchdogRPCDeliveryError) пробрасывается: запрос мог быть обработан,
+        повтор через файл выполнил бы его второй раз.
+        """
+        if not self.rpc_client or not self.rpc_client.is_available():
+            return False, None
+        try:
+            return True, self.rpc_client.call(action, data)
+        except WatchdogRPCDeliveryError:
+            raise
+        except OSError as e:
+            logger.warning(f"⚠️ Watchdog RPC недоступен ({e}), используем файловый канал")
+            return False, None
+    
+    def _file_query(self, action: str, data: Any = None, timeout: float = 12.0) -> Optional[Any]:
+        """Запрос через файл с ожиданием ответа (watchdog читает файл раз в цикл)"""
+        since = datetime.now()
+        append_file_request(action, data, self.watchdog_file)
+        return wait_file_response(action, since, timeout)
     
     def add_order_for_monitoring(self, order_data: Dict[str, Any]) -> bool:
         """
-        Добавляет ордер в очередь для мониторинга
+        Добавляет ордер в мониторинг
         Используется order_executor для передачи ордеров в watchdog
         """
         try:
-            # Читаем существующие запросы
-            requests_data = []
-            if self.watchdog_file.exists():
-                with open(self.watchdog_file, 'r', encoding='utf-8') as f:
-                    requests_data = json.load(f)
-            
-            # Добавляем новый запрос
-            request = {
-                'action': 'add_order',
-                'data': order_data,
-                'timestamp': datetime.now().isoformat()
-            }
-            requests_data.append(request)
-            
-            # Сохраняем
-            with open(self.watchdog_file, 'w', encoding='utf-8') as f:
-                json.dump(requests_data, f, indent=2, ensure_ascii=False)
+            answered, added = self._rpc_call('add_order', order_data)
+            if answered:
+                if added:
+                    logger.info(f"🔌 Ордер {order_data.get('symbol', 'UNKNOWN')} передан в watchdog по RPC")
+                return bool(added)
             
+            append_file_request('add_order', order_data, self.watchdog_file)
             logger.info(f"📝 Добавлен запрос на мониторинг ордера {order_data.get('symbol', 'UNKNOWN')}")
             return True
             
+        except WatchdogRPCDeliveryError as e:
+            logger.error(f"❌ {e}: ордер {order_data.get('symbol', 'UNKNOWN')} "
+                         f"#{order_data.get('order_id')} мог быть не принят watchdog")
+            return False
         except Exception as e:
             logger.error(f"❌ Ошибка добавления запроса на мониторинг: {e}")
             return False
+    
+    def get_watched_symbols(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Символы под наблюдением watchdog (None - watchdog не ответил)"""
+        return self._query('get_watched_symbols')
+    
+    def check_conflicts(self, proposed_orders: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Конфликты предлагаемых ордеров с отслеживаемыми (None - watchdog не ответил)"""
+        return self._query('check_conflicts', proposed_orders)
+    
+    def get_status(self) -> Optional[Dict[str, Any]]:
+        """Статус watchdog (None - watchdog не ответил)"""
+        return self._query('get_status')
+    
+    def _query(self, action: str, data: Any = None) -> Optional[Any]:
+        try:
+            answered, result = self._rpc_call(action, data)
+            if answered:
+                return result
+            return self._file_query(action, data)
+        except WatchdogRPCError as e:
+            logger.error(f"❌ Watchdog отклонил {action}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"❌ Ошибка запроса {action} к watchdog: {e}")
+            return None
 
 
 # Глобальный экземпляр API для использования в order_executor
@@ -2877,9 +3254,7 @@ def sync_json_with_db(sync_report):
             "timestamp": datetime.now().isoformat(),
             "watched_orders": json_orders
         }
-        state_file = Path("orders_watchdog_state.json")
-        with open(state_file, "w", encoding="utf-8") as f:
-            json.dump(state, f, indent=2, ensure_ascii=False)
+        write_watchdog_state(Path("orders_watchdog_state.json"), state)
         logger.info(f"💾 orders_watchdog_state.json синхронизирован с БД: {len(json_orders)} ордеров")
         # Обработка удалённых ордеров
         deleted_records = []
@@ -0,0 +1,864 @@
+"""
+Paper Exchange - Локальный симулятор Binance Futures для нагрузочных тестов
+===========================================================================
+
+Реализует подмножество binance.client.Client, которое используют
+OrderExecutor, OrdersWatchdog, UnifiedSynchronizer, OrderSyncService и
+websocket_monitor:
+- futures_create_order / futures_cancel_order / futures_get_order
+- futures_get_open_orders / futures_get_all_orders / futures_place_batch_order
+- futures_position_information / futures_account
+- futures_symbol_ticker / futures_mark_price
+- futures_exchange_info / futures_leverage_bracket
+- futures_change_leverage / futures_change_margin_type
+
+Исполнение:
+- LIMIT - при касании цены (маркетабельный LIMIT исполняется сразу)
+- STOP / STOP_MARKET - при пересечении stopPrice против позиции
+- TAKE_PROFIT / TAKE_PROFIT_MARKET - при пересечении stopPrice в пользу позиции
+- MARKET - сразу по текущей цене
+Hedge mode (positionSide LONG/SHORT) и one-way (BOTH).
+
+Цены двигает детерминированный драйвер (RandomWalkPricePath с seed,
+ReplayPricePath по готовой последовательности): в бенчмарке - по шагам,
+в in-process / HTTP режиме - фоновым потоком start_price_driver().
+Начальные цены - из JSON файла {"BTCUSDT": 65000.0, ...}
+(PAPER_PRICES_FILE); символ не из файла отклоняется как на бирже
+(-1121 Invalid symbol). Без файла неизвестные символы создаются с ценой
+100.0 (только для бенчмарков). Задержка ответа и
+weight запросов настраиваются; used weight за минуту отдается в
+self.response.headers как X-MBX-USED-WEIGHT-1M (как у python-binance).
+
+Режимы:
+- in-process: PAPER_TRADING=true, futures_client.create_futures_client()
+  возвращает общий экземпляр PaperExchange
+- HTTP: python paper_exchange.py --serve --port 8765 --prices-file paper_prices.json
+  и PAPER_EXCHANGE_URL=http://127.0.0.1:8765 во всех процессах PATRIOT
+- бенчмарк: python paper_exchange.py --orders 500 --steps 2000
+
+Author: HEDGER
+Version: 1.0
+"""
+
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+from utils import logger
+from weight_governor import ALL_SYMBOLS_WEIGHTS, ENDPOINT_WEIGHTS
+
+_STOP_TYPES = {'STOP', 'STOP_MARKET'}
+_TAKE_PROFIT_TYPES = {'TAKE_PROFIT', 'TAKE_PROFIT_MARKET'}
+
+
+class PaperExchangeError(Exception):
+    """Ошибка симулятора в формате BinanceAPIException (code, message, status_code)"""
+
+    def __init__(self, code: int, message: str, status_code: int = 400):
+        super().__init__(f"APIError(code={code}): {message}")
+        self.code = code
+        self.message = message
+        self.status_code = status_code
+
+
+class RandomWalkPricePath:
+    """Детерминированное случайное блуждание цен (gaussian, seed)"""
+
+    def __init__(self, start_prices: Dict[str, float], volatility: float = 0.002, seed: int = 42):
+        """
+        Args:
+            start_prices: Начальные цены по символам
+            volatility: Стандартное отклонение шага (доля цены)
+            seed: Seed генератора (одинаковый seed = одинаковый путь)
+        """
+        self.prices = dict(start_prices)
+        self.volatility = volatility
+        self._rng = random.Random(seed)
+
+    def next(self) -> Dict[str, float]:
+        for symbol in sorted(self.prices):
+            self.prices[symbol] *= 1.0 + self._rng.gauss(0.0, self.volatility)
+        return dict(self.prices)
+
+
+class ReplayPricePath:
+    """Проигрывает заранее заданную последовательность цен"""
+
+    def __init__(self, steps: Iterable[Dict[str, float]]):
+        """
+        Args:
+            steps: Последовательность {symbol: price} по шагам
+        """
+        self._steps = iter(steps)
+        self.finished = False
+
+    def next(self) -> Optional[Dict[str, float]]:
+        prices = next(self._steps, None)
+        self.finished = prices is None
+        return prices
+
+
+class PaperExchange:
+    """In-process симулятор Binance USD-M Futures"""
+
+    def __init__(self, initial_balance: float = 10000.0, latency_ms: Tuple[float, float] = (0.0, 0.0),
+                 fee_rate: float = 0.0004, default_leverage: int = 20, seed: int = 42,
+                 weights: Optional[Dict[str, int]] = None, auto_symbols: bool = True):
+        """
+        Args:
+            initial_balance: Начальный баланс USDT
+            latency_ms: Диапазон задержки ответа (min, max) в миллисекундах
+            fee_rate: Комиссия за исполнение (доля notional)
+            default_leverage: Плечо символа по умолчанию
+            seed: Seed для задержек
+            weights: Переопределение weight по методам
+            auto_symbols: Неизвестный символ создается с ценой 100.0 (False - ошибка -1121)
+        """
+        self.wallet_balance = float(initial_balance)
+        self.latency_ms = latency_ms
+        self.fee_rate = fee_rate
+        self.default_leverage = default_leverage
+        self.weights = {**ENDPOINT_WEIGHTS, **(weights or {})}
+        self.auto_symbols = auto_symbols
+        self.seed = seed
+        self.response = SimpleNamespace(headers={})
+        # Used weight последнего запроса потока: HTTP handler отвечает своим
+        # значением, а не тем, что записал в self.response параллельный запрос
+        self._local = threading.local()
+
+        self._lock = threading.RLock()
+        self._rng = random.Random(seed)
+        self._order_ids = itertools.count(1)
+        self._symbols: Dict[str, Dict[str, Any]] = {}
+        self._orders: Dict[int, Dict[str, Any]] = {}
+        self._open_ids: Dict[str, List[int]] = defaultdict(list)
+        self._positions: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._leverage: Dict[str, int] = {}
+        self._margin_type: Dict[str, str] = {}
+        self._weight_log: Deque[Tuple[float, int]] = deque()
+        self._calls: Dict[str, int] = defaultdict(int)
+        self._fills = 0
+        self._realized_pnl = 0.0
+        self._driver_thread: Optional[threading.Thread] = None
+        self._driver_stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Символы и цены
+    # ------------------------------------------------------------------
+
+    def add_symbol(self, symbol: str, price: float, tick_size: float = 0.0001, step_size: float = 0.001,
+                   min_qty: float = 0.001, min_notional: float = 5.0) -> None:
+        """Регистрирует символ с начальной ценой и фильтрами"""
+        with self._lock:
+            self._symbols[symbol] = {
+                'price': float(price),
+                'tick_size': tick_size,
+                'step_size': step_size,
+                'min_qty': min_qty,
+                'min_notional': min_notional,
+            }
+
+    def seed_prices(self, prices: Dict[str, float]) -> None:
+        """Регистрирует символы с начальными ценами; остальные символы - ошибка -1121"""
+        with self._lock:
+            for symbol, price in prices.items():
+                self.add_symbol(symbol, price)
+            self.auto_symbols = False
+
+    def _symbol(self, symbol: str) -> Dict[str, Any]:
+        """Символ симулятора (при auto_symbols неизвестный создается с ценой 100.0)"""
+        if symbol not in self._symbols:
+            if not self.auto_symbols:
+                raise PaperExchangeError(-1121, 'Invalid symbol.')
+            self.add_symbol(symbol, 100.0)
+        return self._symbols[symbol]
+
+    def set_price(self, symbol: str, price: float) -> int:
+        """
+        Устанавливает цену символа и исполняет сработавшие ордера
+
+        Returns:
+            int: Количество исполненных ордеров
+        """
+        with self._lock:
+            if symbol not in self._symbols:
+                self.add_symbol(symbol, price)
+            self._symbols[symbol]['price'] = float(price)
+            return self._match(symbol)
+
+    def advance(self, path: Any, steps: int = 1) -> int:
+        """
+        Двигает цены драйвером path на steps шагов
+
+        Returns:
+            int: Количество исполненных ордеров
+        """
+        filled = 0
+        for _ in range(steps):
+            prices = path.next()
+            if prices is None:
+                break
+            for symbol, price in prices.items():
+                filled += self.set_price(symbol, price)
+        return filled
+
+    def start_price_driver(self, path: Any = None, interval: float = 1.0,
+                           volatility: float = 0.002) -> threading.Thread:
+        """
+        Двигает цены в фоновом потоке (один шаг path раз в interval секунд)
+
+        Args:
+            path: Драйвер цен (None - RandomWalkPricePath от текущих цен с seed симулятора)
+            interval: Пауза между шагами (сек)
+            volatility: Волатильность шага RandomWalkPricePath по умолчанию
+        """
+        if path is None:
+            with self._lock:
+                start_prices = {symbol: info['price'] for symbol, info in self._symbols.items()}
+            path = RandomWalkPricePath(start_prices, volatility=volatility, seed=self.seed)
+
+        def run() -> None:
+            while not self._driver_stop.wait(interval):
+                if isinstance(path, RandomWalkPricePath):
+                    # Символы, созданные после старта (auto_symbols), тоже двигаются
+                    with self._lock:
+                        for symbol, info in self._symbols.items():
+                            path.prices.setdefault(symbol, info['price'])
+                if not self.advance(path) and isinstance(path, ReplayPricePath) and path.finished:
+                    break
+
+        self._driver_stop.clear()
+        self._driver_thread = threading.Thread(target=run, name='paper-exchange-prices', daemon=True)
+        self._driver_thread.start()
+        return self._driver_thread
+
+    def stop_price_driver(self) -> None:
+        self._driver_stop.set()
+
+    # ------------------------------------------------------------------
+    # Учет weight и задержки
+    # ------------------------------------------------------------------
+
+    def _request(self, method: str, all_symbols: bool = False) -> int:
+        """
+        Задержка ответа + учет weight (вызывать вне _lock)
+
+        Returns:
+            int: Used weight за минуту после этого запроса
+        """
+        low, high = self.latency_ms
+        if high > 0:
+            with self._lock:
+                delay = self._rng.uniform(low, high)
+            time.sleep(delay / 1000.0)
+
+        weight = ALL_SYMBOLS_WEIGHTS.get(method, 0) if all_symbols else 0
+        weight = weight or self.weights.get(method, 1)
+        now = time.monotonic()
+        with self._lock:
+            self._calls[method] += 1
+            self._weight_log.append((now, weight))
+            while self._weight_log and now - self._weight_log[0][0] > 60.0:
+                self._weight_log.popleft()
+            used = sum(w for _, w in self._weight_log)
+        self._local.used_weight = used
+        self.response = SimpleNamespace(headers={'x-mbx-used-weight-1m': str(used)})
+        return used
+
+    def last_request_weight(self) -> int:
+        """Used weight после последнего запроса текущего потока"""
+        return getattr(self._local, 'used_weight', 0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика симулятора (вызовы, weight, исполнения, PnL)"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'calls': dict(self._calls),
+                'total_calls': sum(self._calls.values()),
+                'used_weight_1m': sum(w for ts, w in self._weight_log if now - ts <= 60.0),
+                'fills': self._fills,
+                'open_orders': sum(len(ids) for ids in self._open_ids.values()),
+                'wallet_balance': round(self.wallet_balance, 4),
+                'realized_pnl': round(self._realized_pnl, 4),
+            }
+
+    # ------------------------------------------------------------------
+    # Исполнение
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _triggered(order: Dict[str, Any], price: float) -> bool:
+        """Сработал ли ордер при цене price"""
+        order_type = order['type']
+        side = order['side']
+        if order_type == 'LIMIT':
+            limit = float(order['price'])
+            return price <= limit if side == 'BUY' else price >= limit
+        stop = float(order['stopPrice'])
+        if order_type in _STOP_TYPES:
+            return price >= stop if side == 'BUY' else price <= stop
+        if order_type in _TAKE_PROFIT_TYPES:
+            return price <= stop if side == 'BUY' else price >= stop
+        return order_type == 'MARKET'
+
+    @staticmethod
+    def _fill_price(order: Dict[str, Any], price: float) -> float:
+        if order['type'] in ('LIMIT', 'STOP', 'TAKE_PROFIT'):
+            return float(order['price'])
+        return price
+
+    @staticmethod
+    def _is_closing(order: Dict[str, Any]) -> bool:
+        """Ордер закрывает hedge-позицию (LONG+SELL / SHORT+BUY)"""
+        position_side = order['positionSide']
+        return (position_side == 'LONG' and order['side'] == 'SELL') or \
+               (position_side == 'SHORT' and order['side'] == 'BUY')
+
+    def _position(self, symbol: str, position_side: str) -> Dict[str, float]:
+        return self._positions.setdefault((symbol, position_side), {'amt': 0.0, 'entry': 0.0})
+
+    def _match(self, symbol: str) -> int:
+        """Исполняет сработавшие открытые ордера символа (под _lock)"""
+        price = self._symbols[symbol]['price']
+        filled = 0
+        for order_id in list(self._open_ids[symbol]):
+            order = self._orders[order_id]
+            if order['status'] == 'NEW' and self._triggered(order, price):
+                self._execute(order, self._fill_price(order, price))
+                filled += 1
+        return filled
+
+    def _execute(self, order: Dict[str, Any], price: float) -> None:
+        """Исполняет ордер целиком и обновляет позицию (под _lock)"""
+        symbol = order['symbol']
+        position_side = order['positionSide']
+        qty = float(order['origQty'])
+        position = self._position(symbol, position_side)
+        amt = position['amt']
+
+        if position_side != 'BOTH' and self._is_closing(order):
+            # Закрывающий ордер hedge-позиции без позиции - истекает (reduce-only)
+            if amt == 0:
+                self._close_order(order, 'EXPIRED')
+                return
+            qty = min(qty, abs(amt))
+
+        signed = qty if order['side'] == 'BUY' else -qty
+        if amt == 0 or (amt > 0) == (signed > 0):
+            new_amt = amt + signed
+            position['entry'] = (abs(amt) * position['entry'] + qty * price) / abs(new_amt)
+            position['amt'] = new_amt
+        else:
+            closed = min(abs(amt), qty)
+            pnl = (price - position['entry']) * closed * (1 if amt > 0 else -1)
+            self.wallet_balance += pnl
+            self._realized_pnl += pnl
+            new_amt = amt + (closed if amt < 0 else -closed)
+            remaining = qty - closed
+            if remaining > 0 and position_side == 'BOTH':
+                # One-way: остаток переворачивает позицию
+                new_amt = remaining if signed > 0 else -remaining
+                position['entry'] = price
+            position['amt'] = new_amt
+            if new_amt == 0:
+                position['entry'] = 0.0
+
+        self.wallet_balance -= qty * price * self.fee_rate
+        order['executedQty'] = f"{qty}"
+        order['avgPrice'] = f"{price}"
+        self._fills += 1
+        self._close_order(order, 'FILLED')
+
+    def _close_order(self, order: Dict[str, Any], status: str) -> None:
+        order['status'] = status
+        order['updateTime'] = int(time.time() * 1000)
+        open_ids = self._open_ids[order['symbol']]
+        if order['orderId'] in open_ids:
+            open_ids.remove(order['orderId'])
+
+    # ------------------------------------------------------------------
+    # Ордера
+    # ------------------------------------------------------------------
+
+    def _new_order(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Валидирует и размещает ордер (под _lock)"""
+        symbol = params.get('symbol')
+        side = params.get('side')
+        order_type = params.get('type')
+        if not symbol or side not in ('BUY', 'SELL') or not order_type:
+            raise PaperExchangeError(-1102, "Mandatory parameter 'symbol', 'side' or 'type' was not sent.")
+
+        quantity = float(params.get('quantity') or 0)
+        if quantity <= 0:
+            raise PaperExchangeError(-4003, "Quantity less than or equal to zero.")
+        if order_type in ('LIMIT', 'STOP', 'TAKE_PROFIT') and not params.get('price'):
+            raise PaperExchangeError(-1102, "Mandatory parameter 'price' was not sent, was empty/null, or malformed.")
+        if order_type in _STOP_TYPES | _TAKE_PROFIT_TYPES and not params.get('stopPrice'):
+            raise PaperExchangeError(-1102, "Mandatory parameter 'stopPrice' was not sent, was empty/null, or malformed.")
+
+        info = self._symbol(symbol)
+        now_ms = int(time.time() * 1000)
+        order = {
+            'orderId': next(self._order_ids),
+            'symbol': symbol,
+            'status': 'NEW',
+            'clientOrderId': params.get('newClientOrderId') or f"paper_{now_ms}",
+            'price': str(params.get('price') or '0'),
+            'avgPrice': '0',
+            'origQty': str(quantity),
+            'executedQty': '0',
+            'type': order_type,
+            'origType': order_type,
+            'side': side,
+            'positionSide': params.get('positionSide') or 'BOTH',
+            'stopPrice': str(params.get('stopPrice') or '0'),
+            'timeInForce': params.get('timeInForce') or 'GTC',
+            'reduceOnly': str(params.get('reduceOnly', 'false')).lower() == 'true',
+            'closePosition': False,
+            'time': now_ms,
+            'updateTime': now_ms,
+        }
+
+        price = info['price']
+        if order_type in _STOP_TYPES | _TAKE_PROFIT_TYPES and self._triggered(order, price):
+            raise PaperExchangeError(-2021, "Order would immediately trigger.")
+
+        self._orders[order['orderId']] = order
+        if order_type == 'MARKET' or (order_type == 'LIMIT' and self._triggered(order, price)):
+            self._execute(order, price)
+        else:
+            self._open_ids[symbol].append(order['orderId'])
+        return dict(order)
+
+    def _get(self, symbol: str, order_id: Any) -> Dict[str, Any]:
+        order = self._orders.get(int(order_id))
+        if order is None or order['symbol'] != symbol:
+            raise PaperExchangeError(-2013, "Order does not exist.")
+        return order
+
+    def futures_create_order(self, **params: Any) -> Dict[str, Any]:
+        self._request('futures_create_order')
+        with self._lock:
+            return self._new_order(params)
+
+    def futures_place_batch_order(self, **params: Any) -> List[Dict[str, Any]]:
+        """Каждая нога исполняется независимо, ошибки - {code, msg} на месте ноги"""
+        self._request('futures_place_batch_order')
+        batch = params.get('batchOrders') or []
+        if isinstance(batch, str):
+            batch = json.loads(batch)
+        if len(batch) > 5:
+            raise PaperExchangeError(-1130, "Data sent for parameter 'batchOrders' is not valid.")
+        results: List[Dict[str, Any]] = []
+        with self._lock:
+            for leg in batch:
+                try:
+                    results.append(self._new_order(leg))
+                except PaperExchangeError as e:
+                    results.append({'code': e.code, 'msg': e.message})
+        return results
+
+    def futures_cancel_order(self, symbol: str, orderId: Any = None, **params: Any) -> Dict[str, Any]:
+        self._request('futures_cancel_order')
+        with self._lock:
+            try:
+                order = self._get(symbol, orderId)
+            except PaperExchangeError:
+                raise PaperExchangeError(-2011, "Unknown order sent.")
+            if order['status'] != 'NEW':
+                raise PaperExchangeError(-2011, "Unknown order sent.")
+            self._close_order(order, 'CANCELED')
+            return dict(order)
+
+    def futures_get_order(self, symbol: str, orderId: Any = None, **params: Any) -> Dict[str, Any]:
+        self._request('futures_get_order')
+        with self._lock:
+            return dict(self._get(symbol, orderId))
+
+    def futures_get_open_orders(self, symbol: Optional[str] = None, **params: Any) -> List[Dict[str, Any]]:
+        self._request('futures_get_open_orders', all_symbols=symbol is None)
+        with self._lock:
+            symbols = [symbol] if symbol else list(self._open_ids)
+            return [dict(self._orders[order_id]) for s in symbols for order_id in self._open_ids.get(s, [])]
+
+    def futures_get_all_orders(self, symbol: str, limit: int = 500, **params: Any) -> List[Dict[str, Any]]:
+        self._request('futures_get_all_orders')
+        with self._lock:
+            orders = [dict(o) for o in self._orders.values() if o['symbol'] == symbol]
+            return orders[-int(limit):]
+
+    # ------------------------------------------------------------------
+    # Позиции, аккаунт, настройки символа
+    # ------------------------------------------------------------------
+
+    def _position_rows(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows = []
+        for (pos_symbol, position_side), position in self._positions.items():
+            if symbol and pos_symbol != symbol:
+                continue
+            mark = self._symbols[pos_symbol]['price']
+            amt = position['amt']
+            rows.append({
+                'symbol': pos_symbol,
+                'positionAmt': f"{amt}",
+                'entryPrice': f"{position['entry']}",
+                'markPrice': f"{mark}",
+                'unRealizedProfit': f"{(mark - position['entry']) * amt if amt else 0.0}",
+                'liquidationPrice': '0',
+                'leverage': str(self._leverage.get(pos_symbol, self.default_leverage)),
+                'marginType': 'isolated' if self._margin_type.get(pos_symbol) == 'ISOLATED' else 'cross',
+                'positionSide': position_side,
+                'notional': f"{mark * amt}",
+                'isolatedWallet': '0',
+                'updateTime': int(time.time() * 1000),
+            })
+        return rows
+
+    def futures_position_information(self, symbol: Optional[str] = None, **params: Any) -> List[Dict[str, Any]]:
+        self._request('futures_position_information')
+        with self._lock:
+            return self._position_rows(symbol)
+
+    def futures_account(self, **params: Any) -> Dict[str, Any]:
+        self._request('futures_account')
+        with self._lock:
+            positions = self._position_rows()
+            unrealized = sum(float(p['unRealizedProfit']) for p in positions)
+            balance = f"{self.wallet_balance}"
+            return {
+                'totalWalletBalance': balance,
+                'totalUnrealizedProfit': f"{unrealized}",
+                'totalMarginBalance': f"{self.wallet_balance + unrealized}",
+                'availableBalance': balance,
+                'maxWithdrawAmount': balance,
+                'assets': [{'asset': 'USDT', 'walletBalance': balance, 'unrealizedProfit': f"{unrealized}"}],
+                'positions': [
+                    {**p, 'unrealizedProfit': p['unRealizedProfit']} for p in positions
+                ],
+            }
+
+    def futures_change_leverage(self, symbol: str, leverage: Any, **params: Any) -> Dict[str, Any]:
+        self._request('futures_change_leverage')
+        with self._lock:
+            self._symbol(symbol)
+            self._leverage[symbol] = int(leverage)
+            return {'symbol': symbol, 'leverage': int(leverage), 'maxNotionalValue': '1000000'}
+
+    def futures_change_margin_type(self, symbol: str, marginType: str, **params: Any) -> Dict[str, Any]:
+        self._request('futures_change_margin_type')
+        with self._lock:
+            self._symbol(symbol)
+            if self._margin_type.get(symbol, 'CROSSED') == marginType:
+                raise PaperExchangeError(-4046, "No need to change margin type.")
+            self._margin_type[symbol] = marginType
+            return {'code': 200, 'msg': 'success'}
+
+    # ------------------------------------------------------------------
+    # Рыночные данные
+    # ------------------------------------------------------------------
+
+    def futures_symbol_ticker(self, symbol: Optional[str] = None, **params: Any) -> Any:
+        self._request('futures_symbol_ticker', all_symbols=symbol is None)
+        with self._lock:
+            now_ms = int(time.time() * 1000)
+            if symbol:
+                return {'symbol': symbol, 'price': f"{self._symbol(symbol)['price']}", 'time': now_ms}
+            return [{'symbol': s, 'price': f"{info['price']}", 'time': now_ms} for s, info in self._symbols.items()]
+
+    def futures_mark_price(self, symbol: Optional[str] = None, **params: Any) -> Any:
+        self._request('futures_mark_price', all_symbols=symbol is None)
+        with self._lock:
+            now_ms = int(time.time() * 1000)
+            if symbol:
+                price = self._symbol(symbol)['price']
+                return {'symbol': symbol, 'markPrice': f"{price}", 'indexPrice': f"{price}", 'time': now_ms}
+            return [
+                {'symbol': s, 'markPrice': f"{info['price']}", 'indexPrice': f"{info['price']}", 'time': now_ms}
+                for s, info in self._symbols.items()
+            ]
+
+    def futures_exchange_info(self, **params: Any) -> Dict[str, Any]:
+        self._request('futures_exchange_info')
+        with self._lock:
+            symbols = []
+            for symbol, info in self._symbols.items():
+                symbols.append({
+                    'symbol': symbol,
+                    'status': 'TRADING',
+                    'contractType': 'PERPETUAL',
+                    'quoteAsset': 'USDT',
+                    'pricePrecision': max(0, len(f"{info['tick_size']:.10f}".rstrip('0').split('.')[1])),
+                    'quantityPrecision': max(0, len(f"{info['step_size']:.10f}".rstrip('0').split('.')[1])),
+                    'filters': [
+                        {'filterType': 'PRICE_FILTER', 'tickSize': f"{info['tick_size']}",
+                         'minPrice': f"{info['tick_size']}", 'maxPrice': '1000000'},
+                        {'filterType': 'LOT_SIZE', 'stepSize': f"{info['step_size']}",
+                         'minQty': f"{info['min_qty']}", 'maxQty': '1000000'},
+                        {'filterType': 'MIN_NOTIONAL', 'notional': f"{info['min_notional']}"},
+                    ],
+                })
+            return {'timezone': 'UTC', 'serverTime': int(time.time() * 1000), 'symbols': symbols}
+
+    def futures_leverage_bracket(self, symbol: Optional[str] = None, **params: Any) -> List[Dict[str, Any]]:
+        self._request('futures_leverage_bracket')
+        brackets = [
+            {'bracket': 1, 'initialLeverage': 125, 'notionalCap': 50000, 'notionalFloor': 0, 'maintMarginRatio': 0.004, 'cum': 0.0},
+            {'bracket': 2, 'initialLeverage': 100, 'notionalCap': 250000, 'notionalFloor': 50000, 'maintMarginRatio': 0.005, 'cum': 50.0},
+            {'bracket': 3, 'initialLeverage': 50, 'notionalCap': 1000000, 'notionalFloor': 250000, 'maintMarginRatio': 0.01, 'cum': 1300.0},
+            {'bracket': 4, 'initialLeverage': 20, 'notionalCap': 10000000, 'notionalFloor': 1000000, 'maintMarginRatio': 0.025, 'cum': 16300.0},
+        ]
+        with self._lock:
+            symbols = [symbol] if symbol else list(self._symbols)
+            return [{'symbol': s, 'brackets': [dict(b) for b in brackets]} for s in symbols]
+
+
+# ----------------------------------------------------------------------
+# HTTP режим (общий симулятор для нескольких процессов)
+# ----------------------------------------------------------------------
+
+# (HTTP метод, последний сегмент пути /fapi/vN/...) -> (метод PaperExchange, список одним ответом)
+_HTTP_ROUTES = {
+    ('POST', 'order'): 'futures_create_order',
+    ('DELETE', 'order'): 'futures_cancel_order',
+    ('GET', 'order'): 'futures_get_order',
+    ('GET', 'openOrders'): 'futures_get_open_orders',
+    ('GET', 'allOrders'): 'futures_get_all_orders',
+    ('POST', 'batchOrders'): 'futures_place_batch_order',
+    ('GET', 'positionRisk'): 'futures_position_information',
+    ('GET', 'account'): 'futures_account',
+    ('POST', 'leverage'): 'futures_change_leverage',
+    ('POST', 'marginType'): 'futures_change_margin_type',
+    ('GET', 'price'): 'futures_symbol_ticker',
+    ('GET', 'premiumIndex'): 'futures_mark_price',
+    ('GET', 'exchangeInfo'): 'futures_exchange_info',
+    ('GET', 'leverageBracket'): 'futures_leverage_bracket',
+}
+# Служебные параметры подписи python-binance
+_SIGNATURE_PARAMS = {'timestamp', 'signature', 'recvWindow'}
+
+
+def make_http_handler(exchange: PaperExchange) -> type:
+    """Handler для http.server, транслирующий REST /fapi/* в методы PaperExchange"""
+
+    class PaperExchangeHandler(BaseHTTPRequestHandler):
+        def _dispatch(self, http_method: str) -> None:
+            parsed = urlparse(self.path)
+            params = dict(parse_qsl(parsed.query))
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                params.update(parse_qsl(self.rfile.read(length).decode('utf-8')))
+            params = {k: v for k, v in params.items() if k not in _SIGNATURE_PARAMS}
+
+            method_name = _HTTP_ROUTES.get((http_method, parsed.path.rstrip('/').rsplit('/', 1)[-1]))
+            if method_name is None:
+                self._reply(404, {'code': -1, 'msg': f'Unsupported endpoint {parsed.path}'}, 0)
+                return
+            # Поток на запрос (ThreadingHTTPServer): weight этого запроса - из _request потока
+            try:
+                result = getattr(exchange, method_name)(**params)
+                self._reply(200, result, exchange.last_request_weight())
+            except PaperExchangeError as e:
+                self._reply(e.status_code, {'code': e.code, 'msg': e.message}, exchange.last_request_weight())
+            except Exception as e:
+                self._reply(400, {'code': -1000, 'msg': str(e)}, exchange.last_request_weight())
+
+        def _reply(self, status: int, payload: Any, used_weight: int) -> None:
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('X-MBX-USED-WEIGHT-1M', str(used_weight))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            self._dispatch('GET')
+
+        def do_POST(self) -> None:
+            self._dispatch('POST')
+
+        def do_DELETE(self) -> None:
+            self._dispatch('DELETE')
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return PaperExchangeHandler
+
+
+def serve(exchange: PaperExchange, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+    """Запускает HTTP сервер симулятора в фоновом потоке"""
+    server = ThreadingHTTPServer((host, port), make_http_handler(exchange))
+    threading.Thread(target=server.serve_forever, name='paper-exchange-http', daemon=True).start()
+    return server
+
+
+# ----------------------------------------------------------------------
+# Общий экземпляр для in-process режима
+# ----------------------------------------------------------------------
+
+_paper_exchange: Optional[PaperExchange] = None
+_paper_exchange_lock = threading.Lock()
+
+
+def load_price_file(path: str) -> Dict[str, float]:
+    """Начальные цены из JSON {"BTCUSDT": 65000.0, ...} (нет файла - пустой словарь)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {str(symbol): float(price) for symbol, price in data.items() if float(price) > 0}
+
+
+def get_paper_exchange(prices_file: Optional[str] = None, price_interval: Optional[float] = None,
+                       price_volatility: Optional[float] = None, **kwargs: Any) -> PaperExchange:
+    """
+    Общий экземпляр PaperExchange процесса (аргументы - только при первом вызове)
+
+    При создании цены засеваются из prices_file, и драйвер цен запускается
+    в фоне, чтобы лимитные ордера и SL/TP исполнялись. Не заданные
+    аргументы берутся из config (PAPER_PRICES_FILE, PAPER_PRICE_INTERVAL,
+    PAPER_PRICE_VOLATILITY).
+    """
+    global _paper_exchange
+    with _paper_exchange_lock:
+        if _paper_exchange is None:
+            if prices_file is None or price_interval is None or price_volatility is None:
+                from config import PAPER_PRICES_FILE, PAPER_PRICE_INTERVAL, PAPER_PRICE_VOLATILITY
+                prices_file = PAPER_PRICES_FILE if prices_file is None else prices_file
+                price_interval = PAPER_PRICE_INTERVAL if price_interval is None else price_interval
+                price_volatility = PAPER_PRICE_VOLATILITY if price_volatility is None else price_volatility
+
+            exchange = PaperExchange(**kwargs)
+            prices = load_price_file(prices_file) if prices_file else {}
+            if prices:
+                exchange.seed_prices(prices)
+            else:
+                logger.warning(f"⚠️ Paper exchange: нет начальных цен ({prices_file or '-'}), "
+                               f"неизвестные символы стартуют с цены 100.0")
+            if price_interval > 0:
+                exchange.start_price_driver(interval=price_interval, volatility=price_volatility)
+            _paper_exchange = exchange
+        return _paper_exchange
+
+
+# ----------------------------------------------------------------------
+# Бенчмарк
+# ----------------------------------------------------------------------
+
+def run_benchmark(orders: int, steps: int, symbols: int, latency_ms: float, seed: int) -> Dict[str, Any]:
+    """
+    Нагрузочный прогон жизненного цикла PATRIOT на симуляторе:
+    LIMIT вход -> при исполнении SL/TP пакетом -> закрытие по SL/TP
+    """
+    exchange = PaperExchange(latency_ms=(0.0, latency_ms), seed=seed)
+    rng = random.Random(seed)
+    start_prices = {f"SIM{i}USDT": 10.0 + 90.0 * rng.random() for i in range(symbols)}
+    for symbol, price in start_prices.items():
+        exchange.add_symbol(symbol, price)
+    path = RandomWalkPricePath(start_prices, volatility=0.003, seed=seed)
+
+    started = time.perf_counter()
+    submit_latencies: List[float] = []
+    entries: Dict[int, Dict[str, Any]] = {}
+    for _ in range(orders):
+        symbol = rng.choice(list(start_prices))
+        price = exchange.futures_symbol_ticker(symbol=symbol)['price']
+        price = float(price)
+        is_long = rng.random() < 0.5
+        entry = price * (0.995 if is_long else 1.005)
+        t0 = time.perf_counter()
+        order = exchange.futures_create_order(
+            symbol=symbol, side='BUY' if is_long else 'SELL', type='LIMIT',
+            quantity=round(100.0 / entry, 3), price=f"{entry:.4f}", timeInForce='GTC',
+            positionSide='LONG' if is_long else 'SHORT'
+        )
+        submit_latencies.append(time.perf_counter() - t0)
+        entries[order['orderId']] = {'order': order, 'long': is_long, 'entry': entry}
+
+    protected = 0
+    for _ in range(steps):
+        exchange.advance(path)
+        # Один запрос открытых ордеров на шаг (как цикл watchdog), get_order - только для исчезнувших
+        open_ids = {o['orderId'] for o in exchange.futures_get_open_orders()}
+        for order_id, info in list(entries.items()):
+            if order_id in open_ids:
+                continue
+            order = exchange.futures_get_order(symbol=info['order']['symbol'], orderId=order_id)
+            if order['status'] != 'FILLED':
+                del entries[order_id]
+                continue
+            del entries[order_id]
+            is_long = info['long']
+            close_side = 'SELL' if is_long else 'BUY'
+            entry = info['entry']
+            legs = [
+                {'symbol': order['symbol'], 'side': close_side, 'type': 'STOP_MARKET', 'quantity': order['origQty'],
+                 'stopPrice': f"{entry * (0.98 if is_long else 1.02):.4f}", 'positionSide': order['positionSide']},
+                {'symbol': order['symbol'], 'side': close_side, 'type': 'TAKE_PROFIT_MARKET', 'quantity': order['origQty'],
+                 'stopPrice': f"{entry * (1.03 if is_long else 0.97):.4f}", 'positionSide': order['positionSide']},
+            ]
+            results = exchange.futures_place_batch_order(batchOrders=legs)
+            protected += sum(1 for leg in results if 'orderId' in leg) == 2
+        if not entries:
+            break
+
+    elapsed = time.perf_counter() - started
+    submit_latencies.sort()
+    stats = exchange.get_stats()
+    return {
+        'orders': orders,
+        'symbols': symbols,
+        'protected_positions': protected,
+        'elapsed_seconds': round(elapsed, 3),
+        'submit_p50_ms': round(submit_latencies[len(submit_latencies) // 2] * 1000, 3) if submit_latencies else 0.0,
+        'submit_p95_ms': round(submit_latencies[int(len(submit_latencies) * 0.95)] * 1000, 3) if submit_latencies else 0.0,
+        **stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='PATRIOT paper exchange (Binance Futures simulator)')
+    parser.add_argument('--serve', action='store_true', help='Запустить HTTP сервер симулятора')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--orders', type=int, default=500, help='Ордеров в бенчмарке')
+    parser.add_argument('--steps', type=int, default=2000, help='Шагов ценового пути в бенчмарке')
+    parser.add_argument('--symbols', type=int, default=20, help='Символов в бенчмарке')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Максимальная задержка ответа')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--prices-file', default='paper_prices.json', help='JSON с начальными ценами символов')
+    parser.add_argument('--price-interval', type=float, default=1.0, help='Шаг драйвера цен сервера (сек, 0 - цены стоят)')
+    parser.add_argument('--price-volatility', type=float, default=0.002, help='Волатильность шага драйвера цен')
+    args = parser.parse_args()
+
+    if args.serve:
+        exchange = get_paper_exchange(
+            prices_file=args.prices_file, price_interval=args.price_interval,
+            price_volatility=args.price_volatility, latency_ms=(0.0, args.latency_ms), seed=args.seed
+        )
+        serve(exchange, args.host, args.port)
+        print(f"Paper exchange listening on http://{args.host}:{args.port} (PAPER_EXCHANGE_URL)")
+        try:
+            while True:
+                time.sleep(60)
+                print(json.dumps(exchange.get_stats()))
+        except KeyboardInterrupt:
+            return
+
+    result = run_benchmark(args.orders, args.steps, args.symbols, args.latency_ms, args.seed)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
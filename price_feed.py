@@ -0,0 +1,221 @@
+"""
+Price Feed - Общая таблица последних цен фьючерсов
+==================================================
+
+_check_trailing_conditions запрашивал futures_symbol_ticker(symbol=...)
+для каждой позиции с SL/TP на каждом цикле watchdog, а
+OrderExecutor.get_current_price - на пути ордера. PriceFeed держит в
+памяти таблицу цен всех символов:
+
+- REST: один futures_symbol_ticker() без symbol (weight 2) на max_age
+  секунд обслуживает любое число позиций
+- stream: !markPrice@arr@1s через python-binance ThreadedWebsocketManager
+  (mark price всех символов раз в секунду), REST - если stream отстал
+- replay: записанные сообщения markPrice из JSONL (тесты без сети)
+
+Author: HEDGER
+Version: 1.0
+"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from utils import logger
+
+
+@dataclass
+class PriceQuote:
+    """Цена символа в таблице"""
+    price: float
+    updated_at: float  # time.time() получения
+    source: str  # 'rest' / 'stream'
+
+
+class PriceFeed:
+    """Таблица последних цен (thread-safe, общая для потоков процесса)"""
+
+    def __init__(self, client: Any = None, max_age: float = 5.0):
+        """
+        Args:
+            client: Клиент Binance Futures для REST обновления (None - только stream)
+            max_age: Возраст цены, после которого нужен REST refresh (сек)
+        """
+        self.client = client
+        self.max_age = float(max_age)
+        self._prices: Dict[str, PriceQuote] = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._stream: Any = None
+        self._stream_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._refreshes = 0
+        self._stream_updates = 0
+        self._reads = 0
+
+    # ------------------------------------------------------------------
+    # Обновление таблицы
+    # ------------------------------------------------------------------
+
+    def update(self, prices: Dict[str, float], source: str = 'stream') -> None:
+        """Записывает цены символов"""
+        now = time.time()
+        with self._lock:
+            for symbol, price in prices.items():
+                if price > 0:
+                    self._prices[symbol] = PriceQuote(price, now, source)
+
+    def refresh(self) -> bool:
+        """Один REST запрос цен всех символов"""
+        if not self.client:
+            return False
+        try:
+            tickers = self.client.futures_symbol_ticker()
+        except Exception as e:
+            logger.error(f"❌ Ошибка обновления цен: {e}")
+            return False
+        self.update({t['symbol']: float(t['price']) for t in tickers}, source='rest')
+        with self._lock:
+            self._last_refresh = time.time()
+            self._refreshes += 1
+        return True
+
+    def refresh_if_stale(self, max_age: Optional[float] = None) -> None:
+        """REST refresh, если таблица старше max_age (один запрос на всех ждущих)"""
+        age_limit = self.max_age if max_age is None else max_age
+        if time.time() - self._last_refresh <= age_limit:
+            return
+        with self._refresh_lock:
+            # Пока ждали lock, другой поток мог уже обновить таблицу
+            if time.time() - self._last_refresh > age_limit:
+                self.refresh()
+
+    def apply_mark_price_message(self, message: Union[Dict[str, Any], List[Dict[str, Any]]]) -> None:
+        """Сообщение markPrice stream ({'data': [...]} / список / одиночное) -> таблица"""
+        if isinstance(message, dict) and message.get('e') == 'error':
+            logger.warning(f"⚠️ Mark price stream: {message.get('m') or message}")
+            return
+        items = message.get('data', message) if isinstance(message, dict) else message
+        if isinstance(items, dict):
+            items = [items]
+        prices = {}
+        for item in items or []:
+            try:
+                prices[item['s']] = float(item['p'])
+            except (KeyError, TypeError, ValueError):
+                continue
+        if prices:
+            self.update(prices, source='stream')
+            with self._lock:
+                self._stream_updates += 1
+
+    # ------------------------------------------------------------------
+    # Чтение
+    # ------------------------------------------------------------------
+
+    def get_price(self, symbol: str, max_age: Optional[float] = None) -> Optional[float]:
+        """
+        Последняя цена символа не старше max_age
+
+        Stream держит таблицу свежей сам; если цены символа нет или она
+        устарела - один общий REST refresh всех символов.
+
+        Returns:
+            Optional[float]: Цена или None (нет данных или цена старше max_age)
+        """
+        age_limit = self.max_age if max_age is None else max_age
+        with self._lock:
+            self._reads += 1
+            quote = self._prices.get(symbol)
+        if quote and time.time() - quote.updated_at <= age_limit:
+            return quote.price
+
+        self.refresh_if_stale(age_limit)
+        with self._lock:
+            quote = self._prices.get(symbol)
+        if quote and time.time() - quote.updated_at <= age_limit:
+            return quote.price
+        # Refresh не удался (ошибка REST / RateLimitBackoff) - устаревшую цену не
+        # отдаем, вызывающий код перейдет на тикер символа
+        return None
+
+    def get_quote(self, symbol: str) -> Optional[PriceQuote]:
+        with self._lock:
+            return self._prices.get(symbol)
+
+    # ------------------------------------------------------------------
+    # Stream / replay
+    # ------------------------------------------------------------------
+
+    def start_stream(self, api_key: str = '', api_secret: str = '', testnet: bool = False) -> None:
+        """Подписка на mark price всех символов (раз в секунду)"""
+        from binance import ThreadedWebsocketManager
+
+        self._stream = ThreadedWebsocketManager(api_key=api_key, api_secret=api_secret, testnet=testnet)
+        self._stream.start()
+        self._stream.start_all_mark_price_socket(callback=self.apply_mark_price_message, fast=True)
+        logger.info("📡 Mark price stream подключен (!markPrice@arr@1s)")
+
+    def start_replay(self, messages: Union[str, Path, Iterable[Any]], interval: float = 0.0) -> threading.Thread:
+        """
+        Воспроизводит записанные сообщения markPrice в фоне
+
+        Args:
+            messages: JSONL файл или список сообщений
+            interval: Пауза между сообщениями (сек)
+        """
+        if isinstance(messages, (str, Path)):
+            with open(messages, 'r', encoding='utf-8') as f:
+                messages = [json.loads(line) for line in f if line.strip()]
+        messages = list(messages)
+
+        def run() -> None:
+            for message in messages:
+                if self._stop.is_set():
+                    break
+                self.apply_mark_price_message(message)
+                if interval and self._stop.wait(interval):
+                    break
+
+        self._stream_thread = threading.Thread(target=run, name='PriceFeedReplay', daemon=True)
+        self._stream_thread.start()
+        logger.info(f"📼 Replay mark price: {len(messages)} сообщений")
+        return self._stream_thread
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._stream:
+            self._stream.stop()
+            self._stream = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'symbols': len(self._prices),
+                'rest_refreshes': self._refreshes,
+                'stream_updates': self._stream_updates,
+                'reads': self._reads,
+            }
+
+
+def create_price_feed(client: Any, max_age: float) -> PriceFeed:
+    """PriceFeed по настройкам config (PRICE_FEED_SOURCE: rest | stream | replay)"""
+    from config import (
+        PRICE_FEED_SOURCE, PRICE_FEED_REPLAY_FILE, PAPER_TRADING,
+        BINANCE_API_KEY, BINANCE_API_SECRET, BINANCE_TESTNET
+    )
+
+    feed = PriceFeed(client, max_age)
+    source = PRICE_FEED_SOURCE.lower()
+    try:
+        if source == 'stream' and not PAPER_TRADING:
+            feed.start_stream(BINANCE_API_KEY, BINANCE_API_SECRET, BINANCE_TESTNET)
+        elif source == 'replay' and PRICE_FEED_REPLAY_FILE:
+            feed.start_replay(PRICE_FEED_REPLAY_FILE)
+    except Exception as e:
+        logger.error(f"❌ Не удалось запустить {source} цен, используется REST: {e}")
+    return feed
@@ -0,0 +1,130 @@
+"""
+Price Triggers - Уровни цен, при которых watchdog проверяет ордер
+=================================================================
+
+Лимитный ордер не может исполниться, пока рынок не дошел до его цены,
+а SL/TP - пока цена не дошла до стопа или тейка; при этом watchdog
+запрашивал статус каждого такого ордера раз в 5 секунд.
+
+PriceTriggerIndex держит по каждому символу отсортированные уровни:
+- down: срабатывают, когда цена опускается до уровня
+  (вход LONG лимиткой, SL LONG, TP SHORT)
+- up:   срабатывают, когда цена поднимается до уровня
+  (вход SHORT лимиткой, SL SHORT, TP LONG)
+
+observe(symbol, price) получает цену из общей таблицы PriceFeed и
+возвращает ордера, чей уровень цена пересекла между наблюдениями, уже
+прошла или к которому подошла ближе tolerance. Поиск - bisect по
+отсортированному списку: O(log n + сработавших). Остальные ордера
+проверяются только редким полным проходом watchdog.
+
+Author: HEDGER
+Version: 1.0
+"""
+
+import bisect
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DIRECTION_DOWN = 'down'
+DIRECTION_UP = 'up'
+
+# (цена, order_id, вид уровня: entry / sl / tp)
+Level = Tuple[float, str, str]
+
+
+class PriceTriggerIndex:
+    """Уровни срабатывания по символам (thread-safe)"""
+
+    def __init__(self, tolerance: float = 0.002):
+        """
+        Args:
+            tolerance: Доля цены: уровень срабатывает, когда цена ближе (0.002 = 0.2%)
+        """
+        self.tolerance = float(tolerance)
+        self._levels: Dict[str, Dict[str, List[Level]]] = {}
+        self._by_order: Dict[str, List[Tuple[str, str, Level]]] = {}
+        self._last_price: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._by_order)
+
+    def set_levels(self, order_id: str, symbol: str,
+                   levels: Iterable[Tuple[str, Optional[float], str]]) -> None:
+        """
+        Заменяет уровни ордера
+
+        Args:
+            order_id: ID ордера
+            symbol: Символ
+            levels: (вид, цена, направление); пустой список - ордер снимается
+        """
+        with self._lock:
+            self._remove(order_id)
+            entries = []
+            for kind, price, direction in levels:
+                if not price or price <= 0:
+                    continue
+                level = (float(price), str(order_id), kind)
+                bisect.insort(self._levels.setdefault(symbol, {}).setdefault(direction, []), level)
+                entries.append((symbol, direction, level))
+            if entries:
+                self._by_order[str(order_id)] = entries
+
+    def remove(self, order_id: str) -> None:
+        with self._lock:
+            self._remove(order_id)
+
+    def _remove(self, order_id: str) -> None:
+        for symbol, direction, level in self._by_order.pop(str(order_id), []):
+            levels = self._levels[symbol][direction]
+            index = bisect.bisect_left(levels, level)
+            if index < len(levels) and levels[index] == level:
+                del levels[index]
+            if not levels:
+                del self._levels[symbol][direction]
+            if not self._levels[symbol]:
+                del self._levels[symbol]
+                self._last_price.pop(symbol, None)
+
+    def symbols(self) -> List[str]:
+        """Символы, по которым есть уровни"""
+        with self._lock:
+            return list(self._levels)
+
+    def observe(self, symbol: str, price: float) -> Set[str]:
+        """
+        Новая цена символа -> ордера, уровни которых сработали
+
+        Диапазон берется от предыдущей наблюдавшейся цены до текущей,
+        чтобы не пропустить уровень, пройденный между циклами.
+
+        Returns:
+            Set[str]: order_id для проверки статуса
+        """
+        with self._lock:
+            by_direction = self._levels.get(symbol)
+            if not by_direction:
+                return set()
+            previous = self._last_price.get(symbol, price)
+            self._last_price[symbol] = price
+
+            low = min(previous, price) * (1 - self.tolerance)
+            high = max(previous, price) * (1 + self.tolerance)
+            triggered: Set[str] = set()
+
+            # down: цена опускалась до уровня и ниже -> уровни >= low
+            down = by_direction.get(DIRECTION_DOWN, [])
+            for _, order_id, _ in down[bisect.bisect_left(down, (low,)):]:
+                triggered.add(order_id)
+
+            # up: цена поднималась до уровня и выше -> уровни <= high
+            up = by_direction.get(DIRECTION_UP, [])
+            end = bisect.bisect_left(up, (high,))
+            while end < len(up) and up[end][0] <= high:
+                end += 1
+            for _, order_id, _ in up[:end]:
+                triggered.add(order_id)
+            return triggered
@@ -0,0 +1,364 @@
+"""
+Provider Budget - Бюджет запросов к провайдеру сигналов
+=======================================================
+
+Ограничивает нагрузку на signal provider (194.135.94.212) для всех
+потоков одного процесса:
+- requests-per-second: равномерный интервал между стартами запросов
+- max in-flight: максимум одновременно выполняющихся запросов
+- adaptive (AIMD): лимит in-flight растет, пока p95 латентности и доля
+  ошибок в норме, и уменьшается в разы при 500, таймаутах и всплесках
+  латентности
+- hedging: политика дублирования медленных запросов с минутным бюджетом
+
+Используется api_client.APIClient вокруг каждого HTTP запроса,
+поэтому конкурентные воркеры ticker_monitor не могут превысить бюджет.
+
+Author: HEDGER
+Version: 1.1
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterable, Iterator, Optional, Tuple
+
+
+class BudgetUnavailable(Exception):
+    """Слот бюджета не получен (остановка или таймаут)"""
+
+
+def percentile(values: Iterable[float], percent: float) -> float:
+    """Перцентиль по nearest-rank (values не пустой; общий для provider_budget и tracing)"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(percent / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD лимит одновременных запросов
+
+    - Additive increase: +1 после `limit` успешных ответов подряд,
+      если p95 латентности и доля ошибок в окне в норме
+    - Multiplicative decrease: limit * backoff при ошибке 5xx, таймауте
+      или ответе медленнее latency_target * spike_factor
+      (не чаще одного раза за cooldown, чтобы пачка ошибок не обнулила лимит)
+    """
+
+    def __init__(self, min_limit: int, max_limit: int, latency_target: float,
+                 error_rate_threshold: float = 0.1, backoff: float = 0.5,
+                 spike_factor: float = 2.0, window: int = 50, cooldown: float = 5.0,
+                 initial_limit: Optional[int] = None):
+        """
+        Args:
+            min_limit: Нижняя граница лимита in-flight
+            max_limit: Верхняя граница лимита in-flight
+            latency_target: Допустимый p95 латентности (секунды)
+            error_rate_threshold: Допустимая доля ошибок в окне
+            backoff: Множитель уменьшения лимита
+            spike_factor: Во сколько раз выше target считается всплеском
+            window: Размер окна последних запросов
+            cooldown: Минимальный интервал между уменьшениями (секунды)
+            initial_limit: Стартовый лимит (по умолчанию половина max_limit)
+        """
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.latency_target = float(latency_target)
+        self.error_rate_threshold = float(error_rate_threshold)
+        self.backoff = min(max(float(backoff), 0.1), 0.9)
+        self.spike_factor = max(1.0, float(spike_factor))
+        self.cooldown = float(cooldown)
+
+        if initial_limit is None:
+            initial_limit = self.max_limit // 2
+        self._limit = min(self.max_limit, max(self.min_limit, int(initial_limit)))
+
+        self._lock = threading.Lock()
+        self._samples: Deque[Tuple[float, bool]] = deque(maxlen=max(5, int(window)))
+        self._successes_since_change = 0
+        self._last_decrease = 0.0
+        self._increases = 0
+        self._decreases = 0
+
+    @property
+    def limit(self) -> int:
+        """Текущий лимит in-flight"""
+        with self._lock:
+            return self._limit
+
+    def on_result(self, latency: float, ok: bool) -> None:
+        """
+        Учитывает результат запроса
+
+        Args:
+            latency: Длительность запроса (секунды)
+            ok: False для 5xx, таймаутов и сетевых ошибок
+        """
+        with self._lock:
+            self._samples.append((latency, ok))
+
+            spike = self.latency_target > 0 and latency > self.latency_target * self.spike_factor
+            if not ok or spike:
+                self._decrease_locked()
+                return
+
+            self._successes_since_change += 1
+            if self._successes_since_change < self._limit or self._limit >= self.max_limit:
+                return
+
+            p95, error_rate = self._window_health_locked()
+            if p95 <= self.latency_target and error_rate <= self.error_rate_threshold:
+                self._limit += 1
+                self._increases += 1
+            self._successes_since_change = 0
+
+    def _decrease_locked(self) -> None:
+        """Мультипликативное уменьшение лимита (вызывается под lock)"""
+        now = time.monotonic()
+        self._successes_since_change = 0
+        if now - self._last_decrease < self.cooldown:
+            return
+        new_limit = max(self.min_limit, int(self._limit * self.backoff))
+        if new_limit < self._limit:
+            self._limit = new_limit
+            self._decreases += 1
+        self._last_decrease = now
+
+    def _window_health_locked(self) -> Tuple[float, float]:
+        """p95 латентности успешных запросов и доля ошибок в окне"""
+        if not self._samples:
+            return 0.0, 0.0
+        latencies = [latency for latency, ok in self._samples if ok]
+        errors = sum(1 for _, ok in self._samples if not ok)
+        p95 = percentile(latencies, 95) if latencies else 0.0
+        return p95, errors / len(self._samples)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Текущий лимит и статистика латентности для логирования"""
+        with self._lock:
+            p95, error_rate = self._window_health_locked()
+            latencies = [latency for latency, ok in self._samples if ok]
+            return {
+                'limit': self._limit,
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+                'p50_latency': round(percentile(latencies, 50), 3) if latencies else 0.0,
+                'p95_latency': round(p95, 3),
+                'error_rate': round(error_rate * 100, 1),
+                'samples': len(self._samples),
+                'increases': self._increases,
+                'decreases': self._decreases
+            }
+
+
+class ProviderRateBudget:
+    """Thread-safe бюджет запросов: RPS + ограничение in-flight (фиксированное или adaptive)"""
+
+    def __init__(self, requests_per_second: float, max_in_flight: int,
+                 limiter: Optional[AdaptiveConcurrencyLimiter] = None):
+        """
+        Args:
+            requests_per_second: Максимум стартов запросов в секунду (0 = без ограничения)
+            max_in_flight: Максимум одновременных запросов (потолок для limiter)
+            limiter: AIMD лимитер; если задан, он определяет текущий лимит in-flight
+        """
+        self.requests_per_second = max(0.0, float(requests_per_second))
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.limiter = limiter
+
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        self._next_start = 0.0  # monotonic-время, когда разрешен следующий старт
+
+        # Статистика (сбрасывается перед каждым батчем)
+        self._in_flight = 0
+        self._total_requests = 0
+        self._total_wait = 0.0
+        self._stats_since = time.monotonic()
+
+    def _current_limit(self) -> int:
+        """Действующий лимит in-flight"""
+        if self.limiter is None:
+            return self.max_in_flight
+        return min(self.max_in_flight, self.limiter.limit)
+
+    def _reserve_start(self) -> float:
+        """Резервирует момент старта следующего запроса"""
+        with self._lock:
+            now = time.monotonic()
+            if self.requests_per_second <= 0:
+                return now
+            start = max(now, self._next_start)
+            self._next_start = start + 1.0 / self.requests_per_second
+            return start
+
+    def acquire(self, stop_event: Optional[threading.Event] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Ждет свободный слот и очередь по RPS
+        
+        Args:
+            stop_event: Event для прерывания ожидания
+            timeout: Максимальное время ожидания слота (None = без ограничения)
+            
+        Returns:
+            bool: True если слот получен (нужно вызвать release())
+        """
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+
+        # 1. Слот in-flight (короткими интервалами, чтобы реагировать на stop_event)
+        with self._slot_freed:
+            while self._in_flight >= self._current_limit():
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+                self._slot_freed.wait(0.1)
+            self._in_flight += 1
+
+        # 2. Очередь по RPS
+        start_at = self._reserve_start()
+        while True:
+            delay = start_at - time.monotonic()
+            if delay <= 0:
+                break
+            if stop_event is not None and stop_event.is_set():
+                self.release()
+                return False
+            time.sleep(min(delay, 0.1))
+
+        with self._lock:
+            self._total_requests += 1
+            self._total_wait += time.monotonic() - started
+        return True
+
+    def release(self) -> None:
+        """Освобождает слот после завершения запроса"""
+        with self._slot_freed:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._slot_freed.notify()
+
+    def record_result(self, latency: float, ok: bool) -> None:
+        """Передает результат запроса в adaptive лимитер (если включен)"""
+        if self.limiter is not None:
+            self.limiter.on_result(latency, ok)
+
+    @contextmanager
+    def request_slot(self, stop_event: Optional[threading.Event] = None, timeout: Optional[float] = None) -> Iterator[None]:
+        """Контекстный менеджер вокруг одного запроса к провайдеру"""
+        if not self.acquire(stop_event=stop_event, timeout=timeout):
+            raise BudgetUnavailable("Provider budget slot not acquired")
+        try:
+            yield
+        finally:
+            self.release()
+
+    def reset_stats(self) -> None:
+        """Сброс счетчиков (перед новым батчем)"""
+        with self._lock:
+            self._total_requests = 0
+            self._total_wait = 0.0
+            self._stats_since = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Текущая статистика бюджета для логирования"""
+        with self._lock:
+            elapsed = max(time.monotonic() - self._stats_since, 1e-9)
+            avg_wait = self._total_wait / self._total_requests if self._total_requests else 0.0
+            stats = {
+                'rps_limit': self.requests_per_second,
+                'max_in_flight': self.max_in_flight,
+                'in_flight': self._in_flight,
+                'requests': self._total_requests,
+                'actual_rps': round(self._total_requests / elapsed, 3),
+                'avg_wait_seconds': round(avg_wait, 3)
+            }
+        stats['in_flight_limit'] = self._current_limit()
+        if self.limiter is not None:
+            stats['adaptive'] = self.limiter.get_stats()
+        return stats
+
+
+class HedgePolicy:
+    """
+    Политика hedged-запросов (спекулятивный дубль медленного запроса)
+
+    - Задержка hedge = перцентиль недавней латентности (не меньше min_delay)
+    - Бюджет: не больше max_per_minute дублей за скользящую минуту
+    """
+
+    def __init__(self, percentile: float, min_delay: float, max_per_minute: int,
+                 window: int = 100, min_samples: int = 10):
+        """
+        Args:
+            percentile: Перцентиль латентности, после которого уходит дубль
+            min_delay: Минимальная задержка перед дублем (секунды)
+            max_per_minute: Максимум дублей за минуту
+            window: Размер окна латентностей
+            min_samples: Минимум замеров до включения hedging
+        """
+        self.percentile = min(max(float(percentile), 50.0), 99.9)
+        self.min_delay = max(0.0, float(min_delay))
+        self.max_per_minute = max(0, int(max_per_minute))
+        self.min_samples = max(1, int(min_samples))
+
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=max(self.min_samples, int(window)))
+        self._sent: Deque[float] = deque()  # monotonic-время отправленных дублей
+
+        self._hedges_sent = 0
+        self._hedges_won = 0
+        self._hedges_denied = 0
+
+    def record_latency(self, latency: float) -> None:
+        """Добавляет латентность успешного запроса"""
+        with self._lock:
+            self._latencies.append(latency)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Задержка перед дублем или None, если данных для оценки мало"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            return max(self.min_delay, percentile(self._latencies, self.percentile))
+
+    def try_consume(self) -> bool:
+        """Резервирует дубль из минутного бюджета"""
+        with self._lock:
+            now = time.monotonic()
+            while self._sent and now - self._sent[0] >= 60.0:
+                self._sent.popleft()
+            if len(self._sent) >= self.max_per_minute:
+                self._hedges_denied += 1
+                return False
+            self._sent.append(now)
+            self._hedges_sent += 1
+            return True
+
+    def record_win(self) -> None:
+        """Дубль ответил раньше основного запроса"""
+        with self._lock:
+            self._hedges_won += 1
+
+    def reset_stats(self) -> None:
+        """Сброс счетчиков (перед новым батчем)"""
+        with self._lock:
+            self._hedges_sent = 0
+            self._hedges_won = 0
+            self._hedges_denied = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика hedging для логирования"""
+        with self._lock:
+            delay = (max(self.min_delay, percentile(self._latencies, self.percentile))
+                     if len(self._latencies) >= self.min_samples else None)
+            return {
+                'percentile': self.percentile,
+                'delay': round(delay, 3) if delay is not None else None,
+                'sent': self._hedges_sent,
+                'won': self._hedges_won,
+                'denied': self._hedges_denied,
+                'max_per_minute': self.max_per_minute
+            }
@@ -10,12 +10,14 @@ Version: 1.0
 """
 
 import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from typing import Dict, List, Set, Optional, Tuple, Mapping
 from datetime import datetime, timezone
 
 # Local imports
 from api_client import api_client
-from config import TIMEFRAMES, MAX_API_RETRIES, RETRY_DELAY_SEC
+from config import TIMEFRAMES, MAX_API_RETRIES, RETRY_DELAY_SEC, PARALLEL_TIMEFRAMES, BATCHED_SIGNAL_FETCH
+from tracing import tracer
 from utils import logger
 
 
@@ -29,16 +31,22 @@ class SignalAnalyzer:
     3. Валидация качества сигналов
     """
     
-    def __init__(self, ticker: str):
+    def __init__(self, ticker: str, parallel: bool = PARALLEL_TIMEFRAMES, batched: bool = BATCHED_SIGNAL_FETCH):
         """
         Инициализация анализатора для конкретного тикера
         
         Args:
             ticker: Торговая пара (например, "BTCUSDT")
+            parallel: Загружать таймфреймы параллельно
+            batched: Сначала запрашивать все таймфреймы одним /multi_signal
         """
         self.ticker = ticker
         self.timeframes = TIMEFRAMES
         self.price_threshold = 0.005  # 0.5% - максимальная разница в ценах входа
+        self.parallel = parallel
+        self.batched = batched
+        self.last_convergence_distance: Optional[float] = None  # Для приоритизации следующего батча
+        self.trace = tracer.new_trace()  # Контекст трассировки (trace_id, trace_started_at) -> signal_data
 
         logger.debug(f"Initialized SignalAnalyzer for {ticker}")
 
@@ -59,9 +67,76 @@ class SignalAnalyzer:
                 "4h": None  # не получен
             }
         """
+        self.trace = tracer.new_trace()
+        fetch_started = time.perf_counter()
+        signals: Dict[str, Dict] = {}
+        timeframes = list(self.timeframes)
+
+        # Batched режим: один /multi_signal на тикер, недостающие - через /signal
+        if self.batched:
+            signals = self._fetch_batched_signals(stop_event)
+            timeframes = [tf for tf in self.timeframes if tf not in signals]
+            if timeframes and not (stop_event and stop_event.is_set()):
+                logger.info(f"↩️ Fallback to /signal for {self.ticker}: {timeframes}")
+
+        if timeframes:
+            if self.parallel and len(timeframes) > 1:
+                fetched = self._fetch_signals_parallel(timeframes, stop_event)
+            else:
+                fetched = self._fetch_signals_sequential(timeframes, stop_event)
+            signals.update(fetched)
+            # Сохраняем порядок таймфреймов из конфигурации
+            signals = {tf: signals[tf] for tf in self.timeframes if tf in signals}
+
+        logger.info(f"📊 Signals summary for {self.ticker}: {len(signals)}/{len(self.timeframes)} received")
+        tracer.record('fetch', self.trace['trace_id'], time.perf_counter() - fetch_started,
+                      ticker=self.ticker, received=len(signals))
+        return signals
+
+    def _fetch_batched_signals(self, stop_event=None) -> Dict[str, Dict]:
+        """
+        Получает все таймфреймы одним запросом /multi_signal
+        
+        Args:
+            stop_event: Event для прерывания процесса
+            
+        Returns:
+            Dict[str, Dict]: Валидные сигналы по таймфреймам (может быть неполным)
+        """
+        if stop_event and stop_event.is_set():
+            logger.info(f"Signal fetching interrupted for {self.ticker}")
+            return {}
+
+        logger.info(f"Fetching multi signal: {self.ticker} {self.timeframes}")
+        try:
+            batch = api_client.get_multi_signals(self.ticker, self.timeframes)
+        except Exception as e:
+            logger.error(f"Multi signal error: {self.ticker} - {str(e)}")
+            return {}
+
+        signals = {}
+        for timeframe, signal in batch.items():
+            if signal and self._validate_signal_data(signal):
+                signals[timeframe] = signal
+                logger.info(f"✅ Signal received: {self.ticker} {timeframe} (multi)")
+            else:
+                logger.warning(f"Invalid/empty multi signal data: {self.ticker} {timeframe}")
+        return signals
+
+    def _fetch_signals_sequential(self, timeframes: List[str], stop_event=None) -> Dict[str, Dict]:
+        """
+        Последовательная загрузка таймфреймов
+        
+        Args:
+            timeframes: Таймфреймы для запроса
+            stop_event: Event для прерывания процесса
+            
+        Returns:
+            Dict[str, Dict]: Полученные сигналы по таймфреймам
+        """
         signals = {}
         
-        for timeframe in self.timeframes:
+        for timeframe in timeframes:
             # Проверяем на прерывание
             if stop_event and stop_event.is_set():
                 logger.info(f"Signal fetching interrupted for {self.ticker}")
@@ -70,7 +145,7 @@ class SignalAnalyzer:
             logger.info(f"Fetching signal: {self.ticker} {timeframe}")
             
             # Получаем сигнал с retry логикой
-            signal = self._fetch_single_signal(timeframe)
+            signal = self._fetch_single_signal(timeframe, stop_event)
             
             if signal:
                 signals[timeframe] = signal
@@ -78,20 +153,79 @@ class SignalAnalyzer:
             else:
                 logger.warning(f"❌ No signal: {self.ticker} {timeframe}")
         
-        logger.info(f"📊 Signals summary for {self.ticker}: {len(signals)}/{len(self.timeframes)} received")
         return signals
 
-    def _fetch_single_signal(self, timeframe: str) -> Optional[Dict]:
+    def _fetch_signals_parallel(self, timeframes: List[str], stop_event=None) -> Dict[str, Dict]:
+        """
+        Параллельная загрузка таймфреймов (время тикера ~ самый медленный таймфрейм)
+        
+        Args:
+            timeframes: Таймфреймы для запроса
+            stop_event: Event для прерывания процесса
+            
+        Returns:
+            Dict[str, Dict]: Полученные сигналы по таймфреймам
+        """
+        if stop_event and stop_event.is_set():
+            logger.info(f"Signal fetching interrupted for {self.ticker}")
+            return {}
+
+        results: Dict[str, Dict] = {}
+        executor = ThreadPoolExecutor(
+            max_workers=len(timeframes),
+            thread_name_prefix=f"TF-{self.ticker}"
+        )
+        try:
+            futures = {}
+            for timeframe in timeframes:
+                logger.info(f"Fetching signal: {self.ticker} {timeframe}")
+                futures[executor.submit(self._fetch_single_signal, timeframe, stop_event)] = timeframe
+
+            pending = set(futures)
+            while pending:
+                # Короткий таймаут, чтобы вовремя реагировать на stop_event
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    timeframe = futures[future]
+                    try:
+                        signal = future.result()
+                    except Exception as e:
+                        logger.error(f"Error fetching {self.ticker} {timeframe}: {str(e)}")
+                        signal = None
+
+                    if signal:
+                        results[timeframe] = signal
+                        logger.info(f"✅ Signal received: {self.ticker} {timeframe}")
+                    else:
+                        logger.warning(f"❌ No signal: {self.ticker} {timeframe}")
+
+                if pending and stop_event and stop_event.is_set():
+                    logger.info(f"Signal fetching interrupted for {self.ticker}")
+                    for future in pending:
+                        future.cancel()
+                    break
+        finally:
+            # Не ждем зависшие запросы при остановке - они завершатся сами
+            executor.shutdown(wait=not (stop_event and stop_event.is_set()), cancel_futures=True)
+
+        return results
+
+    def _fetch_single_signal(self, timeframe: str, stop_event=None) -> Optional[Dict]:
         """
         Получает сигнал для одного таймфрейма с retry логикой
         
         Args:
             timeframe: Таймфрейм для запроса
+            stop_event: Event для прерывания между попытками
             
         Returns:
             Optional[Dict]: Данные сигнала или None
         """
         for attempt in range(1, MAX_API_RETRIES + 1):
+            if stop_event and stop_event.is_set():
+                return None
+
             try:
                 logger.debug(f"Attempt {attempt}/{MAX_API_RETRIES}: {self.ticker} {timeframe}")
                 
@@ -109,7 +243,10 @@ class SignalAnalyzer:
                 # Если это не последняя попытка, ждем и повторяем
                 if attempt < MAX_API_RETRIES:
                     logger.debug(f"Waiting {RETRY_DELAY_SEC}s before retry...")
-                    time.sleep(RETRY_DELAY_SEC)
+                    if stop_event:
+                        stop_event.wait(RETRY_DELAY_SEC)
+                    else:
+                        time.sleep(RETRY_DELAY_SEC)
                     continue
                 else:
                     logger.error(f"All {MAX_API_RETRIES} attempts failed for {self.ticker} {timeframe}")
@@ -155,6 +292,30 @@ class SignalAnalyzer:
             logger.info(f"No convergence found for {self.ticker}")
             return None
 
+    def convergence_distance(self, signals: Mapping[str, Optional[Dict]]) -> Optional[float]:
+        """
+        Минимальная относительная разница цен входа среди пар одного направления
+        
+        Args:
+            signals: Словарь сигналов по таймфреймам (могут быть None)
+            
+        Returns:
+            Optional[float]: Расстояние (0.004 = 0.4%) или None, если сравнивать нечего
+        """
+        valid_signals = [signal for signal in signals.values() if signal is not None]
+        distance = None
+        
+        for i, signal1 in enumerate(valid_signals):
+            for signal2 in valid_signals[i+1:]:
+                price1, price2 = signal1.get('entry_price'), signal2.get('entry_price')
+                if signal1.get('signal') != signal2.get('signal') or not price1 or not price2:
+                    continue
+                relative_diff = abs(price1 - price2) / ((price1 + price2) / 2)
+                if distance is None or relative_diff < distance:
+                    distance = relative_diff
+        
+        return distance
+
     def _check_convergence(self, signal1: Dict, signal2: Dict) -> bool:
         """
         Проверяет схождение между двумя сигналами
@@ -286,7 +447,8 @@ class SignalAnalyzer:
                 valid_matched_signals[tf].get('dominance_change_percent', 0) for tf in valid_matched_signals
             ]),
             'timestamp': datetime.now(timezone.utc).isoformat(),
-            'raw_signals': valid_matched_signals  # Сохраняем только валидные исходные данные
+            'raw_signals': valid_matched_signals,  # Сохраняем только валидные исходные данные
+            **self.trace  # trace_id + trace_started_at для span'ов OrderExecutor
         }
         
         logger.info(
@@ -349,26 +511,48 @@ class SignalAnalyzer:
             # 1. Получаем сигналы по всем таймфреймам
             signals = self.fetch_all_signals(stop_event)
             
+            # 2-3. Схождения + консолидированный сигнал
+            return self.evaluate_signals(signals)
+            
+        except Exception as e:
+            logger.error(f"Analysis failed for {self.ticker}: {str(e)}", exc_info=True)
+            return None
+
+    def evaluate_signals(self, signals: Mapping[str, Optional[Dict]]) -> Optional[Dict]:
+        """
+        Анализ уже полученных сигналов: поиск схождений + консолидация
+        
+        Отделен от загрузки, чтобы конвейер ticker_monitor мог выполнять
+        его в отдельной стадии.
+        
+        Args:
+            signals: Сигналы по таймфреймам (результат fetch_all_signals)
+            
+        Returns:
+            Optional[Dict]: Консолидированный сигнал или None
+        """
+        with tracer.span('convergence', self.trace['trace_id'], ticker=self.ticker) as span:
+            self.last_convergence_distance = self.convergence_distance(signals) if signals else None
+            
             if not signals:
                 logger.info(f"No signals received for {self.ticker}")
+                span['matched'] = False
                 return None
                 
-            # 2. Ищем схождения
+            # Ищем схождения
             matched_timeframes = self.analyze_convergence(signals)
             
             if not matched_timeframes:
                 logger.info(f"No convergence found for {self.ticker}")
+                span['matched'] = False
                 return None
                 
-            # 3. Создаем консолидированный сигнал
+            # Создаем консолидированный сигнал
             signal_data = self.create_signal_data(matched_timeframes, signals)
-            
-            logger.info(f"✅ Analysis completed successfully for {self.ticker}")
-            return signal_data
-            
-        except Exception as e:
-            logger.error(f"Analysis failed for {self.ticker}: {str(e)}", exc_info=True)
-            return None
+            span['matched'] = signal_data is not None
+        
+        logger.info(f"✅ Analysis completed successfully for {self.ticker}")
+        return signal_data
 
 
 # Utility function for external use
@@ -0,0 +1,340 @@
+"""
+Signal Cache - Кэш ответов провайдера сигналов по свечам
+========================================================
+
+Сигнал для (pair, timeframe) не меняется до закрытия текущей свечи,
+поэтому ответ провайдера кэшируется по ключу
+(pair, timeframe, время открытия свечи) и истекает на границе свечи.
+
+- Ограниченный размер с LRU вытеснением
+- Счетчики hit/miss для логирования батча
+- Один экземпляр на процесс (api_client), общий для ticker_monitor,
+  get_entry_generator и остальных потребителей APIClient
+
+SharedSignalStore - общий для всех процессов PATRIOT кэш в SQLite
+(ticker_monitor, get_hedge_entry_generator, get_entry_generator) с
+singleflight: одновременные запросы одного ключа
+(endpoint, pair, timeframes) из любых процессов превращаются в один
+запрос к провайдеру, остальные ждут результат в кэше.
+
+Author: HEDGER
+Version: 1.0
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from utils import logger
+
+# Длительность таймфреймов провайдера в секундах
+_TIMEFRAME_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def timeframe_to_seconds(timeframe: str) -> int:
+    """
+    Переводит таймфрейм ('15m', '1h', '4h', '1d') в секунды
+
+    Raises:
+        ValueError: Неизвестный формат таймфрейма
+    """
+    tf = timeframe.strip().lower()
+    if len(tf) < 2 or tf[-1] not in _TIMEFRAME_UNITS or not tf[:-1].isdigit():
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    return int(tf[:-1]) * _TIMEFRAME_UNITS[tf[-1]]
+
+
+def candle_open_time(timeframe: str, now: Optional[float] = None) -> int:
+    """
+    Время открытия текущей свечи (UTC epoch seconds)
+
+    Свечи Binance выровнены по UTC эпохе, поэтому для таймфреймов до 1d
+    достаточно округления вниз.
+    """
+    period = timeframe_to_seconds(timeframe)
+    ts = int(now if now is not None else time.time())
+    return ts - ts % period
+
+
+class SignalCache:
+    """Thread-safe LRU кэш сигналов, выровненный по свечам"""
+
+    def __init__(self, max_entries: int = 512):
+        """
+        Args:
+            max_entries: Максимум записей в кэше (LRU вытеснение)
+        """
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[Tuple[str, str, int], Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def make_key(pair: str, timeframe: str, now: Optional[float] = None) -> Tuple[str, str, int]:
+        """Ключ кэша: (pair, timeframe, время открытия свечи)"""
+        return pair.upper(), timeframe.lower(), candle_open_time(timeframe, now)
+
+    def get(self, pair: str, timeframe: str) -> Optional[Dict]:
+        """
+        Возвращает копию закэшированного сигнала или None
+
+        Неизвестный таймфрейм считается промахом (кэш не используется).
+        """
+        now = time.time()
+        try:
+            key = self.make_key(pair, timeframe, now)
+        except ValueError:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            # Копия: потребители дописывают поля в словарь сигнала
+            return copy.deepcopy(entry[1])
+
+    def put(self, pair: str, timeframe: str, signal: Dict) -> None:
+        """Сохраняет сигнал до закрытия текущей свечи"""
+        now = time.time()
+        try:
+            key = self.make_key(pair, timeframe, now)
+        except ValueError:
+            return
+        expires_at = key[2] + timeframe_to_seconds(timeframe)
+
+        with self._lock:
+            self._entries[key] = (expires_at, copy.deepcopy(signal))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """Полная очистка кэша"""
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self) -> None:
+        """Сброс счетчиков (перед новым батчем)"""
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика кэша для логирования"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': round(self._hits / total * 100, 1) if total else 0.0
+            }
+
+
+def candle_close_time(timeframes: Iterable[str], now: Optional[float] = None) -> int:
+    """Ближайшее закрытие свечи среди таймфреймов (UTC epoch seconds)"""
+    ts = now if now is not None else time.time()
+    return min(candle_open_time(tf, ts) + timeframe_to_seconds(tf) for tf in timeframes)
+
+
+class SharedSignalStore:
+    """
+    Межпроцессный кэш ответов провайдера + singleflight (SQLite)
+
+    responses: key -> JSON ответа до закрытия ближайшей свечи
+    inflight:  key -> владелец lease; остальные процессы/потоки ждут,
+               пока владелец положит ответ или lease истечет
+    """
+
+    def __init__(self, db_path: str = 'signal_cache.db', lease_seconds: float = 30.0,
+                 poll_interval: float = 0.2):
+        """
+        Args:
+            db_path: Путь к SQLite файлу (общий для всех процессов)
+            lease_seconds: Время жизни lease владельца запроса
+            poll_interval: Интервал опроса при ожидании чужого запроса
+        """
+        self.db_path = db_path
+        self.lease_seconds = float(lease_seconds)
+        self.poll_interval = float(poll_interval)
+        self._lock = threading.Lock()
+        self._upstream_calls = 0
+        self._shared_hits = 0
+        self._coalesced = 0
+        self._init_db()
+        logger.info(f"🗄️ Shared signal store initialized at {db_path}")
+
+    def _init_db(self) -> None:
+        """Создает таблицы кэша и lease"""
+        with self._get_connection() as conn:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            ''')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS inflight (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                lease_until REAL NOT NULL
+            )
+            ''')
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Новое соединение на операцию (безопасно для потоков и процессов)"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    @staticmethod
+    def make_key(endpoint: str, pair: str, timeframes: Iterable[str]) -> str:
+        """Ключ: endpoint|PAIR|tf1,tf2 (порядок таймфреймов не важен)"""
+        return f"{endpoint}|{pair.upper()}|{','.join(sorted(tf.lower() for tf in timeframes))}"
+
+    @staticmethod
+    def _owner_id() -> str:
+        return f"{os.getpid()}:{threading.get_ident()}"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Неистекший ответ из общего кэша или None"""
+        conn = self._get_connection()
+        try:
+            row = conn.execute(
+                'SELECT payload FROM responses WHERE key = ? AND expires_at > ?',
+                (key, time.time())
+            ).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, payload: Any, expires_at: float) -> None:
+        """Сохраняет ответ до expires_at и чистит истекшие записи"""
+        now = time.time()
+        if expires_at <= now:
+            return
+        conn = self._get_connection()
+        try:
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, payload, expires_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(payload), expires_at)
+                )
+                conn.execute('DELETE FROM responses WHERE expires_at <= ?', (now,))
+        finally:
+            conn.close()
+
+    def _try_acquire_lease(self, key: str, owner: str) -> bool:
+        """Атомарно захватывает lease на запрос (истекшие lease перехватываются)"""
+        now = time.time()
+        conn = self._get_connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM inflight WHERE key = ? AND lease_until <= ?', (key, now))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO inflight (key, owner, lease_until) VALUES (?, ?, ?)',
+                (key, owner, now + self.lease_seconds)
+            )
+            conn.commit()
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def _release_lease(self, key: str, owner: str) -> None:
+        conn = self._get_connection()
+        try:
+            with conn:
+                conn.execute('DELETE FROM inflight WHERE key = ? AND owner = ?', (key, owner))
+        finally:
+            conn.close()
+
+    def get_or_fetch(self, key: str, expires_at: float, fetch: Callable[[], Optional[Any]],
+                     wait_timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Singleflight: ответ из кэша, либо один upstream-запрос на ключ
+
+        Args:
+            key: Ключ запроса (make_key)
+            expires_at: Когда ответ перестает быть актуальным (закрытие свечи)
+            fetch: Функция запроса к провайдеру (None = неудача, не кэшируется)
+            wait_timeout: Сколько ждать чужой запрос (по умолчанию lease_seconds)
+
+        Returns:
+            Ответ провайдера или None
+        """
+        owner = self._owner_id()
+        deadline = time.monotonic() + (wait_timeout if wait_timeout is not None else self.lease_seconds)
+        waited = False
+
+        while True:
+            try:
+                cached = self.get(key)
+                if cached is not None:
+                    with self._lock:
+                        if waited:
+                            self._coalesced += 1
+                        else:
+                            self._shared_hits += 1
+                    return cached
+                acquired = self._try_acquire_lease(key, owner)
+            except sqlite3.Error as e:
+                # Общий кэш - оптимизация: при проблемах с БД идем напрямую
+                logger.warning(f"Shared signal store unavailable ({e}), fetching directly")
+                return fetch()
+
+            if acquired:
+                break
+            if time.monotonic() >= deadline:
+                logger.debug(f"Singleflight wait timeout for {key}, fetching directly")
+                return fetch()
+            waited = True
+            time.sleep(self.poll_interval)
+
+        try:
+            with self._lock:
+                self._upstream_calls += 1
+            result = fetch()
+            if result is not None:
+                try:
+                    self.put(key, result, expires_at)
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to store shared signal {key}: {e}")
+            return result
+        finally:
+            try:
+                self._release_lease(key, owner)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to release singleflight lease {key}: {e}")
+
+    def reset_stats(self) -> None:
+        """Сброс счетчиков (перед новым батчем)"""
+        with self._lock:
+            self._upstream_calls = 0
+            self._shared_hits = 0
+            self._coalesced = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика общего кэша для логирования"""
+        with self._lock:
+            return {
+                'upstream_calls': self._upstream_calls,
+                'shared_hits': self._shared_hits,
+                'coalesced': self._coalesced
+            }
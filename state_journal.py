@@ -0,0 +1,321 @@
+"""
+State Journal - Журнал изменений состояния Orders Watchdog
+==========================================================
+
+OrdersWatchdog переписывал orders_watchdog_state.json целиком (все
+ордера, indent=2) на каждом переходе статуса под self.lock - стоимость
+O(всех ордеров) на переход, и оборванная запись портила весь файл.
+
+Теперь состояние = снимок + журнал:
+
+    orders_watchdog_state.json          снимок (формат прежний + journal_seq)
+    orders_watchdog_state.json.journal  JSONL дельты, fsync на каждую запись
+
+    {"seq": 42, "op": "upsert", "order_id": "123", "order": {...}}
+    {"seq": 43, "op": "remove", "order_id": "123"}
+
+Каждые compact_every записей снимок пересобирается (tmp + fsync +
+os.replace), а журнал переносится в <journal>.1. При загрузке к снимку
+применяются записи с seq > journal_seq снимка, поэтому падение между
+заменой снимка и переносом журнала безопасно; оборванная последняя
+строка журнала отбрасывается.
+
+Запись, компакция и внешняя перезапись идут под flock на
+<journal>.lock: unified_sync (процесс ticker_monitor) не может обрезать
+журнал, пока watchdog дописывает дельту. write_watchdog_state()
+накладывает дельты watchdog, записанные после чтения состояния
+(journal_seq прочитанных данных), поверх перезаписываемых данных.
+
+Читатели состояния (unified_sync, ticker_state) используют
+load_watchdog_state() - снимок с примененным журналом.
+
+Author: HEDGER
+Version: 1.0
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from utils import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows - flock недоступен, остается только lock процесса
+    fcntl = None
+
+OP_UPSERT = 'upsert'
+OP_REMOVE = 'remove'
+
+
+def _fsync_directory(path: Path) -> None:
+    """fsync каталога после os.replace (на Windows недоступно - пропускаем)"""
+    try:
+        fd = os.open(str(path.parent or Path('.')), os.O_RDONLY)
+    except (OSError, AttributeError):
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _apply_entry(orders: Dict[str, Dict[str, Any]], entry: Dict[str, Any]) -> None:
+    """Применяет запись журнала к ордерам (order_id -> dict)"""
+    if entry.get('op') == OP_REMOVE:
+        orders.pop(str(entry['order_id']), None)
+    else:
+        orders[str(entry['order_id'])] = entry['order']
+
+
+def atomic_write_json(path: Path, data: Dict[str, Any], fsync: bool = True) -> None:
+    """Пишет JSON во временный файл и атомарно заменяет path"""
+    tmp_file = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+    if fsync:
+        _fsync_directory(path)
+
+
+class StateJournal:
+    """Снимок + append-only журнал ордеров (по order_id)"""
+
+    def __init__(self, snapshot_file: Union[str, Path], journal_file: Optional[Union[str, Path]] = None,
+                 compact_every: int = 200, fsync: bool = True):
+        """
+        Args:
+            snapshot_file: JSON снимок ({'timestamp', 'journal_seq', 'watched_orders': [...]})
+            journal_file: JSONL журнал (по умолчанию <snapshot_file>.journal)
+            compact_every: Число записей журнала до пересборки снимка
+            fsync: fsync каждой записи (False - только для тестов)
+        """
+        self.snapshot_file = Path(snapshot_file)
+        self.journal_file = Path(journal_file) if journal_file else Path(f"{self.snapshot_file}.journal")
+        self.previous_journal_file = Path(f"{self.journal_file}.1")
+        self.lock_file = Path(f"{self.journal_file}.lock")
+        self.compact_every = max(1, int(compact_every))
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._seq = 0
+        self._entries = 0
+        self.replayed = 0
+
+    @property
+    def entries_since_compaction(self) -> int:
+        return self._entries
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """Эксклюзивный доступ к снимку и журналу: потоки (RLock) + процессы (flock), реентерабельно"""
+        with self._lock:
+            if self._lock_depth or fcntl is None:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with open(self.lock_file, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # Загрузка
+    # ------------------------------------------------------------------
+
+    def load(self, repair: bool = True) -> Dict[str, Any]:
+        """
+        Снимок с примененным журналом
+
+        Args:
+            repair: Обрезать оборванный хвост журнала (только процесс-писатель;
+                читатель мог увидеть строку, которую watchdog еще дописывает)
+
+        Returns:
+            Dict: Данные снимка, 'watched_orders' - актуальный список ордеров
+        """
+        with self.exclusive():
+            data: Dict[str, Any] = {}
+            if self.snapshot_file.exists():
+                with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f) or {}
+
+            snapshot_seq = int(data.get('journal_seq', 0) or 0)
+            orders: Dict[str, Dict[str, Any]] = {
+                str(order.get('order_id')): order for order in data.get('watched_orders', [])
+            }
+            last_seq, self.replayed = self._replay(orders, snapshot_seq, repair)
+
+            self._seq = max(snapshot_seq, last_seq)
+            self._entries = self.replayed
+            data['watched_orders'] = list(orders.values())
+            data['journal_seq'] = self._seq
+            return data
+
+    def _replay(self, orders: Dict[str, Dict[str, Any]], snapshot_seq: int,
+                repair: bool) -> Tuple[int, int]:
+        """Применяет записи журнала новее снимка; обрезает оборванный хвост"""
+        if not self.journal_file.exists():
+            return 0, 0
+
+        last_seq = 0
+        applied = 0
+        valid_size = 0
+        with open(self.journal_file, 'rb') as f:
+            for raw_line in f:
+                try:
+                    if not raw_line.endswith(b'\n'):
+                        raise ValueError('incomplete line')
+                    entry = json.loads(raw_line)
+                    seq = int(entry['seq'])
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"⚠️ Журнал {self.journal_file.name}: отброшена поврежденная запись")
+                    break
+                valid_size += len(raw_line)
+                last_seq = max(last_seq, seq)
+                if seq <= snapshot_seq:
+                    continue  # уже в снимке (упали между заменой снимка и переносом журнала)
+                _apply_entry(orders, entry)
+                applied += 1
+
+        if repair and valid_size < self.journal_file.stat().st_size:
+            # Следующая запись не должна склеиться с оборванной строкой
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(valid_size)
+        return last_seq, applied
+
+    @staticmethod
+    def _read_entries(path: Path) -> List[Dict[str, Any]]:
+        """Целые записи файла журнала (оборванный хвост пропускается)"""
+        entries: List[Dict[str, Any]] = []
+        if not path.exists():
+            return entries
+        with open(path, 'rb') as f:
+            for raw_line in f:
+                try:
+                    if not raw_line.endswith(b'\n'):
+                        break
+                    entries.append(json.loads(raw_line))
+                except ValueError:
+                    break
+        return entries
+
+    def entries_after(self, base_seq: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Записи журнала с seq > base_seq (текущий + предыдущий после компакции)
+
+        Returns:
+            Optional[List]: Записи по возрастанию seq, None - часть записей
+                уже недоступна (после base_seq было больше одной компакции)
+        """
+        with self.exclusive():
+            entries = [
+                entry
+                for path in (self.previous_journal_file, self.journal_file)
+                for entry in self._read_entries(path)
+                if int(entry.get('seq', 0)) > base_seq
+            ]
+            entries.sort(key=lambda entry: int(entry['seq']))
+            expected_last = self._seq
+            if expected_last > base_seq and (not entries or int(entries[0]['seq']) != base_seq + 1):
+                return None
+            return entries
+
+    # ------------------------------------------------------------------
+    # Запись
+    # ------------------------------------------------------------------
+
+    def append(self, op: str, order_id: str, order: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Дописывает дельту ордера в журнал (O(1), fsync)
+
+        Args:
+            op: OP_UPSERT / OP_REMOVE
+            order_id: ID ордера
+            order: WatchedOrder.to_dict() для upsert
+
+        Returns:
+            bool: Пора пересобрать снимок (compact)
+        """
+        with self.exclusive():
+            self._seq += 1
+            entry: Dict[str, Any] = {'seq': self._seq, 'op': op, 'order_id': str(order_id)}
+            if op != OP_REMOVE:
+                entry['order'] = order
+            line = json.dumps(entry, ensure_ascii=False, default=str) + '\n'
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._entries += 1
+            return self._entries >= self.compact_every
+
+    def compact(self, watched_orders: List[Dict[str, Any]], extra: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Пишет полный снимок и начинает новый журнал (старый - в <journal>.1)
+
+        Args:
+            watched_orders: Все ордера (WatchedOrder.to_dict())
+            extra: Дополнительные поля снимка
+        """
+        with self.exclusive():
+            data = dict(extra or {})
+            data.update({
+                'timestamp': datetime.now().isoformat(),
+                'journal_seq': self._seq,
+                'watched_orders': watched_orders
+            })
+            atomic_write_json(self.snapshot_file, data, self.fsync)
+            # Падение здесь безопасно: записи журнала с seq <= journal_seq пропускаются.
+            # Предыдущий журнал хранится для write_watchdog_state (дельты после чтения)
+            if self.journal_file.exists():
+                os.replace(self.journal_file, self.previous_journal_file)
+            self._entries = 0
+
+
+def load_watchdog_state(snapshot_file: Union[str, Path]) -> Dict[str, Any]:
+    """Состояние Orders Watchdog для читателей из других модулей (снимок + журнал)"""
+    return StateJournal(snapshot_file).load(repair=False)
+
+
+def write_watchdog_state(snapshot_file: Union[str, Path], data: Dict[str, Any]) -> None:
+    """
+    Полная перезапись состояния вне OrdersWatchdog (sync с БД / биржей)
+
+    Выполняется под flock журнала. Если data прочитаны через
+    load_watchdog_state (есть journal_seq), дельты, которые запущенный
+    watchdog дописал после чтения, накладываются поверх - они новее.
+    Без journal_seq (источник - БД) состояние перезаписывается целиком.
+    """
+    journal = StateJournal(snapshot_file)
+    orders = {str(order.get('order_id')): order for order in data.get('watched_orders', [])}
+    base_seq = data.get('journal_seq')
+    with journal.exclusive():
+        journal.load(repair=False)
+        if base_seq is not None:
+            entries = journal.entries_after(int(base_seq))
+            if entries is None:
+                logger.warning("⚠️ Состояние watchdog изменилось с момента чтения и журнал уже "
+                               "компактирован - перезаписываем целиком")
+            else:
+                for entry in entries:
+                    _apply_entry(orders, entry)
+        extra = {k: v for k, v in data.items() if k not in ('watched_orders', 'journal_seq', 'timestamp')}
+        journal.compact(list(orders.values()), extra)
@@ -19,10 +19,13 @@ import os
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal, ROUND_HALF_UP
-from binance.client import Client
-from binance.exceptions import BinanceAPIException
+try:
+    from binance.exceptions import BinanceAPIException
+except ImportError:  # paper режим без python-binance: ошибки симулятора в том же формате
+    from paper_exchange import PaperExchangeError as BinanceAPIException
 
 from utils import logger
+from futures_client import create_futures_client
 import config
 
 class SymbolCache:
@@ -53,7 +56,7 @@ class SymbolCache:
                 logger.error("❌ Отсутствуют API ключи Binance")
                 return
             
-            self.binance_client = Client(
+            self.binance_client = create_futures_client(
                 api_key=config.BINANCE_API_KEY,
                 api_secret=config.BINANCE_API_SECRET,
                 testnet=config.BINANCE_TESTNET
@@ -0,0 +1,47 @@
+"""
+Symbol Locks - Блокировки по символам для исполнения ордеров
+============================================================
+
+Глобальный lock OrderExecutor сериализовал сигналы всех символов, хотя
+защищать нужно только инварианты одного символа (MAX_CONCURRENT_ORDERS,
+проверка качества цены, замена pending ордера). SymbolLockManager выдает
+отдельный RLock на символ:
+- сигналы разных символов валидируются, рассчитываются и размещаются параллельно
+- проверка лимита + размещение по одному символу остаются атомарными
+- RLock: вложенные вызовы (execute_signal -> place_*) не блокируют сами себя
+
+Author: HEDGER
+Version: 1.0
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class SymbolLockManager:
+    """Ленивый реестр RLock по символам"""
+
+    def __init__(self):
+        self._locks: Dict[str, threading.RLock] = {}
+        self._guard = threading.Lock()
+
+    def lock_for(self, symbol: str) -> threading.RLock:
+        """RLock символа (создается при первом обращении)"""
+        key = symbol.upper()
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.RLock()
+            return lock
+
+    @contextmanager
+    def locked(self, symbol: str) -> Iterator[None]:
+        """Контекст эксклюзивного доступа к символу"""
+        lock = self.lock_for(symbol)
+        with lock:
+            yield
+
+    def __len__(self) -> int:
+        with self._guard:
+            return len(self._locks)
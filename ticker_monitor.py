@@ -19,14 +19,17 @@ import sys
 import threading
 import traceback
 from datetime import datetime, timedelta
-from queue import Queue, Empty
+from queue import Queue, Empty, Full
 from pathlib import Path
 from typing import List, Optional, Dict, Any, Set
 import gc
 from config import (
     TIMEFRAMES, TICKER_DELAY, MAX_WORKERS, PROCESSING_TIMEOUT,
     SCHEDULE_INTERVAL_MINUTES, SCHEDULE_AT_SECOND, 
-    DEFAULT_TICKERS_FILE, BATCH_LOG_FREQUENCY, reload_trading_config
+    DEFAULT_TICKERS_FILE, BATCH_LOG_FREQUENCY, reload_trading_config,
+    CONCURRENT_FETCH, FETCH_WORKERS,
+    PIPELINE_MODE, PIPELINE_ANALYSIS_WORKERS, PIPELINE_EXECUTION_WORKERS, PIPELINE_QUEUE_SIZE,
+    PRIORITY_SCHEDULING, TICKER_STATE_FILE, INCREMENTAL_MODE, SIGNAL_FINGERPRINTS_FILE
 )
 from env_loader import reload_env_config
 
@@ -37,6 +40,7 @@ import logging
 try:
     from signal_analyzer import SignalAnalyzer
     from order_executor import execute_trading_signal
+    from api_client import api_client
     from utils import logger
     from config import TIMEFRAMES
     from unified_sync import orders_sync, validate_signal_before_execution
@@ -57,6 +61,8 @@ except ImportError as e:
     # Mock реализации для автономной работы
     import random
     
+    api_client = None  # Нет бюджета провайдера в автономном режиме
+    
     # Mock синхронизатор
     class MockOrdersSync:
         def validate_new_signal(self, symbol, side, quantity):
@@ -97,6 +103,12 @@ except ImportError as e:
         def __init__(self, ticker: str):
             self.ticker = ticker
             
+        def fetch_all_signals(self, stop_event=None) -> Dict[str, Dict]:
+            return {'mock': {'ticker': self.ticker}}
+            
+        def evaluate_signals(self, signals: Dict) -> Optional[Dict]:
+            return self.analyze_ticker(None)
+            
         def analyze_ticker(self, stop_event) -> Optional[Dict]:
             # Имитация анализа с 30% вероятностью найти сигнал
             if random.random() < 0.3:
@@ -117,6 +129,12 @@ except ImportError as e:
     SignalAnalyzer = MockSignalAnalyzer
     TIMEFRAMES = ['1H', '4H', '1D']
 
+try:
+    from ticker_state import TickerPriorityScheduler, SignalFingerprintStore
+except ImportError:
+    TickerPriorityScheduler = None
+    SignalFingerprintStore = None
+
 
 class TickerLoader:
     """
@@ -230,6 +248,7 @@ class WorkerStats:
         self.signals_found = 0
         self.orders_created = 0
         self.errors = 0
+        self.skipped = 0
         self.start_time: Optional[datetime] = None
         self.reset()
     
@@ -240,15 +259,17 @@ class WorkerStats:
             self.signals_found = 0
             self.orders_created = 0
             self.errors = 0
+            self.skipped = 0
             self.start_time = None
     
-    def update(self, processed: int = 0, signals: int = 0, orders: int = 0, errors: int = 0):
+    def update(self, processed: int = 0, signals: int = 0, orders: int = 0, errors: int = 0, skipped: int = 0):
         """Обновление статистики"""
         with self._lock:
             self.processed += processed
             self.signals_found += signals
             self.orders_created += orders
             self.errors += errors
+            self.skipped += skipped
     
     def get_summary(self) -> Dict[str, Any]:
         """Получение итоговой статистики"""
@@ -259,15 +280,63 @@ class WorkerStats:
             
             success_rate = (self.signals_found / self.processed * 100) if self.processed > 0 else 0
             conversion_rate = (self.orders_created / self.signals_found * 100) if self.signals_found > 0 else 0
+            throughput = (self.processed / duration * 60) if duration > 0 else 0
             
             return {
                 'processed': self.processed,
                 'signals_found': self.signals_found,
                 'orders_created': self.orders_created,
                 'errors': self.errors,
+                'skipped': self.skipped,
                 'duration_seconds': round(duration, 1),
                 'success_rate': round(success_rate, 1),
-                'conversion_rate': round(conversion_rate, 1)
+                'conversion_rate': round(conversion_rate, 1),
+                'tickers_per_minute': round(throughput, 1)
+            }
+
+
+class StageStats:
+    """Thread-safe статистика одной стадии конвейера"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Сброс статистики"""
+        with self._lock:
+            self.items = 0
+            self.total_latency = 0.0
+            self.max_latency = 0.0
+            self.total_queue_wait = 0.0
+            self.max_queue_depth = 0
+    
+    def record(self, latency: float, queue_wait: float = 0.0):
+        """Учитывает обработанный элемент (время обработки и ожидания в очереди)"""
+        with self._lock:
+            self.items += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.total_queue_wait += queue_wait
+    
+    def observe_depth(self, depth: int):
+        """Фиксирует глубину входной очереди стадии"""
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+    
+    def get_summary(self) -> Dict[str, Any]:
+        """Итоговая статистика стадии"""
+        with self._lock:
+            avg_latency = self.total_latency / self.items if self.items else 0.0
+            avg_wait = self.total_queue_wait / self.items if self.items else 0.0
+            return {
+                'name': self.name,
+                'items': self.items,
+                'avg_latency': round(avg_latency, 2),
+                'max_latency': round(self.max_latency, 2),
+                'avg_queue_wait': round(avg_wait, 2),
+                'max_queue_depth': self.max_queue_depth
             }
 
 
@@ -277,16 +346,45 @@ class TickerMonitor:
     Координирует работу всех компонентов согласно архитектуре проекта
     """
     
-    def __init__(self, tickers_file: str = DEFAULT_TICKERS_FILE, max_workers: int = MAX_WORKERS, ticker_delay: float = TICKER_DELAY):
+    def __init__(self, tickers_file: str = DEFAULT_TICKERS_FILE, max_workers: int = MAX_WORKERS, ticker_delay: float = TICKER_DELAY,
+                 concurrent: bool = CONCURRENT_FETCH, pipeline: bool = PIPELINE_MODE,
+                 priority: bool = PRIORITY_SCHEDULING, incremental: bool = INCREMENTAL_MODE):
         self.tickers_file = tickers_file
-        self.max_workers = max_workers
-        self.ticker_delay = ticker_delay  # Задержка между тикерами
+        self.concurrent = concurrent
+        self.pipeline = pipeline
+        
+        # Приоритизация тикеров по состоянию прошлых батчей
+        self.scheduler = None
+        if priority and TickerPriorityScheduler is not None:
+            self.scheduler = TickerPriorityScheduler(TICKER_STATE_FILE)
+        
+        # Инкрементальный режим: отпечатки сигналов прошлого батча
+        self.fingerprints = None
+        if incremental and SignalFingerprintStore is not None:
+            self.fingerprints = SignalFingerprintStore(SIGNAL_FINGERPRINTS_FILE)
+        
+        if concurrent:
+            # Конкурентный режим: темп задает бюджет провайдера в api_client, а не пауза
+            self.max_workers = max(max_workers, FETCH_WORKERS)
+            self.ticker_delay = 0.0
+        else:
+            self.max_workers = max_workers
+            self.ticker_delay = ticker_delay  # Задержка между тикерами
         
         # Управление потоками и очередями
         self.ticker_queue: Queue[Optional[str]] = Queue()
         self.stop_event = threading.Event()
         self.worker_threads: List[threading.Thread] = []
         
+        # Очереди конвейера: fetch -> analysis -> execution (ограничены по размеру)
+        self.analysis_queue: Queue[Optional[Dict[str, Any]]] = Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self.execution_queue: Queue[Optional[Dict[str, Any]]] = Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self.stage_stats = {
+            'fetch': StageStats('fetch'),
+            'analysis': StageStats('analysis'),
+            'execution': StageStats('execution')
+        }
+        
         # Статистика и мониторинг
         self.stats = WorkerStats()
         self.current_batch_start: Optional[datetime] = None
@@ -301,7 +399,12 @@ class TickerMonitor:
         # Проверка синхронизации с Orders Watchdog
         self._check_initial_synchronization()
         
-        logger.info(f"🎼 TickerMonitor initialized: {len(self.tickers)} tickers, {self.max_workers} workers, {self.ticker_delay}s delay")
+        mode = "concurrent" if self.concurrent else "sequential"
+        if self.fingerprints is not None:
+            mode += ", incremental"
+        if self.pipeline:
+            mode += f", pipeline {PIPELINE_ANALYSIS_WORKERS} analysis/{PIPELINE_EXECUTION_WORKERS} execution"
+        logger.info(f"🎼 TickerMonitor initialized: {len(self.tickers)} tickers, {self.max_workers} workers, {self.ticker_delay}s delay ({mode})")
     
     def _check_initial_synchronization(self) -> None:
         """Проверяет синхронизацию с Orders Watchdog при запуске"""
@@ -368,12 +471,13 @@ class TickerMonitor:
                 if thread.is_alive():
                     logger.warning(f"⚠️ Thread {thread.name} did not terminate gracefully")
         
-        # Очищаем очередь
-        while not self.ticker_queue.empty():
-            try:
-                self.ticker_queue.get_nowait()
-            except Empty:
-                break
+        # Очищаем очереди
+        for pending_queue in (self.ticker_queue, self.analysis_queue, self.execution_queue):
+            while not pending_queue.empty():
+                try:
+                    pending_queue.get_nowait()
+                except Empty:
+                    break
         
         logger.info("✅ Graceful shutdown completed")
         sys.exit(0)
@@ -383,7 +487,15 @@ class TickerMonitor:
         if self.stop_event.is_set():
             return
         
-        for ticker in self.tickers:
+        # Важные тикеры (экспозиция, близкое схождение) - первыми после закрытия свечи
+        tickers = self.tickers
+        if self.scheduler is not None:
+            try:
+                tickers = self.scheduler.order(self.tickers)
+            except Exception as e:
+                logger.warning(f"⚠️ Priority ordering failed, using file order: {e}")
+        
+        for ticker in tickers:
             if self.stop_event.is_set():
                 break
             self.ticker_queue.put(ticker)
@@ -433,9 +545,16 @@ class TickerMonitor:
                     
                     # 1. Анализируем сигналы через SignalAnalyzer
                     analyzer = SignalAnalyzer(ticker)
-                    signal_data = analyzer.analyze_ticker(self.stop_event)
+                    if self.fingerprints is not None:
+                        signals = analyzer.fetch_all_signals(self.stop_event)
+                        if self._is_unchanged(ticker, signals):
+                            continue
+                        signal_data = analyzer.evaluate_signals(signals)
+                    else:
+                        signal_data = analyzer.analyze_ticker(self.stop_event)
                     
                     self.stats.update(processed=1)
+                    self._record_ticker_result(ticker, analyzer, signal_data)
                     
                     # Проверяем stop_event после анализа
                     if self.stop_event.is_set():
@@ -454,6 +573,7 @@ class TickerMonitor:
                         else:
                             logger.error(f"❌ ORDER FAILED: {ticker}")
                             self.stats.update(errors=1)
+                            self._forget_fingerprint(ticker)
                 
                 except Exception as e:
                     logger.error(f"❌ Error processing {ticker}: {e}")
@@ -487,8 +607,8 @@ class TickerMonitor:
         
         logger.info(f"🏁 Worker {worker_id} completed: {processed_count} tickers processed")
     
-    def _start_workers(self, num_workers: int = 1) -> None:
-        """Запускает рабочие потоки, предварительно завершая старые"""
+    def _stop_previous_workers(self) -> None:
+        """Завершает потоки предыдущего батча и сбрасывает stop_event"""
         # Сначала устанавливаем stop_event для корректной остановки
         self.stop_event.set()
         time.sleep(0.5)  # Даем время воркерам увидеть stop_event
@@ -514,6 +634,10 @@ class TickerMonitor:
         # Сбрасываем stop_event для новых воркеров
         self.stop_event.clear()
 
+    def _start_workers(self, num_workers: int = 1) -> None:
+        """Запускает рабочие потоки, предварительно завершая старые"""
+        self._stop_previous_workers()
+
         actual_workers = min(num_workers, self.max_workers, len(self.tickers))
         for i in range(actual_workers):
             worker = threading.Thread(
@@ -523,6 +647,10 @@ class TickerMonitor:
             )
             worker.start()
             self.worker_threads.append(worker)
+        
+        # Sentinel для каждого воркера: после последнего тикера воркеры завершаются сами
+        for _ in range(actual_workers):
+            self.ticker_queue.put(None)
 
         logger.info(f"🚀 Started {actual_workers} worker thread(s)")
     
@@ -535,12 +663,16 @@ class TickerMonitor:
         start_wait = time.time()
         last_log_time = 0
         
-        while not self.ticker_queue.empty() and not self.stop_event.is_set():
+        while not self.stop_event.is_set():
+            # Воркеры завершаются сами, получив sentinel после последнего тикера
+            if not any(t.is_alive() for t in self.worker_threads):
+                break
+            
             remaining = self.ticker_queue.qsize()
             elapsed = time.time() - start_wait
             
             # Логируем только каждые 60 секунд или при малом количестве тикеров (уменьшено spam)
-            if elapsed - last_log_time > 60 or remaining <= 3:
+            if elapsed - last_log_time > 60 or 0 < remaining <= 3:
                 logger.info(f"📊 Progress: {remaining} tickers remaining (elapsed: {elapsed:.1f}s)")
                 last_log_time = elapsed
             
@@ -582,6 +714,239 @@ class TickerMonitor:
         
         logger.info("✅ All workers completed")
     
+    # ========================================
+    # PIPELINE: fetch -> analysis -> execution
+    # ========================================
+    
+    def _put_stage_item(self, stage_queue: Queue, item: Optional[Dict[str, Any]]) -> bool:
+        """Кладет элемент в ограниченную очередь стадии (backpressure с проверкой stop_event)"""
+        while not self.stop_event.is_set():
+            try:
+                stage_queue.put(item, timeout=0.5)
+                return True
+            except Full:
+                continue
+        return False
+    
+    def _get_stage_item(self, stage_queue: Queue, stats: StageStats) -> Optional[Dict[str, Any]]:
+        """Берет элемент из очереди стадии; None - sentinel или остановка"""
+        while not self.stop_event.is_set():
+            try:
+                item = stage_queue.get(timeout=0.5)
+                stats.observe_depth(stage_queue.qsize() + 1)
+                return item
+            except Empty:
+                continue
+        return None
+    
+    def _fetch_stage_worker(self) -> None:
+        """
+        Стадия 1: загрузка сигналов по тикеру
+        Не ждет анализа и исполнения - только кладет результат в analysis_queue
+        """
+        worker_id = threading.current_thread().name
+        processed_count = 0
+        stats = self.stage_stats['fetch']
+        
+        while not self.stop_event.is_set():
+            try:
+                ticker = self.ticker_queue.get(timeout=0.5)
+            except Empty:
+                continue
+            
+            if ticker is None or self.stop_event.is_set():
+                break
+            
+            processed_count += 1
+            remaining = self.ticker_queue.qsize()
+            stats.observe_depth(remaining + 1)
+            if processed_count % 20 == 0 or remaining <= 10:
+                logger.info(f"🔍 [{worker_id}] Progress: {processed_count} processed, {remaining} remaining")
+            
+            try:
+                # 🔒 ПРОВЕРКА ДОСТУПНОСТИ СИМВОЛА
+                is_available, availability_reason = is_symbol_available_for_trading(ticker)
+                if not is_available:
+                    logger.warning(f"🚫 {ticker} blocked for trading: {availability_reason}")
+                    self.stats.update(processed=1)
+                    continue
+                
+                started = time.time()
+                analyzer = SignalAnalyzer(ticker)
+                signals = analyzer.fetch_all_signals(self.stop_event)
+                stats.record(time.time() - started)
+                
+                self._put_stage_item(self.analysis_queue, {
+                    'ticker': ticker,
+                    'analyzer': analyzer,
+                    'signals': signals,
+                    'enqueued_at': time.time()
+                })
+            
+            except Exception as e:
+                logger.error(f"❌ Error fetching {ticker}: {e}")
+                self.stats.update(processed=1, errors=1)
+            
+            finally:
+                self.ticker_queue.task_done()
+                # Последовательный режим: пауза между тикерами (в конкурентном 0)
+                if self.ticker_delay > 0:
+                    self.stop_event.wait(self.ticker_delay)
+        
+        logger.info(f"🏁 Fetch worker {worker_id} completed: {processed_count} tickers fetched")
+    
+    def _analysis_stage_worker(self) -> None:
+        """Стадия 2: поиск схождений, найденные сигналы уходят в execution_queue"""
+        stats = self.stage_stats['analysis']
+        
+        while True:
+            item = self._get_stage_item(self.analysis_queue, stats)
+            if item is None:
+                break
+            
+            ticker = item['ticker']
+            queue_wait = time.time() - item['enqueued_at']
+            started = time.time()
+            try:
+                if self._is_unchanged(ticker, item['signals']):
+                    continue
+                
+                signal_data = item['analyzer'].evaluate_signals(item['signals'])
+                self.stats.update(processed=1)
+                self._record_ticker_result(ticker, item['analyzer'], signal_data)
+                
+                if signal_data:
+                    logger.info(f"🎯 SIGNAL FOUND: {ticker} - {signal_data.get('signal', 'UNKNOWN')}")
+                    self.stats.update(signals=1)
+                    self._put_stage_item(self.execution_queue, {
+                        'ticker': ticker,
+                        'signal_data': signal_data,
+                        'enqueued_at': time.time()
+                    })
+            
+            except Exception as e:
+                logger.error(f"❌ Error analyzing {ticker}: {e}")
+                self.stats.update(processed=1, errors=1)
+                self._forget_fingerprint(ticker)
+            
+            finally:
+                stats.record(time.time() - started, queue_wait)
+    
+    def _execution_stage_worker(self) -> None:
+        """Стадия 3: исполнение сигналов (Binance REST + Telegram)"""
+        stats = self.stage_stats['execution']
+        
+        while True:
+            item = self._get_stage_item(self.execution_queue, stats)
+            if item is None:
+                break
+            
+            ticker = item['ticker']
+            queue_wait = time.time() - item['enqueued_at']
+            started = time.time()
+            try:
+                if execute_trading_signal(item['signal_data']):
+                    self.stats.update(orders=1)
+                    logger.info(f"✅ ORDER CREATED: {ticker}")
+                else:
+                    logger.error(f"❌ ORDER FAILED: {ticker}")
+                    self.stats.update(errors=1)
+                    self._forget_fingerprint(ticker)
+            
+            except Exception as e:
+                logger.error(f"❌ Error executing {ticker}: {e}")
+                self.stats.update(errors=1)
+                self._forget_fingerprint(ticker)
+            
+            finally:
+                stats.record(time.time() - started, queue_wait)
+    
+    def _is_unchanged(self, ticker: str, signals: Dict) -> bool:
+        """Инкрементальный режим: True если сигналы тикера совпадают с прошлым батчем"""
+        if self.fingerprints is None:
+            return False
+        if not self.fingerprints.check_and_update(ticker, signals):
+            return False
+        logger.info(f"⏭️ {ticker}: signals unchanged since last batch - skipped")
+        self.stats.update(processed=1, skipped=1)
+        return True
+    
+    def _forget_fingerprint(self, ticker: str) -> None:
+        """Исполнение не удалось - тикер будет проанализирован на следующем батче"""
+        if self.fingerprints is not None:
+            self.fingerprints.forget(ticker)
+    
+    def _record_ticker_result(self, ticker: str, analyzer: Any, signal_data: Optional[Dict]) -> None:
+        """Передает результат анализа в приоритетный планировщик"""
+        if self.scheduler is None:
+            return
+        distance = getattr(analyzer, 'last_convergence_distance', None)
+        self.scheduler.record_result(ticker, bool(signal_data), distance)
+    
+    def _start_stage(self, target, name: str, count: int) -> List[threading.Thread]:
+        """Запускает потоки одной стадии конвейера"""
+        threads = []
+        for i in range(max(1, count)):
+            thread = threading.Thread(target=target, name=f"{name}-{i+1}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        self.worker_threads.extend(threads)
+        return threads
+    
+    def _join_stage(self, threads: List[threading.Thread], deadline: float) -> bool:
+        """Ждет завершения стадии с логированием глубины очередей; False при таймауте/остановке"""
+        last_log_time = time.time()
+        while any(t.is_alive() for t in threads):
+            if self.stop_event.is_set():
+                return False
+            if time.time() > deadline:
+                logger.warning(f"⚠️ Processing timeout after {PROCESSING_TIMEOUT}s, forcing shutdown...")
+                self.stop_event.set()
+                return False
+            if time.time() - last_log_time > 60:
+                logger.info(
+                    f"📊 Pipeline queues: tickers={self.ticker_queue.qsize()}, "
+                    f"analysis={self.analysis_queue.qsize()}, execution={self.execution_queue.qsize()}"
+                )
+                last_log_time = time.time()
+            time.sleep(0.5)
+        return True
+    
+    def _run_pipeline(self) -> None:
+        """
+        Батч как конвейер из трех стадий с ограниченными очередями.
+        Медленное исполнение ордеров не тормозит загрузку сигналов:
+        стадии завершаются по очереди через sentinel (None).
+        """
+        self._stop_previous_workers()
+        for stats in self.stage_stats.values():
+            stats.reset()
+        
+        fetch_count = min(self.max_workers, len(self.tickers))
+        fetchers = self._start_stage(self._fetch_stage_worker, "Fetch", fetch_count)
+        analyzers = self._start_stage(self._analysis_stage_worker, "Analysis", PIPELINE_ANALYSIS_WORKERS)
+        executors = self._start_stage(self._execution_stage_worker, "Execution", PIPELINE_EXECUTION_WORKERS)
+        
+        for _ in fetchers:
+            self.ticker_queue.put(None)
+        
+        logger.info(f"🚀 Pipeline started: {len(fetchers)} fetch, {len(analyzers)} analysis, {len(executors)} execution workers")
+        
+        deadline = time.time() + PROCESSING_TIMEOUT
+        for threads, next_queue, next_threads in (
+            (fetchers, self.analysis_queue, analyzers),
+            (analyzers, self.execution_queue, executors),
+            (executors, None, None)
+        ):
+            if not self._join_stage(threads, deadline):
+                break
+            if next_queue is not None:
+                for _ in next_threads:
+                    self._put_stage_item(next_queue, None)
+        
+        # Остановка/таймаут: остальные стадии выходят по stop_event
+        self._wait_for_completion()
+    
     def _log_batch_summary(self) -> None:
         """Выводит итоговую статистику обработки"""
         summary = self.stats.get_summary()
@@ -589,11 +954,56 @@ class TickerMonitor:
         logger.info("=" * 60)
         logger.info("BATCH PROCESSING SUMMARY")
         logger.info("=" * 60)
-        logger.info(f"Duration: {summary['duration_seconds']}s")
+        logger.info(f"Wall-clock: {summary['duration_seconds']}s ({'concurrent' if self.concurrent else 'sequential'}, {len(self.worker_threads)} workers)")
+        logger.info(f"Throughput: {summary['tickers_per_minute']} tickers/min")
         logger.info(f"Tickers processed: {summary['processed']}/{len(self.tickers)}")
         logger.info(f"Signals found: {summary['signals_found']} ({summary['success_rate']}%)")
         logger.info(f"Orders/Alerts created: {summary['orders_created']} ({summary['conversion_rate']}%)")
         logger.info(f"Errors: {summary['errors']}")
+        if self.fingerprints is not None:
+            logger.info(f"Skipped (unchanged signals): {summary['skipped']}")
+        if self.pipeline:
+            for stage in self.stage_stats.values():
+                stage_summary = stage.get_summary()
+                logger.info(
+                    f"Stage {stage_summary['name']}: {stage_summary['items']} items, "
+                    f"avg {stage_summary['avg_latency']}s / max {stage_summary['max_latency']}s, "
+                    f"queue wait avg {stage_summary['avg_queue_wait']}s, max depth {stage_summary['max_queue_depth']}"
+                )
+        if api_client is not None:
+            budget = api_client.budget.get_stats()
+            logger.info(
+                f"Provider: {budget['requests']} requests, {budget['actual_rps']} req/s "
+                f"(limit {budget['rps_limit']} req/s, {budget['max_in_flight']} in-flight), "
+                f"avg wait {budget['avg_wait_seconds']}s"
+            )
+            adaptive = budget.get('adaptive')
+            if adaptive:
+                logger.info(
+                    f"Adaptive limit: {adaptive['limit']} in-flight "
+                    f"(range {adaptive['min_limit']}-{adaptive['max_limit']}, "
+                    f"+{adaptive['increases']}/-{adaptive['decreases']}) | "
+                    f"p50 {adaptive['p50_latency']}s, p95 {adaptive['p95_latency']}s, "
+                    f"errors {adaptive['error_rate']}%"
+                )
+            if api_client.hedge is not None:
+                hedge = api_client.hedge.get_stats()
+                logger.info(
+                    f"Hedging: {hedge['sent']} sent, {hedge['won']} won, {hedge['denied']} denied "
+                    f"(delay p{hedge['percentile']:g} = {hedge['delay']}s, budget {hedge['max_per_minute']}/min)"
+                )
+            cache = api_client.get_cache_stats()
+            if cache is not None:
+                logger.info(
+                    f"Signal cache: {cache['hits']} hits / {cache['misses']} misses "
+                    f"({cache['hit_rate']}%), {cache['entries']}/{cache['max_entries']} entries"
+                )
+            if api_client.shared is not None:
+                shared = api_client.shared.get_stats()
+                logger.info(
+                    f"Shared cache: {shared['upstream_calls']} upstream calls, "
+                    f"{shared['shared_hits']} hits, {shared['coalesced']} coalesced in-flight"
+                )
         logger.info(f"Completed at: {datetime.now().strftime('%H:%M:%S')}")
         logger.info(f"Active threads: {threading.active_count()}")
         logger.info("=" * 60)
@@ -625,6 +1035,14 @@ class TickerMonitor:
         self.current_batch_start = datetime.now()
         self.stats.reset()
         self.stats.start_time = self.current_batch_start
+        if api_client is not None:
+            api_client.budget.reset_stats()
+            if api_client.cache is not None:
+                api_client.cache.reset_stats()
+            if api_client.hedge is not None:
+                api_client.hedge.reset_stats()
+            if api_client.shared is not None:
+                api_client.shared.reset_stats()
         
         # 🔄 Динамическая перезагрузка конфигурации перед каждым batch'ом
         try:
@@ -646,16 +1064,26 @@ class TickerMonitor:
             # 1. Заполняем очередь тикерами
             self._fill_queue()
             
-            # 2. Запускаем worker потоки
-            self._start_workers(num_workers=self.max_workers)
-            
-            # 3. Ждем завершения обработки
-            self._wait_for_completion()
+            if self.pipeline:
+                # 2-3. Конвейер fetch -> analysis -> execution
+                self._run_pipeline()
+            else:
+                # 2. Запускаем worker потоки
+                self._start_workers(num_workers=self.max_workers)
+                
+                # 3. Ждем завершения обработки
+                self._wait_for_completion()
             
         except Exception as e:
             logger.error(f"❌ Critical error during ticker processing: {e}")
         finally:
-            # 4. Выводим итоговую статистику
+            # 4. Сохраняем состояние тикеров для приоритизации следующего батча
+            if self.scheduler is not None:
+                self.scheduler.save()
+            if self.fingerprints is not None:
+                self.fingerprints.save()
+            
+            # 5. Выводим итоговую статистику
             self._log_batch_summary()
     
     def run(self, run_initial_batch: bool = True) -> None:
@@ -806,7 +1234,11 @@ def main():
         # Создаем оркестратор
         monitor = TickerMonitor(
             max_workers=MAX_WORKERS,
-            ticker_delay=TICKER_DELAY
+            ticker_delay=TICKER_DELAY,
+            concurrent=CONCURRENT_FETCH,
+            pipeline=PIPELINE_MODE,
+            priority=PRIORITY_SCHEDULING,
+            incremental=INCREMENTAL_MODE
         )
         
         if start_immediately:
@@ -0,0 +1,251 @@
+"""
+Ticker State - Персистентное состояние тикеров между батчами
+============================================================
+
+TickerPriorityScheduler упорядочивает тикеры батча так, чтобы самые
+важные сканировались первыми сразу после закрытия свечи:
+- открытая экспозиция (позиции и ордера под наблюдением Orders Watchdog)
+- близость к схождению на прошлом батче (расстояние между ценами входа)
+- историческая доля найденных сигналов (hit rate)
+
+Состояние хранится в ticker_state.json и переживает перезапуск.
+
+SignalFingerprintStore хранит хэш нормализованных сигналов по тикеру
+для инкрементального режима: если провайдер вернул те же сигналы, что и
+на прошлом батче, анализ схождений и исполнение пропускаются.
+
+Author: HEDGER
+Version: 1.0
+"""
+
+import hashlib
+import heapq
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Set
+
+from state_journal import load_watchdog_state
+from utils import logger
+
+# Статусы ордеров watchdog, означающие открытую экспозицию
+_POSITION_STATUSES = {'FILLED', 'SL_TP_PLACED', 'SL_TP_ERROR'}
+_PENDING_STATUSES = {'PENDING'}
+
+# Поля сигнала, влияющие на схождение и параметры ордера
+# (current_price и timestamp меняются при каждом запросе и не учитываются)
+_FINGERPRINT_FIELDS = ('signal', 'entry_price', 'take_profit', 'stop_loss', 'risk_reward', 'confidence')
+
+# Веса компонентов приоритета
+_EXPOSURE_POSITION_WEIGHT = 100.0
+_EXPOSURE_PENDING_WEIGHT = 80.0
+_CONVERGENCE_WEIGHT = 50.0
+_HIT_RATE_WEIGHT = 30.0
+
+
+class TickerPriorityScheduler:
+    """Приоритизация тикеров по персистентному состоянию прошлых батчей"""
+
+    def __init__(self, state_file: str = 'ticker_state.json',
+                 watchdog_state_file: str = 'orders_watchdog_state.json',
+                 near_distance: float = 0.05):
+        """
+        Args:
+            state_file: Файл состояния тикеров
+            watchdog_state_file: Файл состояния Orders Watchdog (источник экспозиции)
+            near_distance: Расстояние цен входа (доля), дальше которого близость = 0
+        """
+        self.state_file = Path(state_file)
+        self.watchdog_state_file = Path(watchdog_state_file)
+        self.near_distance = near_distance
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = self._load_state()
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        """Загружает состояние тикеров из файла"""
+        if not self.state_file.exists():
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get('tickers', {}) if isinstance(data, dict) else {}
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось загрузить {self.state_file}: {e}")
+            return {}
+
+    def save(self) -> None:
+        """Атомарно сохраняет состояние (tmp + replace)"""
+        with self._lock:
+            data = {
+                'timestamp': datetime.now().isoformat(),
+                'tickers': self._state
+            }
+            tmp_file = self.state_file.with_suffix(self.state_file.suffix + '.tmp')
+            try:
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_file, self.state_file)
+            except Exception as e:
+                logger.error(f"❌ Ошибка сохранения состояния тикеров: {e}")
+
+    def load_exposure(self) -> Dict[str, float]:
+        """
+        Экспозиция по символам из состояния Orders Watchdog
+
+        Returns:
+            Dict[str, float]: symbol -> вес (позиция важнее отложенного ордера)
+        """
+        exposure: Dict[str, float] = {}
+        if not self.watchdog_state_file.exists():
+            return exposure
+        try:
+            data = load_watchdog_state(self.watchdog_state_file)
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось прочитать {self.watchdog_state_file}: {e}")
+            return exposure
+
+        for order in data.get('watched_orders', []):
+            symbol = order.get('symbol')
+            status = order.get('status')
+            if not symbol:
+                continue
+            if status in _POSITION_STATUSES:
+                weight = _EXPOSURE_POSITION_WEIGHT
+            elif status in _PENDING_STATUSES:
+                weight = _EXPOSURE_PENDING_WEIGHT
+            else:
+                continue
+            exposure[symbol] = max(exposure.get(symbol, 0.0), weight)
+        return exposure
+
+    def record_result(self, ticker: str, signal_found: bool, convergence_distance: Optional[float]) -> None:
+        """
+        Учитывает результат сканирования тикера
+
+        Args:
+            ticker: Тикер
+            signal_found: Найдено ли схождение
+            convergence_distance: Минимальное расстояние цен входа одного направления
+                                  (None - сравнивать нечего)
+        """
+        with self._lock:
+            entry = self._state.setdefault(ticker, {'scans': 0, 'signals': 0})
+            entry['scans'] = entry.get('scans', 0) + 1
+            if signal_found:
+                entry['signals'] = entry.get('signals', 0) + 1
+            entry['last_distance'] = 0.0 if signal_found else convergence_distance
+            entry['last_scan'] = datetime.now().isoformat()
+
+    def score(self, ticker: str, exposure: Dict[str, float]) -> float:
+        """Приоритет тикера (больше = раньше в очереди)"""
+        with self._lock:
+            entry = self._state.get(ticker, {})
+
+        score = exposure.get(ticker, 0.0)
+
+        distance = entry.get('last_distance')
+        if distance is not None and self.near_distance > 0:
+            closeness = max(0.0, 1.0 - distance / self.near_distance)
+            score += _CONVERGENCE_WEIGHT * closeness
+
+        scans = entry.get('scans', 0)
+        if scans:
+            # Сглаживание: тикер с 1 удачным сканом не обгоняет стабильно удачные
+            hit_rate = entry.get('signals', 0) / (scans + 2)
+            score += _HIT_RATE_WEIGHT * hit_rate
+
+        return score
+
+    def order(self, tickers: List[str]) -> List[str]:
+        """
+        Упорядочивает тикеры по приоритету (при равенстве - исходный порядок)
+
+        Returns:
+            List[str]: Тикеры от самого важного к наименее важному
+        """
+        exposure = self.load_exposure()
+        heap = [(-self.score(ticker, exposure), index, ticker) for index, ticker in enumerate(tickers)]
+        heapq.heapify(heap)
+        ordered = [heapq.heappop(heap)[2] for _ in range(len(heap))]
+
+        exposed: Set[str] = {t for t in tickers if t in exposure}
+        if ordered:
+            logger.info(
+                f"📋 Priority order: {len(exposed)} exposed, top: {', '.join(ordered[:5])}"
+            )
+        return ordered
+
+
+class SignalFingerprintStore:
+    """Персистентные отпечатки сигналов тикеров для инкрементального режима"""
+
+    def __init__(self, state_file: str = 'signal_fingerprints.json'):
+        """
+        Args:
+            state_file: Файл отпечатков
+        """
+        self.state_file = Path(state_file)
+        self._lock = threading.Lock()
+        self._fingerprints: Dict[str, str] = self._load_state()
+
+    def _load_state(self) -> Dict[str, str]:
+        """Загружает отпечатки из файла"""
+        if not self.state_file.exists():
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get('fingerprints', {}) if isinstance(data, dict) else {}
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось загрузить {self.state_file}: {e}")
+            return {}
+
+    @staticmethod
+    def fingerprint(signals: Mapping[str, Optional[Dict]]) -> str:
+        """SHA-256 нормализованных сигналов по таймфреймам"""
+        normalized = {}
+        for timeframe in sorted(signals):
+            signal = signals[timeframe]
+            if signal is None:
+                continue
+            normalized[timeframe] = {
+                field: round(value, 10) if isinstance(value, float) else value
+                for field, value in ((f, signal.get(f)) for f in _FINGERPRINT_FIELDS)
+            }
+        payload = json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def check_and_update(self, ticker: str, signals: Mapping[str, Optional[Dict]]) -> bool:
+        """
+        Сравнивает сигналы с прошлым батчем и запоминает новый отпечаток
+
+        Returns:
+            bool: True если сигналы не изменились (тикер можно пропустить)
+        """
+        fingerprint = self.fingerprint(signals)
+        with self._lock:
+            unchanged = self._fingerprints.get(ticker) == fingerprint
+            self._fingerprints[ticker] = fingerprint
+        return unchanged
+
+    def forget(self, ticker: str) -> None:
+        """Удаляет отпечаток (например, исполнение не удалось - повторить на следующем батче)"""
+        with self._lock:
+            self._fingerprints.pop(ticker, None)
+
+    def save(self) -> None:
+        """Атомарно сохраняет отпечатки (tmp + replace)"""
+        with self._lock:
+            data = {
+                'timestamp': datetime.now().isoformat(),
+                'fingerprints': dict(self._fingerprints)
+            }
+        tmp_file = self.state_file.with_suffix(self.state_file.suffix + '.tmp')
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения отпечатков сигналов: {e}")
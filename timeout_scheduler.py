@@ -0,0 +1,122 @@
+"""
+Timeout Scheduler - Единый поток таймаутов на min-heap
+======================================================
+
+Вместо отдельного спящего потока на каждый ордер - один поток,
+который ждет ближайший дедлайн из кучи (deadline, seq, key):
+- schedule / cancel за O(log n) / O(1) (ленивое удаление из кучи)
+- постоянное число потоков при любом количестве ордеров
+- дедлайны в wall-clock (time.time()), поэтому их можно сохранить
+  в файл состояния и перепланировать после перезапуска
+
+Author: HEDGER
+Version: 1.0
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils import logger
+
+
+class TimeoutScheduler:
+    """Планировщик таймаутов: один поток, min-heap дедлайнов"""
+
+    def __init__(self, callback: Callable[[str, Any], None], name: str = 'timeout-scheduler'):
+        """
+        Args:
+            callback: Вызывается как callback(key, payload) при наступлении дедлайна
+            name: Имя потока планировщика
+        """
+        self.callback = callback
+        self.name = name
+        self._heap: List[Tuple[float, int, str]] = []
+        self._active: Dict[str, Tuple[float, int, Any]] = {}
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def _ensure_thread(self) -> None:
+        """Поток запускается при первом schedule (вызывать под _condition)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def schedule(self, key: str, deadline: float, payload: Any = None) -> None:
+        """
+        Планирует таймаут (повторный schedule того же key заменяет прежний)
+
+        Args:
+            key: Ключ таймера (например, тикер)
+            deadline: Время срабатывания (epoch seconds, time.time())
+            payload: Данные для callback (например, order_id)
+        """
+        with self._condition:
+            seq = next(self._seq)
+            self._active[key] = (deadline, seq, payload)
+            heapq.heappush(self._heap, (deadline, seq, key))
+            self._ensure_thread()
+            self._condition.notify()
+
+    def cancel(self, key: str) -> bool:
+        """
+        Отменяет таймер (запись в куче удаляется лениво)
+
+        Returns:
+            bool: True если таймер был активен
+        """
+        with self._condition:
+            return self._active.pop(key, None) is not None
+
+    def pending(self) -> Dict[str, float]:
+        """Активные таймеры: key -> deadline"""
+        with self._condition:
+            return {key: entry[0] for key, entry in self._active.items()}
+
+    def stop(self) -> None:
+        """Останавливает поток планировщика (активные таймеры не срабатывают)"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+    def _pop_due(self) -> Optional[Tuple[str, Any]]:
+        """Ждет ближайший дедлайн и снимает его с кучи (вызывать под _condition)"""
+        while self._running:
+            # Пропускаем отмененные/перепланированные записи
+            while self._heap:
+                deadline, seq, key = self._heap[0]
+                entry = self._active.get(key)
+                if entry is not None and entry[1] == seq:
+                    break
+                heapq.heappop(self._heap)
+
+            if not self._heap:
+                self._condition.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                self._condition.wait(delay)
+                continue
+
+            _, _, key = heapq.heappop(self._heap)
+            _, _, payload = self._active.pop(key)
+            return key, payload
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                due = self._pop_due()
+            if due is None:
+                return
+            key, payload = due
+            try:
+                self.callback(key, payload)
+            except Exception as e:
+                logger.error(f"❌ Ошибка обработки таймаута {key}: {e}")
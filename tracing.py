@@ -0,0 +1,176 @@
+"""
+Tracing - Сквозная трассировка латентности сигнала до ордера на бирже
+=====================================================================
+
+Контекст трассы создается в SignalAnalyzer и передается дальше в
+signal_data ('trace_id', 'trace_started_at'). Каждая стадия пишет span
+в JSONL файл (по строке на span):
+
+    fetch → convergence → sync_validation → account_checks → sizing
+          → leverage_setup → order_submit → watchdog_registration
+          + end_to_end (от начала трассы до регистрации в watchdog)
+
+Сводка по стадиям (p50/p95/max) - CLI:
+
+    python tracing.py                      # весь файл
+    python tracing.py --last-minutes 60    # только последний час
+
+Author: HEDGER
+Version: 1.0
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+from config import TRACING_ENABLED, TRACE_FILE
+from provider_budget import percentile
+from utils import logger
+
+# Порядок стадий в сводке
+STAGES = (
+    'fetch', 'convergence', 'sync_validation', 'account_checks', 'sizing',
+    'leverage_setup', 'order_submit', 'watchdog_registration', 'end_to_end'
+)
+
+
+class Tracer:
+    """Запись span'ов в JSONL (thread-safe, append - безопасно для нескольких процессов)"""
+
+    def __init__(self, trace_file: str = 'logs/traces.jsonl', enabled: bool = True):
+        """
+        Args:
+            trace_file: JSONL файл трасс
+            enabled: Выключенный трейсер ничего не пишет
+        """
+        self.trace_file = Path(trace_file)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_trace() -> Dict[str, Any]:
+        """Новый контекст трассы (кладется в signal_data)"""
+        return {'trace_id': uuid.uuid4().hex[:16], 'trace_started_at': time.time()}
+
+    def record(self, name: str, trace_id: Optional[str], duration: float, **attrs: Any) -> None:
+        """
+        Записывает завершенный span
+
+        Args:
+            name: Стадия (см. STAGES)
+            trace_id: ID трассы (None - сигнал без трассы, ничего не пишем)
+            duration: Длительность в секундах
+            **attrs: Доп. поля (ticker, ok, ...)
+        """
+        if not self.enabled or not trace_id:
+            return
+        entry = {
+            'ts': datetime.now(timezone.utc).isoformat(),
+            'trace_id': trace_id,
+            'span': name,
+            'duration_ms': round(duration * 1000, 3),
+            **attrs
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str) + '\n'
+        try:
+            with self._lock:
+                self.trace_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.trace_file, 'a', encoding='utf-8') as f:
+                    f.write(line)
+        except Exception as e:
+            logger.debug(f"Trace write failed: {e}")
+
+    @contextmanager
+    def span(self, name: str, trace_id: Optional[str], **attrs: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Контекст span'а: длительность блока + ok=False при исключении
+
+        Yields:
+            Dict: Атрибуты span'а (можно дополнить внутри блока)
+        """
+        started = time.perf_counter()
+        ok = True
+        try:
+            yield attrs
+        except Exception:
+            ok = False
+            raise
+        finally:
+            self.record(name, trace_id, time.perf_counter() - started, ok=ok, **attrs)
+
+    def finish(self, context: Mapping[str, Any], **attrs: Any) -> None:
+        """Пишет end_to_end span по контексту трассы из signal_data"""
+        started_at = context.get('trace_started_at')
+        if started_at:
+            self.record('end_to_end', context.get('trace_id'), time.time() - started_at, **attrs)
+
+
+def summarize(trace_file: str, last_minutes: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Сводка длительностей по стадиям
+
+    Args:
+        trace_file: JSONL файл трасс
+        last_minutes: Учитывать только span'ы за последние N минут
+
+    Returns:
+        Dict[stage, {count, p50_ms, p95_ms, max_ms, errors}]
+    """
+    cutoff = time.time() - last_minutes * 60 if last_minutes else None
+    durations: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+
+    with open(trace_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if cutoff and datetime.fromisoformat(entry['ts']).timestamp() < cutoff:
+                continue
+            name = entry.get('span')
+            durations.setdefault(name, []).append(float(entry.get('duration_ms', 0.0)))
+            if entry.get('ok') is False:
+                errors[name] = errors.get(name, 0) + 1
+
+    order = [s for s in STAGES if s in durations] + sorted(s for s in durations if s not in STAGES)
+    return {
+        name: {
+            'count': len(durations[name]),
+            'p50_ms': round(percentile(durations[name], 50), 1),
+            'p95_ms': round(percentile(durations[name], 95), 1),
+            'max_ms': round(max(durations[name]), 1),
+            'errors': errors.get(name, 0)
+        }
+        for name in order
+    }
+
+
+# Глобальный трейсер процесса
+tracer = Tracer(str(TRACE_FILE), TRACING_ENABLED)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='PATRIOT trace summary (per-stage p50/p95)')
+    parser.add_argument('trace_file', nargs='?', default=str(TRACE_FILE))
+    parser.add_argument('--last-minutes', type=float, default=None)
+    args = parser.parse_args()
+
+    if not Path(args.trace_file).exists():
+        print(f"Trace file not found: {args.trace_file}")
+        return
+
+    summary = summarize(args.trace_file, args.last_minutes)
+    print(f"{'stage':<24}{'count':>8}{'p50 ms':>12}{'p95 ms':>12}{'max ms':>12}{'errors':>8}")
+    for name, row in summary.items():
+        print(f"{name:<24}{row['count']:>8}{row['p50_ms']:>12}{row['p95_ms']:>12}{row['max_ms']:>12}{row['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
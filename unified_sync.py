@@ -29,6 +29,9 @@ from typing import Dict, List, Optional, Any, Set, Tuple
 from dataclasses import dataclass, asdict
 from utils import logger
 from config import BINANCE_API_KEY, BINANCE_API_SECRET, BINANCE_TESTNET
+from futures_client import create_futures_client
+from weight_governor import PRIORITY_LOW
+from state_journal import load_watchdog_state, write_watchdog_state, atomic_write_json
 
 # Binance imports
 try:
@@ -99,10 +102,11 @@ class UnifiedSynchronizer:
         
         try:
             logger.info(f"🔧 Подключение к Binance ({'TESTNET' if BINANCE_TESTNET else 'MAINNET'})...")
-            self.client = Client(
+            self.client = create_futures_client(
                 api_key=BINANCE_API_KEY,
                 api_secret=BINANCE_API_SECRET,
-                testnet=BINANCE_TESTNET
+                testnet=BINANCE_TESTNET,
+                priority=PRIORITY_LOW
             )
             
             # Тест подключения
@@ -120,8 +124,8 @@ class UnifiedSynchronizer:
                 logger.warning("⚠️ Файл состояния Orders Watchdog не найден")
                 return {'watched_orders': [], 'symbols': {}, 'last_update': None}
             
-            with open(self.watchdog_state_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # Снимок + журнал дельт Orders Watchdog
+            data = load_watchdog_state(self.watchdog_state_file)
             
             orders_count = len(data.get('watched_orders', []))
             symbols_count = len(data.get('symbols', {}))
@@ -136,18 +140,15 @@ class UnifiedSynchronizer:
     def _save_watchdog_state(self, state_data: Dict[str, Any]) -> bool:
         """Сохранение обновленного состояния"""
         try:
-            # Создаем резервную копию
+            # Резервная копия - полное текущее состояние (снимок + журнал watchdog)
             if self.watchdog_state_file.exists():
-                with open(self.watchdog_state_file, 'r', encoding='utf-8') as src:
-                    with open(self.backup_state_file, 'w', encoding='utf-8') as dst:
-                        dst.write(src.read())
+                atomic_write_json(self.backup_state_file, load_watchdog_state(self.watchdog_state_file))
             
             # Обновляем timestamp
             state_data['last_update'] = datetime.now().isoformat()
             
-            # Сохраняем новое состояние
-            with open(self.watchdog_state_file, 'w', encoding='utf-8') as f:
-                json.dump(state_data, f, indent=2, ensure_ascii=False, default=str)
+            # Новый снимок (атомарно) с нумерацией журнала watchdog
+            write_watchdog_state(self.watchdog_state_file, state_data)
             
             logger.info("💾 Состояние Orders Watchdog обновлено")
             return True
@@ -0,0 +1,278 @@
+"""
+Watchdog RPC - Локальный request/response канал к Orders Watchdog
+=================================================================
+
+Раньше order_executor дописывал запросы в orders_watchdog_requests.json,
+а OrdersWatchdog раз в 5 секунд читал файл и отвечал через общий
+orders_watchdog_response.json: до 5 секунд задержки перед постановкой
+SL/TP и гонки одновременных писателей.
+
+Теперь OrdersWatchdog поднимает сервер на Unix сокете (или localhost TCP,
+если AF_UNIX недоступен), протокол - JSON строки:
+
+    -> {"action": "add_order", "data": {...}}
+    <- {"ok": true, "data": true}
+
+Действия: add_order, get_watched_symbols, check_conflicts, get_status.
+Файловый канал остается fallback'ом, когда watchdog не слушает сокет
+(старая версия, перезапуск); запись в него сериализуется flock. После
+установленного соединения fallback не используется: таймаут отправки или
+ответа - WatchdogRPCDeliveryError, запрос мог быть уже обработан.
+
+Author: HEDGER
+Version: 1.0
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from utils import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows - flock недоступен, остается только lock процесса
+    fcntl = None
+
+# Файловый канал (fallback)
+REQUESTS_FILE = Path('orders_watchdog_requests.json')
+RESPONSE_FILE = Path('orders_watchdog_response.json')
+
+Address = Union[str, Tuple[str, int]]
+
+
+class WatchdogRPCError(Exception):
+    """Watchdog ответил ошибкой на запрос"""
+
+
+class WatchdogRPCDeliveryError(Exception):
+    """Соединение было, но ответ не получен: watchdog мог обработать запрос"""
+
+
+def resolve_address(socket_path: str, port: int = 0) -> Address:
+    """Unix сокет, если доступен и порт не задан явно, иначе localhost:port"""
+    if port or not hasattr(socket, 'AF_UNIX'):
+        return ('127.0.0.1', port or 8765)
+    return socket_path
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Одно соединение - сколько угодно запросов (по строке на запрос)"""
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                handler = self.server.handlers.get(request.get('action'))  # type: ignore[attr-defined]
+                if handler is None:
+                    response = {'ok': False, 'error': f"unknown action: {request.get('action')}"}
+                else:
+                    response = {'ok': True, 'data': handler(request.get('data'))}
+            except Exception as e:
+                logger.error(f"❌ Watchdog RPC: ошибка обработки запроса: {e}")
+                response = {'ok': False, 'error': str(e)}
+            self.wfile.write(_encode(response))
+            self.wfile.flush()
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+else:
+    _ThreadingUnixServer = None
+
+
+class WatchdogRPCServer:
+    """Сервер запросов внутри OrdersWatchdog (фоновый поток)"""
+
+    def __init__(self, handlers: Dict[str, Callable[[Any], Any]], address: Address):
+        """
+        Args:
+            handlers: action -> функция(data) с JSON-сериализуемым результатом
+            address: Путь Unix сокета или (host, port)
+        """
+        self.handlers = handlers
+        self.address = address
+        self._server: Optional[socketserver.BaseServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Биндит сокет и запускает обработку в daemon потоке"""
+        if isinstance(self.address, str):
+            self._remove_stale_socket(self.address)
+            server = _ThreadingUnixServer(self.address, _RequestHandler)
+        else:
+            server = _ThreadingTCPServer(self.address, _RequestHandler)
+        server.handlers = self.handlers  # type: ignore[attr-defined]
+        self._server = server
+        self._thread = threading.Thread(target=server.serve_forever, name='WatchdogRPC', daemon=True)
+        self._thread.start()
+        logger.info(f"🔌 Watchdog RPC слушает {self.address}")
+
+    @staticmethod
+    def _remove_stale_socket(path: str) -> None:
+        """Удаляет сокет от упавшего процесса; живой сокет - второй watchdog"""
+        if not os.path.exists(path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"Watchdog RPC socket {path} уже используется другим процессом")
+
+    def stop(self) -> None:
+        """Останавливает сервер и удаляет файл сокета"""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        logger.info("🔌 Watchdog RPC остановлен")
+
+
+class WatchdogRPCClient:
+    """Клиент: соединение на запрос (без общего состояния между потоками)"""
+
+    def __init__(self, address: Address, timeout: float = 2.0):
+        """
+        Args:
+            address: Путь Unix сокета или (host, port)
+            timeout: Таймаут соединения и ответа (сек)
+        """
+        self.address = address
+        self.timeout = timeout
+
+    def is_available(self) -> bool:
+        """Слушает ли watchdog сокет"""
+        if isinstance(self.address, str):
+            return os.path.exists(self.address)
+        return True
+
+    def call(self, action: str, data: Any = None) -> Any:
+        """
+        Выполняет запрос
+
+        Raises:
+            OSError: Watchdog недоступен (нет сокета, отказ, таймаут соединения)
+            WatchdogRPCDeliveryError: Соединение установлено, но ответа нет
+            WatchdogRPCError: Watchdog вернул ошибку
+        """
+        family = socket.AF_UNIX if isinstance(self.address, str) else socket.AF_INET
+        with socket.socket(family, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.address)
+            try:
+                sock.sendall(_encode({'action': action, 'data': data}))
+                with sock.makefile('rb') as reader:
+                    line = reader.readline()
+            except OSError as e:
+                raise WatchdogRPCDeliveryError(f"Watchdog RPC: нет ответа на {action} ({e})") from e
+        if not line:
+            raise WatchdogRPCDeliveryError(f"Watchdog RPC: пустой ответ на {action}")
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise WatchdogRPCError(response.get('error', 'unknown error'))
+        return response.get('data')
+
+
+# ---------------------------------------------------------------------------
+# Файловый канал (fallback)
+# ---------------------------------------------------------------------------
+
+_file_lock = threading.Lock()
+
+
+@contextmanager
+def requests_file_lock(requests_file: Path = REQUESTS_FILE) -> Iterator[None]:
+    """Эксклюзивный доступ к файлу запросов (потоки + процессы через flock)"""
+    with _file_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{requests_file}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def append_file_request(action: str, data: Any, requests_file: Path = REQUESTS_FILE) -> None:
+    """Дописывает запрос в файл (read-modify-write под requests_file_lock)"""
+    request = {'action': action, 'data': data, 'timestamp': datetime.now().isoformat()}
+    with requests_file_lock(requests_file):
+        requests_data: List[Dict[str, Any]] = []
+        if requests_file.exists():
+            with open(requests_file, 'r', encoding='utf-8') as f:
+                requests_data = json.load(f) or []
+        requests_data.append(request)
+        tmp_file = requests_file.with_suffix(requests_file.suffix + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(requests_data, f, indent=2, ensure_ascii=False, default=str)
+        os.replace(tmp_file, requests_file)
+
+
+def take_file_requests(requests_file: Path = REQUESTS_FILE) -> List[Dict[str, Any]]:
+    """Забирает все накопленные запросы и очищает файл (атомарно для писателей)"""
+    with requests_file_lock(requests_file):
+        if not requests_file.exists():
+            return []
+        with open(requests_file, 'r', encoding='utf-8') as f:
+            requests_data = json.load(f) or []
+        if requests_data:
+            with open(requests_file, 'w', encoding='utf-8') as f:
+                json.dump([], f)
+        return requests_data
+
+
+def write_file_response(action: str, data: Any, response_file: Path = RESPONSE_FILE) -> None:
+    """Ответ на файловый запрос (атомарная замена файла ответа)"""
+    tmp_file = response_file.with_suffix(response_file.suffix + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'action': f'{action}_response',
+            'timestamp': datetime.now().isoformat(),
+            'data': data
+        }, f, indent=2, ensure_ascii=False, default=str)
+    os.replace(tmp_file, response_file)
+
+
+def wait_file_response(action: str, since: datetime, timeout: float,
+                       response_file: Path = RESPONSE_FILE) -> Optional[Any]:
+    """Ждет ответ на файловый запрос, записанный после since"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with open(response_file, 'r', encoding='utf-8') as f:
+                response = json.load(f)
+            if (response.get('action') == f'{action}_response'
+                    and datetime.fromisoformat(response['timestamp']) >= since):
+                return response.get('data')
+        except (OSError, ValueError, KeyError):
+            pass
+        time.sleep(0.2)
+    return None
@@ -21,10 +21,13 @@ from datetime import datetime
 from utils import logger
 from telegram_bot import telegram_bot
 from config import BINANCE_API_KEY, BINANCE_API_SECRET, BINANCE_TESTNET
+from futures_client import create_futures_client
 
-# Binance REST API
-from binance.client import Client
-from binance.exceptions import BinanceAPIException
+# Binance REST API (клиент - futures_client.create_futures_client)
+try:
+    from binance.exceptions import BinanceAPIException
+except ImportError:  # paper режим без python-binance: ошибки симулятора в том же формате
+    from paper_exchange import PaperExchangeError as BinanceAPIException
 
 class OrderMonitor:
     """Мониторинг ордеров через REST API"""
@@ -48,7 +51,7 @@ class OrderMonitor:
                 logger.error("❌ Binance API ключи не настроены")
                 return
             
-            self.binance_client = Client(
+            self.binance_client = create_futures_client(
                 api_key=BINANCE_API_KEY,
                 api_secret=BINANCE_API_SECRET,
                 testnet=BINANCE_TESTNET
@@ -0,0 +1,427 @@
+"""
+Weight Governor - Общий для процессов бюджет REST weight Binance Futures
+========================================================================
+
+ticker_monitor, orders_watchdog, order_sync_service, unified_sync и
+symbol_cache ходят в REST независимо друг от друга, а лимит weight у
+Binance один на IP (2400/мин). ban_reporter.py показывал бан уже после
+факта - governor не дает до него дойти:
+
+- используемый weight текущей минуты хранится в SQLite (общий для процессов)
+  и уточняется по заголовкам X-MBX-USED-WEIGHT-1M / X-MBX-ORDER-COUNT-1M
+- перед каждым futures_* вызовом проверяется бюджет по приоритету:
+    critical (создание/отмена ордеров) - проходит всегда, кроме бана
+    normal   - до 85% лимита, иначе ждет следующей минуты
+    low      - до 60% лимита (sync сканы, отчеты)
+- 429/418 фиксируют бан (Retry-After / "banned until") для всех процессов;
+  пока он действует, запросы не уходят на биржу
+
+GovernedClient - обертка над binance.client.Client с тем же интерфейсом,
+создается в futures_client.create_futures_client().
+
+Author: HEDGER
+Version: 1.0
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from utils import logger
+
+PRIORITY_CRITICAL = 'critical'
+PRIORITY_NORMAL = 'normal'
+PRIORITY_LOW = 'low'
+
+# Доля лимита weight, доступная приоритету
+BUDGET_SHARE = {
+    PRIORITY_CRITICAL: 1.0,
+    PRIORITY_NORMAL: 0.85,
+    PRIORITY_LOW: 0.6,
+}
+
+# Методы, которые никогда не откладываются (защита позиций важнее бюджета)
+CRITICAL_METHODS = {
+    'futures_create_order',
+    'futures_place_batch_order',
+    'futures_cancel_order',
+    'futures_cancel_orders',
+    'futures_cancel_all_open_orders',
+}
+
+# Методы, увеличивающие счетчик ордеров (x-mbx-order-count-1m)
+ORDER_METHODS = {'futures_create_order', 'futures_place_batch_order'}
+
+# Оценка weight до получения заголовков ответа (GET /fapi/* документация Binance).
+# Та же таблица задает weight запросов paper_exchange
+ENDPOINT_WEIGHTS = {
+    'futures_create_order': 1,
+    'futures_cancel_order': 1,
+    'futures_cancel_orders': 1,
+    'futures_cancel_all_open_orders': 1,
+    'futures_get_order': 1,
+    'futures_get_open_orders': 1,        # без symbol - 40
+    'futures_get_all_orders': 5,
+    'futures_place_batch_order': 5,
+    'futures_position_information': 5,
+    'futures_account': 5,
+    'futures_account_balance': 5,
+    'futures_account_trades': 5,
+    'futures_income_history': 30,
+    'futures_symbol_ticker': 1,          # без symbol - 2
+    'futures_mark_price': 1,             # без symbol - 10
+    'futures_exchange_info': 1,
+    'futures_leverage_bracket': 1,
+    'futures_change_leverage': 1,
+    'futures_change_margin_type': 1,
+    'futures_klines': 5,
+}
+ALL_SYMBOLS_WEIGHTS = {
+    'futures_get_open_orders': 40,
+    'futures_symbol_ticker': 2,
+    'futures_mark_price': 10,
+}
+
+_BANNED_UNTIL_RE = re.compile(r'banned until (\d{13})')
+
+
+class RateLimitBackoff(Exception):
+    """Запрос не отправлен: бан по IP или бюджет weight исчерпан дольше max_wait"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = retry_after
+
+
+def estimate_weight(method: str, kwargs: Mapping[str, Any]) -> int:
+    """Оценка weight вызова (вызовы без symbol у части методов дороже)"""
+    if method in ALL_SYMBOLS_WEIGHTS and not kwargs.get('symbol'):
+        return ALL_SYMBOLS_WEIGHTS[method]
+    return ENDPOINT_WEIGHTS.get(method, 1)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Retry-After из ответа BinanceAPIException (если есть)"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        value = headers.get('Retry-After') or headers.get('retry-after')
+        return float(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+class WeightGovernor:
+    """
+    Межпроцессный учет weight по минутным окнам (SQLite)
+
+    usage: окно (epoch // 60) -> weight, orders
+    bans:  одна строка - до какого времени запросы запрещены
+    """
+
+    def __init__(self, db_path: str = 'binance_usage.db', weight_limit: int = 2400,
+                 max_wait: float = 65.0, poll_interval: float = 0.5):
+        """
+        Args:
+            db_path: Путь к SQLite файлу (общий для всех процессов)
+            weight_limit: Лимит weight в минуту (REQUEST_WEIGHT из exchangeInfo)
+            max_wait: Сколько максимум откладывать некритичный запрос (сек)
+            poll_interval: Интервал перепроверки бюджета при ожидании
+        """
+        self.db_path = db_path
+        self.weight_limit = int(weight_limit)
+        self.max_wait = float(max_wait)
+        self.poll_interval = float(poll_interval)
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._delayed = 0
+        self._rejected = 0
+        self._bans = 0
+        self._last_used_weight = 0
+        self._init_db()
+        logger.info(f"🚦 Binance weight governor: limit {self.weight_limit}/min, db {db_path}")
+
+    def _init_db(self) -> None:
+        """Создает таблицы учета"""
+        with self._get_connection() as conn:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS usage (
+                window INTEGER PRIMARY KEY,
+                weight INTEGER NOT NULL DEFAULT 0,
+                orders INTEGER NOT NULL DEFAULT 0
+            )
+            ''')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS bans (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                banned_until REAL NOT NULL,
+                status INTEGER NOT NULL,
+                reason TEXT
+            )
+            ''')
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Новое соединение на операцию (безопасно для потоков и процессов)"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _try_reserve(self, cost: int, orders: int, priority: str, now: float) -> float:
+        """
+        Атомарно проверяет бан и бюджет окна и резервирует weight
+
+        Returns:
+            0.0 если резерв сделан, иначе сколько секунд ждать (< 0 - бан)
+        """
+        window = int(now // 60)
+        allowed = self.weight_limit * BUDGET_SHARE.get(priority, BUDGET_SHARE[PRIORITY_NORMAL])
+        conn = self._get_connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            ban = conn.execute('SELECT banned_until FROM bans WHERE id = 1').fetchone()
+            if ban and ban[0] > now:
+                conn.rollback()
+                return -(ban[0] - now)
+
+            row = conn.execute('SELECT weight FROM usage WHERE window = ?', (window,)).fetchone()
+            used = row[0] if row else 0
+            if priority != PRIORITY_CRITICAL and used + cost > allowed:
+                conn.rollback()
+                return (window + 1) * 60 - now
+
+            conn.execute('INSERT OR IGNORE INTO usage (window, weight, orders) VALUES (?, 0, 0)', (window,))
+            conn.execute(
+                'UPDATE usage SET weight = weight + ?, orders = orders + ? WHERE window = ?',
+                (cost, orders, window)
+            )
+            conn.execute('DELETE FROM usage WHERE window < ?', (window - 5,))
+            conn.commit()
+            return 0.0
+        finally:
+            conn.close()
+
+    def acquire(self, method: str, cost: int, priority: str = PRIORITY_NORMAL, orders: int = 0) -> None:
+        """
+        Ждет бюджет под вызов и резервирует его
+
+        Raises:
+            RateLimitBackoff: Бан по IP, либо бюджет не освободился за max_wait
+        """
+        deadline = time.monotonic() + self.max_wait
+        delayed = False
+        while True:
+            now = time.time()
+            try:
+                wait = self._try_reserve(cost, orders, priority, now)
+            except sqlite3.Error as e:
+                # Governor - страховка: при проблемах с БД запрос уходит как раньше
+                logger.warning(f"Weight governor unavailable ({e}), calling {method} directly")
+                wait = 0.0
+
+            if wait == 0.0:
+                with self._lock:
+                    self._calls += 1
+                    self._delayed += 1 if delayed else 0
+                return
+
+            banned = wait < 0
+            wait = abs(wait)
+            # Во время бана любые запросы только продлевают его; critical не ждет вовсе
+            if priority == PRIORITY_CRITICAL or time.monotonic() + wait > deadline:
+                with self._lock:
+                    self._rejected += 1
+                reason = 'IP ban' if banned else f'weight budget ({priority})'
+                raise RateLimitBackoff(f"{method} not sent: {reason}, retry in {wait:.0f}s", retry_after=wait)
+
+            if not delayed:
+                logger.info(f"⏳ {method} ({priority}) delayed {wait:.1f}s: {'IP ban' if banned else 'weight budget'}")
+                delayed = True
+            time.sleep(min(wait, self.poll_interval) + 0.01)
+
+    def observe(self, headers: Optional[Mapping[str, Any]]) -> None:
+        """Уточняет usage окна по заголовкам ответа (они учитывают все процессы на IP)"""
+        if not headers:
+            return
+        values = {str(k).lower(): v for k, v in headers.items()}
+        try:
+            used = int(values.get('x-mbx-used-weight-1m', 0) or 0)
+            orders = int(values.get('x-mbx-order-count-1m', 0) or 0)
+        except (TypeError, ValueError):
+            return
+        if not used and not orders:
+            return
+        window = int(time.time() // 60)
+        with self._lock:
+            self._last_used_weight = used
+        try:
+            conn = self._get_connection()
+            try:
+                with conn:
+                    conn.execute('INSERT OR IGNORE INTO usage (window, weight, orders) VALUES (?, 0, 0)', (window,))
+                    conn.execute(
+                        'UPDATE usage SET weight = MAX(weight, ?), orders = MAX(orders, ?) WHERE window = ?',
+                        (used, orders, window)
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.debug(f"Weight governor observe failed: {e}")
+
+    def record_ban(self, status_code: int, retry_after: Optional[float] = None, message: str = '') -> float:
+        """
+        Фиксирует 429/418 для всех процессов
+
+        Returns:
+            float: epoch до которого запросы запрещены
+        """
+        now = time.time()
+        match = _BANNED_UNTIL_RE.search(message or '')
+        if match:
+            banned_until = int(match.group(1)) / 1000.0
+        elif retry_after:
+            banned_until = now + retry_after
+        elif status_code == 418:
+            banned_until = now + 120.0
+        else:
+            # 429 без Retry-After: ждем конца текущего минутного окна
+            banned_until = (int(now // 60) + 1) * 60
+
+        with self._lock:
+            self._bans += 1
+        logger.error(f"🚫 Binance {status_code}: запросы остановлены на {banned_until - now:.0f}s ({message[:120]})")
+        try:
+            conn = self._get_connection()
+            try:
+                with conn:
+                    conn.execute(
+                        'INSERT INTO bans (id, banned_until, status, reason) VALUES (1, ?, ?, ?) '
+                        'ON CONFLICT(id) DO UPDATE SET banned_until = MAX(banned_until, excluded.banned_until), '
+                        'status = excluded.status, reason = excluded.reason',
+                        (banned_until, status_code, message[:500])
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to store Binance ban: {e}")
+        return banned_until
+
+    def get_usage(self) -> Dict[str, Any]:
+        """Текущее окно из общей БД (для мониторинга)"""
+        now = time.time()
+        conn = self._get_connection()
+        try:
+            row = conn.execute('SELECT weight, orders FROM usage WHERE window = ?', (int(now // 60),)).fetchone()
+            ban = conn.execute('SELECT banned_until, status FROM bans WHERE id = 1').fetchone()
+        finally:
+            conn.close()
+        return {
+            'used_weight': row[0] if row else 0,
+            'orders': row[1] if row else 0,
+            'weight_limit': self.weight_limit,
+            'banned_for': max(0.0, ban[0] - now) if ban else 0.0,
+            'ban_status': ban[1] if ban and ban[0] > now else None,
+        }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._calls = 0
+            self._delayed = 0
+            self._rejected = 0
+            self._bans = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Счетчики процесса"""
+        with self._lock:
+            return {
+                'calls': self._calls,
+                'delayed': self._delayed,
+                'rejected': self._rejected,
+                'bans': self._bans,
+                'last_used_weight': self._last_used_weight,
+                'weight_limit': self.weight_limit,
+            }
+
+
+class GovernedClient:
+    """
+    Клиент Binance с проверкой бюджета перед каждым futures_* вызовом
+
+    Остальные атрибуты (response, FUTURES_URL, ...) проксируются как есть.
+    """
+
+    def __init__(self, client: Any, governor: WeightGovernor, priority: str = PRIORITY_NORMAL):
+        """
+        Args:
+            client: binance.client.Client (или совместимый)
+            governor: Общий WeightGovernor процесса
+            priority: Приоритет некритичных вызовов этого клиента
+        """
+        self._client = client
+        self._governor = governor
+        self._priority = priority
+        # client.response общий для потоков: ответ своего вызова ловим hook'ом
+        # requests.Session - он выполняется в потоке, который сделал запрос
+        self._local = threading.local()
+        hooks = getattr(getattr(client, 'session', None), 'hooks', None)
+        self._hooked = isinstance(hooks, dict)
+        if self._hooked:
+            hooks.setdefault('response', []).append(self._remember_response)
+
+    @property
+    def wrapped_client(self) -> Any:
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not name.startswith('futures_') or not callable(attr):
+            return attr
+
+        def governed(*args: Any, **kwargs: Any) -> Any:
+            return self._call(name, attr, args, kwargs)
+        return governed
+
+    def _remember_response(self, response: Any, *args: Any, **kwargs: Any) -> None:
+        self._local.response = response
+
+    def _call(self, name: str, method: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Any:
+        priority = PRIORITY_CRITICAL if name in CRITICAL_METHODS else self._priority
+        orders = 0
+        if name in ORDER_METHODS:
+            orders = len(kwargs.get('batchOrders') or []) or 1
+        self._governor.acquire(name, estimate_weight(name, kwargs), priority, orders)
+        self._local.response = None
+        previous_response = getattr(self._client, 'response', None)
+        try:
+            result = method(*args, **kwargs)
+        except Exception as e:
+            status_code = getattr(e, 'status_code', None)
+            if status_code in (418, 429):
+                self._governor.record_ban(status_code, _retry_after(e), str(getattr(e, 'message', e)))
+            raise
+        # Заголовки только успешного ответа этого вызова
+        if self._hooked:
+            response = self._local.response
+        else:
+            # Без hook client.response мог записать другой поток; не изменился - не наш ответ
+            response = getattr(self._client, 'response', None)
+            if response is previous_response:
+                response = None
+        self._governor.observe(getattr(response, 'headers', None))
+        return result
+
+
+_governor: Optional[WeightGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_weight_governor() -> WeightGovernor:
+    """WeightGovernor процесса (настройки из config)"""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            from config import BINANCE_USAGE_DB, BINANCE_WEIGHT_LIMIT, BINANCE_GOVERNOR_MAX_WAIT
+            _governor = WeightGovernor(BINANCE_USAGE_DB, BINANCE_WEIGHT_LIMIT, BINANCE_GOVERNOR_MAX_WAIT)
+        return _governor